@@ -0,0 +1,57 @@
+from os.path import (
+    dirname,
+    join
+)
+import pytest
+from treetopper import Stand
+
+
+EXAMPLES = join(dirname(dirname(__file__)), 'treetopper', 'example_csv_and_xlsx')
+DATA = join(dirname(__file__), 'data')
+
+# [Stand name, Plot factor, Example file, Cruise type]
+EXAMPLE_STANDS = [['EX1', -20, 'Example_CSV_quick.csv', 'q'],
+                  ['EX3', 33.3, 'Example_CSV_quick.csv', 'q'],
+                  ['EX4', -30, 'Example_Excel_quick.xlsx', 'q'],
+                  ['OK2', 46.94, 'Example_CSV_full.csv', 'f'],
+                  ['OK1', -30, 'Example_Excel_full.xlsx', 'f']]
+
+
+def example_file(file_name):
+    return join(EXAMPLES, file_name)
+
+
+def data_file(file_name):
+    return join(DATA, file_name)
+
+
+def import_stand(name, plot_factor, file_name, cruise_type, **kwargs):
+    """Returns a Stand Class of the example stand imported from the example cruise sheet"""
+    stand = Stand(name, plot_factor)
+    if cruise_type == 'q':
+        stand.import_sheet_quick(example_file(file_name), **kwargs)
+    else:
+        stand.import_sheet_full(example_file(file_name), **kwargs)
+    return stand
+
+
+def rebuild_stand(stand):
+    """Returns a new Stand Class with the stand's plots added in order"""
+    rebuilt = Stand(stand.name, stand.plot_factor)
+    rebuilt.add_plots(list(stand.plots))
+    return rebuilt
+
+
+@pytest.fixture(params=EXAMPLE_STANDS, ids=[stand[0] for stand in EXAMPLE_STANDS])
+def example_stand(request):
+    return request.param
+
+
+@pytest.fixture
+def ex1():
+    return import_stand(*EXAMPLE_STANDS[0])
+
+
+@pytest.fixture
+def ok2():
+    return import_stand(*EXAMPLE_STANDS[3])
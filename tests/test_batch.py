@@ -0,0 +1,108 @@
+import json
+import sqlite3
+from os.path import join
+from shutil import copy
+from treetopper import Stand
+from treetopper.batch import (
+    run_batch,
+    read_checkpoint,
+    CHECKPOINT_FILE,
+    STANDS_DIR,
+    SNAPSHOT_DIR
+)
+from conftest import (
+    example_file,
+    import_stand
+)
+
+
+CONFIG = {'cruise_type': 'q',
+          'plot_factor': -20,
+          'stands': {'OK1': {'cruise_type': 'f', 'plot_factor': -30},
+                     'OK2': {'cruise_type': 'f', 'plot_factor': 46.94}},
+          'outputs': {'pdf': False, 'table_csv': True},
+          'fvs': {'sqlite': 'batch_fvs', 'variant': 'PN', 'forest_code': 612, 'region': 6, 'stand_age': 60,
+                  'site_species': 'DF', 'site_index': 120}}
+
+
+def make_batch(tmp_path, config=CONFIG):
+    sheets = tmp_path / 'sheets'
+    sheets.mkdir()
+    for file_name in ['Example_CSV_quick.csv', 'Example_CSV_full.csv']:
+        copy(example_file(file_name), str(sheets / file_name))
+    config_file = str(tmp_path / 'config.json')
+    with open(config_file, 'w') as f:
+        json.dump(config, f)
+    return str(sheets), config_file, str(tmp_path / 'output')
+
+
+def run(sheets, config_file, output_dir, **kwargs):
+    return run_batch(sheets, config_file, output_dir, processes=0, progress=False, **kwargs)
+
+
+def get_fvs_counts(output_dir):
+    con = sqlite3.connect(join(output_dir, 'batch_fvs.db'))
+    counts = dict(con.execute('SELECT Stand_ID, COUNT(*) FROM FVS_StandInit GROUP BY Stand_ID').fetchall())
+    con.close()
+    return counts
+
+
+def test_batch_runs_every_stand(tmp_path):
+    sheets, config_file, output_dir = make_batch(tmp_path)
+    summary = run(sheets, config_file, output_dir)
+    assert sorted(summary['done']) == ['EX1', 'EX2', 'EX3', 'EX4', 'OK1', 'OK2']
+    assert summary['failed'] == [] and summary['skipped'] == []
+
+    loaded = Stand.load(join(output_dir, STANDS_DIR, 'OK2', SNAPSHOT_DIR))
+    assert loaded.get_console_report_text() == import_stand('OK2', 46.94, 'Example_CSV_full.csv', 'f').get_console_report_text()
+    assert get_fvs_counts(output_dir) == {name: 1 for name in summary['done']}
+
+
+def test_batch_resume_skips_done_stands(tmp_path):
+    sheets, config_file, output_dir = make_batch(tmp_path)
+    run(sheets, config_file, output_dir)
+    summary = run(sheets, config_file, output_dir)
+    assert summary['done'] == []
+    assert sorted(summary['skipped']) == ['EX1', 'EX2', 'EX3', 'EX4', 'OK1', 'OK2']
+    assert set(get_fvs_counts(output_dir).values()) == {1}
+
+    summary = run(sheets, config_file, output_dir, resume=False)
+    assert summary['skipped'] == []
+    assert len(summary['done']) == 6
+
+
+def test_batch_resume_after_crash(tmp_path):
+    sheets, config_file, output_dir = make_batch(tmp_path)
+    run(sheets, config_file, output_dir)
+    checkpoint_file = join(output_dir, CHECKPOINT_FILE)
+    with open(checkpoint_file, 'r') as f:
+        lines = f.readlines()
+    # The last stand's record was only partly written when the batch stopped
+    crashed = json.loads(lines[-1])['stand']
+    with open(checkpoint_file, 'w') as f:
+        f.writelines(lines[:-1] + [lines[-1][:20]])
+    assert crashed not in read_checkpoint(checkpoint_file)
+
+    summary = run(sheets, config_file, output_dir)
+    assert summary['done'] == [crashed]
+    assert len(summary['skipped']) == 5
+    assert read_checkpoint(checkpoint_file)[crashed]['status'] == 'done'
+
+
+def test_batch_reruns_changed_and_failed_stands(tmp_path):
+    config = json.loads(json.dumps(CONFIG))
+    config['stands']['OK2']['plot_factor'] = None
+    sheets, config_file, output_dir = make_batch(tmp_path, config)
+    summary = run(sheets, config_file, output_dir)
+    assert summary['failed'] == ['OK2']
+
+    # The quick sheet changes, so its stands are run again along with the failed stand
+    with open(join(sheets, 'Example_CSV_quick.csv'), 'a') as f:
+        f.write('EX1,99,1,DF,20.5,105,40,16\n')
+    with open(config_file, 'w') as f:
+        json.dump(CONFIG, f)
+    summary = run(sheets, config_file, output_dir)
+    assert sorted(summary['done']) == ['EX1', 'EX2', 'EX3', 'EX4', 'OK2']
+    assert summary['skipped'] == ['OK1']
+    assert Stand.load(join(output_dir, STANDS_DIR, 'EX1', SNAPSHOT_DIR)).plot_count == \
+        import_stand('EX1', -20, 'Example_CSV_quick.csv', 'q').plot_count + 1
@@ -0,0 +1,114 @@
+import numpy as np
+from os import (
+    makedirs,
+    listdir,
+    remove,
+    utime
+)
+from os.path import (
+    isdir,
+    join
+)
+from treetopper import (
+    Stand,
+    ImportCache
+)
+from treetopper._snapshot import HEADER_FILE
+from conftest import (
+    example_file,
+    import_stand
+)
+
+
+def cache_import(cache, name, plot_factor, file_name, cruise_type):
+    stand = Stand(name, plot_factor)
+    if cruise_type == 'q':
+        stand.import_sheet_quick(example_file(file_name), cache=cache)
+    else:
+        stand.import_sheet_full(example_file(file_name), cache=cache)
+    return stand
+
+
+def test_cache_miss_then_hit(tmp_path):
+    cache = ImportCache(str(tmp_path))
+    first = cache_import(cache, 'EX1', -20, 'Example_CSV_quick.csv', 'q')
+    assert (cache.hits, cache.misses) == (0, 1)
+    second = cache_import(cache, 'EX1', -20, 'Example_CSV_quick.csv', 'q')
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    expected = import_stand('EX1', -20, 'Example_CSV_quick.csv', 'q')
+    for stand in [first, second]:
+        assert stand.get_console_report_text() == expected.get_console_report_text()
+        assert stand.table_data == expected.table_data
+    assert cache.stats['entries'] == 1
+
+
+def test_cache_key_changes_with_plot_factor(tmp_path):
+    cache = ImportCache(str(tmp_path))
+    cache_import(cache, 'EX1', -20, 'Example_CSV_quick.csv', 'q')
+    stand = cache_import(cache, 'EX1', -25, 'Example_CSV_quick.csv', 'q')
+    assert (cache.hits, cache.misses) == (0, 2)
+    assert stand.get_console_report_text() == import_stand('EX1', -25, 'Example_CSV_quick.csv', 'q').get_console_report_text()
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    other = ImportCache(str(tmp_path / 'other'))
+    cache_import(other, 'OK2', 46.94, 'Example_CSV_full.csv', 'f')
+    ok2_size = other.stats['size']
+
+    cache = ImportCache(str(tmp_path / 'cache'))
+    cache_import(cache, 'EX1', -20, 'Example_CSV_quick.csv', 'q')
+    ex1_key, _, ex1_size = cache._get_entries()[0]
+    cache_import(cache, 'EX3', 33.3, 'Example_CSV_quick.csv', 'q')
+    ex3_key = [key for key, _, _ in cache._get_entries() if key != ex1_key][0]
+
+    # EX1 is used again, so EX3 is the least recently used stand
+    utime(join(cache.directory, ex3_key, HEADER_FILE), (1000, 1000))
+    cache_import(cache, 'EX1', -20, 'Example_CSV_quick.csv', 'q')
+    assert cache.hits == 1
+
+    cache.max_size = ex1_size + ok2_size
+    cache_import(cache, 'OK2', 46.94, 'Example_CSV_full.csv', 'f')
+    keys = [key for key, _, _ in cache._get_entries()]
+    assert cache.evictions == 1
+    assert ex1_key in keys and ex3_key not in keys
+    assert cache.stats == {'hits': 1, 'misses': 3, 'evictions': 1, 'entries': 2, 'size': ex1_size + ok2_size}
+
+
+def test_cache_clear(tmp_path):
+    cache = ImportCache(str(tmp_path))
+    cache_import(cache, 'EX1', -20, 'Example_CSV_quick.csv', 'q')
+    cache.clear()
+    assert cache.stats['entries'] == 0
+    cache_import(cache, 'EX1', -20, 'Example_CSV_quick.csv', 'q')
+    assert cache.misses == 2
+
+
+def test_cache_clear_releases_loaded_stands(tmp_path):
+    cache = ImportCache(str(tmp_path))
+    cache_import(cache, 'OK2', 46.94, 'Example_CSV_full.csv', 'f')
+    stand = cache_import(cache, 'OK2', 46.94, 'Example_CSV_full.csv', 'f')
+    assert cache.hits == 1
+    assert any(isinstance(vals, np.memmap) for vals in stand._columns['trees'].values())
+
+    # The stand's memory-mapped columns are copied before its snapshot is removed, its plots are still rebuilt from them
+    cache.clear()
+    assert listdir(str(tmp_path)) == []
+    assert not any(isinstance(vals, np.memmap) for columns in stand._columns.values() for vals in columns.values())
+    expected = import_stand('OK2', 46.94, 'Example_CSV_full.csv', 'f')
+    assert stand.get_console_report_text() == expected.get_console_report_text()
+    assert stand.table_data == expected.table_data
+
+
+def test_cache_scan_removes_headerless_keys(tmp_path):
+    cache = ImportCache(str(tmp_path))
+    cache_import(cache, 'EX1', -20, 'Example_CSV_quick.csv', 'q')
+    key = cache._get_entries()[0][0]
+    # A removal that could not finish leaves the key's directory without its header, a snapshot being saved is kept
+    remove(join(cache.directory, key, HEADER_FILE))
+    saving = f'{key}.1234.tmp'
+    makedirs(join(cache.directory, saving))
+
+    assert cache.stats['entries'] == 0
+    assert not isdir(join(cache.directory, key))
+    assert isdir(join(cache.directory, saving))
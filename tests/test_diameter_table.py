@@ -0,0 +1,46 @@
+import pytest
+from statistics import mean
+from treetopper._utils import format_comma
+from conftest import import_stand
+
+
+def test_stand_stock_totals_match_stand(example_stand):
+    stand = import_stand(*example_stand)
+    table = stand.diameter_table
+    assert table.species_list == [spp for spp in stand.species if spp != 'totals_all']
+    for spp in table.species_list:
+        cells = table.get_species_cells(spp)
+        for key in table.metrics:
+            assert table[key][cells].sum() == pytest.approx(stand.species[spp][key])
+        assert table.trees[cells].sum() == sum(1 for plot in stand.plots for tree in plot.trees if tree.species == spp)
+
+
+def test_stand_stock_avg_hgt_matches_mean(ex1):
+    table = ex1.diameter_table
+    for spp in table.species_list:
+        for i in table.get_species_cells(spp):
+            heights = [tree.height for plot in ex1.plots for tree in plot.trees
+                       if tree.species == spp and int(tree.dbh) == table.dbh[i]]
+            assert table.height[i] == sum(heights)
+
+
+def test_stand_stock_rows_format_like_statistics_mean(ex1):
+    table = ex1.diameter_table
+    spp = table.species_list[0]
+    rows = table.summary_table[list(table.summary_table)[0]]
+    for row, i in zip(rows[1:-1], table.get_species_cells(spp)):
+        heights = [tree.height for plot in ex1.plots for tree in plot.trees
+                   if tree.species == spp and int(tree.dbh) == table.dbh[i]]
+        assert row[0] == str(table.dbh[i])
+        assert row[7] == format_comma(mean(heights))
+
+
+def test_stand_stock_builds_only_tree_columns(ex1):
+    ex1.diameter_table
+    assert list(ex1._columns) == ['trees']
+
+
+def test_stand_stock_pdf_report(ex1, tmp_path):
+    assert ex1.get_stand_stock_pdf_report_bytes_io().getvalue()[:4] == b'%PDF'
+    ex1.stand_stock_pdf_report('stand_stock', str(tmp_path))
+    assert (tmp_path / 'stand_stock.pdf').exists()
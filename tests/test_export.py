@@ -0,0 +1,140 @@
+import csv
+import pytest
+from treetopper import (
+    Stand,
+    ImportSheetError
+)
+from treetopper._export import (
+    LOG_TABLE_COLUMNS,
+    log_table_to_csv,
+    log_table_to_arrow
+)
+from conftest import (
+    EXAMPLE_STANDS,
+    import_stand
+)
+
+pandas = pytest.importorskip('pandas')
+pyarrow = pytest.importorskip('pyarrow')
+from pyarrow import (
+    ipc,
+    parquet
+)
+
+
+FULL_STANDS = [stand for stand in EXAMPLE_STANDS if stand[3] == 'f']
+
+
+def frame_stand(stand, cruise_type, **kwargs):
+    logs = stand.to_frame('logs') if cruise_type == 'f' else None
+    return Stand.from_frame(stand.to_frame('trees'), cruise_type, stand.name, stand.plot_factor, logs=logs, **kwargs)
+
+
+def read_csv_rows(file):
+    types = {'U': str, 'U2': str, 'i8': int, 'f8': float}
+    with open(file, 'r', newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == [col for col, _ in LOG_TABLE_COLUMNS]
+    return [[types[dtype](val) for val, (_, dtype) in zip(row, LOG_TABLE_COLUMNS)] for row in rows[1:]]
+
+
+def get_stand_logs(stand):
+    return [[stand.name, i + 1, j + 1, num, log.stem_height, log.length, log.grade, log.defect, log.top_dib, log.bf, log.cf]
+            for i, plot in enumerate(stand.plots) for j, tree in enumerate(plot.trees) for num, log in tree.logs.items()]
+
+
+def test_frame_round_trip(example_stand):
+    stand = import_stand(*example_stand)
+    rebuilt = frame_stand(stand, example_stand[3])
+    assert rebuilt.plot_count == stand.plot_count
+    assert rebuilt.get_console_report_text() == stand.get_console_report_text()
+    assert rebuilt.to_frame('trees').equals(stand.to_frame('trees'))
+    assert rebuilt.to_frame('logs').equals(stand.to_frame('logs'))
+
+
+def test_frame_columns(example_stand):
+    stand = import_stand(*example_stand)
+    trees = stand.to_frame('trees')
+    logs = stand.to_frame('logs')
+    assert len(trees) == sum(len(plot.trees) for plot in stand.plots)
+    assert len(logs) == sum(len(tree.logs) for plot in stand.plots for tree in plot.trees)
+    assert trees['tpa'].sum() / stand.plot_count == pytest.approx(stand.tpa)
+    assert trees['bf_ac'].sum() / stand.plot_count == pytest.approx(stand.bf_ac)
+    assert (logs['bf_ac'].sum() / stand.plot_count) == pytest.approx(stand.bf_ac)
+
+    with pytest.raises(ValueError):
+        stand.to_frame('plots')
+
+
+def test_from_frame_fills_missing_heights(ex1):
+    trees = ex1.to_frame('trees').copy()
+    trees.loc[::3, 'height'] = 0
+    rebuilt = Stand.from_frame(trees, 'q', 'EX1', -20)
+    filled = [tree.height for plot in rebuilt.plots for tree in plot.trees]
+    assert all(height > 0 for height in filled)
+    assert filled[1] == trees['height'][1]
+
+
+def test_from_frame_lower_case_codes(ok2):
+    trees = ok2.to_frame('trees').copy()
+    logs = ok2.to_frame('logs').copy()
+    trees['species'] = trees['species'].str.lower()
+    logs['grade'] = logs['grade'].str.lower()
+    rebuilt = Stand.from_frame(trees, 'f', 'OK2', 46.94, logs=logs)
+    assert rebuilt.get_console_report_text() == ok2.get_console_report_text()
+
+
+def test_from_frame_checks_codes(ok2):
+    trees = ok2.to_frame('trees').copy()
+    logs = ok2.to_frame('logs').copy()
+    trees.loc[2, 'species'] = 'XX'
+    trees.loc[5, 'species'] = ''
+    logs.loc[4, 'grade'] = 'Q9'
+    logs.loc[7, 'tree'] = len(trees)
+    with pytest.raises(ImportSheetError) as error:
+        Stand.from_frame(trees, 'f', 'OK2', 46.94, logs=logs)
+    assert error.value.message.splitlines()[2:] == ['-Tree 2 Incorrect Species Code (XX)',
+                                                    '-Tree 5 Incorrect Species Code ()',
+                                                    '-Log 4 Incorrect Grade Code (Q9)',
+                                                    f'-Log 7 Tree ({len(trees)}) is not a row of the trees']
+
+
+def test_from_frame_missing_columns(ok2):
+    with pytest.raises(ImportSheetError) as error:
+        Stand.from_frame(ok2.to_frame('trees').drop(columns=['dbh']), 'f', 'OK2', 46.94)
+    assert 'Trees are missing the column (dbh)' in error.value.message
+    assert 'Full cruises need a logs DataFrame' in error.value.message
+
+
+@pytest.mark.parametrize('stand_args', FULL_STANDS, ids=[stand[0] for stand in FULL_STANDS])
+def test_log_table_csv_parquet_and_arrow_agree(stand_args, tmp_path):
+    stand = import_stand(*stand_args)
+    stand.log_table_to_csv('logs', str(tmp_path))
+    stand.log_table_to_parquet('logs', str(tmp_path))
+    stand.log_table_to_parquet('logs', str(tmp_path), file_format='arrow')
+
+    expected = get_stand_logs(stand)
+    csv_rows = read_csv_rows(str(tmp_path / 'logs.csv'))
+    assert csv_rows == expected
+
+    cols = [col for col, _ in LOG_TABLE_COLUMNS]
+    table = parquet.read_table(str(tmp_path / 'logs.parquet'))
+    assert table.column_names == cols
+    assert [list(row.values()) for row in table.to_pylist()] == expected
+    with ipc.open_file(str(tmp_path / 'logs.arrow')) as arrow_file:
+        assert [list(row.values()) for row in arrow_file.read_all().to_pylist()] == expected
+
+
+def test_log_table_chunks(ok2, tmp_path):
+    log_table_to_csv(ok2, str(tmp_path / 'whole.csv'))
+    log_table_to_csv(ok2, str(tmp_path / 'chunks.csv'), chunk_size=7)
+    assert (tmp_path / 'whole.csv').read_text() == (tmp_path / 'chunks.csv').read_text()
+
+    log_table_to_arrow(ok2, str(tmp_path / 'chunks.parquet'), chunk_size=7)
+    parquet_file = parquet.ParquetFile(str(tmp_path / 'chunks.parquet'))
+    log_count = len(get_stand_logs(ok2))
+    assert parquet_file.num_row_groups == -(-log_count // 7)
+    assert parquet_file.read().num_rows == log_count
+
+    with pytest.raises(ValueError):
+        log_table_to_arrow(ok2, str(tmp_path / 'logs.orc'), file_format='orc')
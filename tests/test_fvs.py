@@ -0,0 +1,142 @@
+import sqlite3
+import pytest
+from openpyxl import load_workbook
+from treetopper import (
+    FVS,
+    ThinBA
+)
+from treetopper import fvs as fvs_module
+from treetopper._constants import DIGEST_COLS
+from conftest import import_stand
+
+
+def get_fvs(*stands):
+    fvs = FVS()
+    for stand in stands:
+        fvs.add_stand(stand, 'PN', 612, 6, 45, 'DF', 110)
+    return fvs
+
+
+def get_sql_counts(db_path):
+    con = sqlite3.connect(db_path)
+    stands = dict(con.execute('SELECT Stand_ID, COUNT(*) FROM FVS_StandInit GROUP BY Stand_ID').fetchall())
+    trees = dict(con.execute('SELECT Stand_ID, COUNT(*) FROM FVS_TreeInit GROUP BY Stand_ID').fetchall())
+    digests = dict(con.execute(f'SELECT Stand_ID, Digest FROM {DIGEST_COLS[0]}').fetchall())
+    con.close()
+    return stands, trees, digests
+
+
+def test_sqlite_sync_writes_only_changed_stands(ex1, ok2, tmp_path):
+    db_path = str(tmp_path / 'fvs.db')
+    fvs = get_fvs(ex1, ok2)
+    fvs.sqlite_db('fvs.db', str(tmp_path), sync=True)
+    assert fvs.synced_stands == ['EX1', 'OK2']
+    stands, trees, digests = get_sql_counts(db_path)
+    assert stands == {'EX1': 1, 'OK2': 1}
+
+    fvs.sqlite_db('fvs.db', str(tmp_path), sync=True)
+    assert fvs.synced_stands == []
+    assert get_sql_counts(db_path) == (stands, trees, digests)
+
+    ex1.remove_plot(0)
+    fvs.sqlite_db('fvs.db', str(tmp_path), sync=True)
+    assert fvs.synced_stands == ['EX1']
+    new_stands, new_trees, new_digests = get_sql_counts(db_path)
+    assert new_stands == stands
+    assert new_trees['EX1'] < trees['EX1'] and new_trees['OK2'] == trees['OK2']
+    assert new_digests['EX1'] != digests['EX1'] and new_digests['OK2'] == digests['OK2']
+
+
+def test_sqlite_append_to_synced_db_drops_digests(ex1, ok2, tmp_path):
+    db_path = str(tmp_path / 'fvs.db')
+    get_fvs(ex1, ok2).sqlite_db('fvs.db', str(tmp_path), sync=True)
+    _, trees, _ = get_sql_counts(db_path)
+
+    get_fvs(ex1).sqlite_db('fvs.db', str(tmp_path))
+    stands, appended, digests = get_sql_counts(db_path)
+    assert stands['EX1'] == 2 and appended['EX1'] == 2 * trees['EX1']
+    assert list(digests) == ['OK2']
+
+    # The next sync replaces every row of the appended stand
+    fvs = get_fvs(ex1, ok2)
+    fvs.sqlite_db('fvs.db', str(tmp_path), sync=True)
+    assert fvs.synced_stands == ['EX1']
+    stands, synced, digests = get_sql_counts(db_path)
+    assert stands == {'EX1': 1, 'OK2': 1}
+    assert synced == trees
+    assert sorted(digests) == ['EX1', 'OK2']
+
+
+def test_excel_append_to_synced_db_drops_digests(ex1, ok2, tmp_path):
+    db_path = str(tmp_path / 'fvs.xlsx')
+    get_fvs(ex1, ok2).excel_db('fvs.xlsx', str(tmp_path), sync=True)
+    get_fvs(ex1).excel_db('fvs.xlsx', str(tmp_path))
+
+    wb = load_workbook(db_path, read_only=True)
+    assert [row[0] for row in wb[DIGEST_COLS[0]].iter_rows(min_row=2, values_only=True)] == ['OK2']
+    wb.close()
+
+    fvs = get_fvs(ex1, ok2)
+    fvs.excel_db('fvs.xlsx', str(tmp_path), sync=True)
+    assert fvs.synced_stands == ['EX1']
+    wb = load_workbook(db_path, read_only=True)
+    assert sorted(row[0] for row in wb['FVS_StandInit'].iter_rows(min_row=2, values_only=True)) == ['EX1', 'OK2']
+    wb.close()
+
+
+def get_sql_tree_counts(db_path, stand_name):
+    con = sqlite3.connect(db_path)
+    counts = [row[0] for row in con.execute('SELECT Tree_Count FROM FVS_TreeInit WHERE Stand_ID = ? ORDER BY rowid', (stand_name,))]
+    con.close()
+    return counts
+
+
+def test_sqlite_tree_count_of_residual_stand(ex1, ok2, tmp_path):
+    db_path = str(tmp_path / 'fvs.db')
+    thin = ThinBA(ok2, 140, species_to_cut=['DF', 'WH', 'RA'], max_dbh_to_cut=24)
+    residual = thin.residual_stand('OK2_RES')
+    get_fvs(ex1, residual).sqlite_db('fvs.db', str(tmp_path))
+
+    assert get_sql_tree_counts(db_path, 'EX1') == [1] * sum(len(plot.trees) for plot in ex1.plots)
+
+    cells = {(spp, dbh): i for i, (spp, dbh) in enumerate(zip(thin.table.species.tolist(), thin.table.dbh.tolist()))}
+    expected = [thin.residual_ratio[cells[(tree.species, int(tree.dbh))]] for plot in residual.plots for tree in plot.trees]
+    counts = get_sql_tree_counts(db_path, 'OK2_RES')
+    assert counts == pytest.approx(expected)
+    assert any(count < 1 for count in counts) and all(0 < count <= 1 for count in counts)
+
+    # The scaled records are the residual trees per acre, the plot factor's trees per acre times the tree count
+    rows = list(get_fvs(residual).get_tree_rows())
+    trees = [tree for plot in residual.plots for tree in plot.trees]
+    for row, tree in zip(rows, trees):
+        assert row[4] * (46.94 / tree.ba) == pytest.approx(tree.tpa)
+
+
+def test_sqlite_indexes_rebuilt_only_for_large_loads(ex1, ok2, tmp_path, monkeypatch):
+    statements = []
+
+    def traced_connect(db_path):
+        con = sqlite3.connect(db_path)
+        con.set_trace_callback(statements.append)
+        return con
+    monkeypatch.setattr(fvs_module, 'sqcon', traced_connect)
+
+    def get_drops():
+        drops = [sql for sql in statements if sql.startswith('DROP INDEX')]
+        statements.clear()
+        return drops
+
+    # A new database is rebuilt, a small append keeps the indexes, a load larger than half of the table is rebuilt
+    get_fvs(ok2).sqlite_db('fvs.db', str(tmp_path))
+    assert len(get_drops()) == 2
+    get_fvs(ex1).sqlite_db('fvs.db', str(tmp_path))
+    assert get_drops() == []
+    get_fvs(ok2).sqlite_db('fvs.db', str(tmp_path))
+    assert len(get_drops()) == 2
+
+    con = sqlite3.connect(str(tmp_path / 'fvs.db'))
+    indexes = [row[0] for row in con.execute("SELECT name FROM sqlite_master WHERE type = 'index' ORDER BY name").fetchall()]
+    assert indexes == ['FVS_StandInit_Stand_ID', 'FVS_TreeInit_Stand_ID']
+    tree_rows = 2 * len(list(get_fvs(ok2).get_tree_rows())) + len(list(get_fvs(ex1).get_tree_rows()))
+    assert con.execute('SELECT COUNT(*) FROM FVS_TreeInit').fetchone()[0] == tree_rows
+    con.close()
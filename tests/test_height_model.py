@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from treetopper import (
+    Stand,
+    HeightModel
+)
+from treetopper.height_model import HEIGHT_FORMS
+from treetopper._import_from_sheets import read_from_sheet
+from conftest import example_file
+
+
+def assert_same_fits(fits, expected):
+    assert list(fits) == list(expected)
+    for species in expected:
+        assert fits[species] == pytest.approx(expected[species])
+
+
+def get_measured(clean):
+    measured = [row for row in clean if row[5]]
+    return [row[3] for row in measured], [row[4] for row in measured], [row[5] for row in measured]
+
+
+@pytest.mark.parametrize('form', list(HEIGHT_FORMS))
+def test_fits_match_least_squares(form):
+    species, dbh, height = get_measured(read_from_sheet(example_file('Example_CSV_quick.csv'), 'EX1', 'q'))
+    model = HeightModel(form, min_trees=3)
+    model.add_trees(species, dbh, height)
+
+    x = HEIGHT_FORMS[form](np.array(dbh))
+    y = np.log(np.array(height) - 4.5)
+    b1, b0 = np.polyfit(x, y, 1)
+    assert model.fits['pooled'] == pytest.approx([b0, b1])
+    for sp in set(species):
+        keep = np.array(species) == sp
+        if keep.sum() >= 3 and np.ptp(x[keep]) > 0:
+            b1, b0 = np.polyfit(x[keep], y[keep], 1)
+            assert model.fits[sp] == pytest.approx([b0, b1])
+        else:
+            assert sp not in model.fits
+
+
+def test_species_without_fit_use_pooled():
+    model = HeightModel(min_trees=5)
+    model.add_trees(['DF'] * 6 + ['WH'] * 2, [10, 12, 14, 18, 22, 30, 15, 20], [70, 80, 88, 100, 115, 130, 90, 105])
+    assert 'WH' not in model.fits
+    pooled = HeightModel(min_trees=100)
+    pooled.add_trees(['XX'] * 8, [10, 12, 14, 18, 22, 30, 15, 20], [70, 80, 88, 100, 115, 130, 90, 105])
+    assert model.predict(['WH'], [16]) == pytest.approx(pooled.predict(['XX'], [16]))
+    assert model.predict(['DF'], [16]) != pytest.approx(pooled.predict(['XX'], [16]))
+
+
+def test_update_matches_adding_trees_at_once():
+    species, dbh, height = ['DF', 'DF', 'WH', 'DF', 'WH', 'RC'], [10, 14, 18, 22, 26, 30], [70, 88, 100, 115, 122, 130]
+    whole = HeightModel(min_trees=2)
+    whole.add_trees(species, dbh, height)
+    first, second = HeightModel(min_trees=2), HeightModel(min_trees=2)
+    first.add_trees(species[:3], dbh[:3], height[:3])
+    second.add_trees(species[3:], dbh[3:], height[3:])
+    first.update(second)
+    assert_same_fits(first.fits, whole.fits)
+    assert HeightModel.from_dict(whole.to_dict()).fits == whole.fits
+    with pytest.raises(ValueError):
+        first.update(HeightModel('curtis'))
+
+
+def test_import_fills_missing_heights_from_model():
+    file = example_file('Example_CSV_quick.csv')
+    clean = read_from_sheet(file, 'EX1', 'q')
+    model = HeightModel('wykoff', min_trees=5)
+    model.add_trees(*get_measured(clean))
+    assert any(not row[5] for row in clean)
+
+    plots = {}
+    for row in clean:
+        height = row[5] if row[5] else model.predict([row[3]], [row[4]])[0]
+        plots.setdefault(row[1], []).append(int(height))
+
+    stand = Stand('EX1', -20)
+    stand.height_model = HeightModel('wykoff', min_trees=5)
+    stand.import_sheet_quick(file)
+    assert [[tree.height for tree in plot.trees] for plot in stand.plots] == list(plots.values())
+    assert_same_fits(stand.height_model.fits, model.fits)
+
+
+@pytest.mark.parametrize('sorted_by_plot', [False, True], ids=['spilled', 'sorted'])
+def test_stream_import_with_model_matches_batch(sorted_by_plot):
+    batch = Stand('OK2', 46.94)
+    batch.height_model = HeightModel('curtis')
+    batch.import_sheet_full(example_file('Example_CSV_full.csv'))
+    stream = Stand('OK2', 46.94)
+    stream.height_model = HeightModel('curtis')
+    stream.import_sheet_full(example_file('Example_CSV_full.csv'), stream=True, sorted_by_plot=sorted_by_plot)
+    assert stream.table_data == batch.table_data
@@ -0,0 +1,112 @@
+import random
+import pytest
+from treetopper import ImportSheetError
+from treetopper._constants import (
+    SHEET_ROW_COL_CONV,
+    SHEET_FULL_LOG_CONV
+)
+from treetopper._utils import is_err_num
+from treetopper._import_from_sheets import (
+    read_csv,
+    check_columns,
+    error_check_quick,
+    error_check_full
+)
+from treetopper import stand as stand_module
+from conftest import (
+    data_file,
+    import_stand
+)
+
+
+# [Sheet in tests/data, Stand name, Error check], the expected messages are from treetopper 1.1.1
+ERROR_SHEETS = [['errors_quick', 'EX1', error_check_quick],
+                ['errors_full', 'OK1', error_check_full]]
+
+# Cells for comparing the column checks with checking each cell with SHEET_ROW_COL_CONV and SHEET_FULL_LOG_CONV
+NUMBER_CELLS = ['12', ' 7 ', '+3', '-4', '0', '-0', '5.5', '.5', '5.', '.', '-', '+-1', '1e3', 'nan', 'inf', '1_000',
+                '\u0665', '12a', '99999999999999999999', '', None, 17, 23.9, -2.5, 0.0, True]
+SPECIES_CELLS = ['DF', 'df', 'WH', 'rc', ' DF', 'XX', '', None]
+GRADE_CELLS = ['S2', 's3', '2s', 'CR', 'cr', 'Q9', '', None]
+
+
+def check_each_cell(rows, cruise_type):
+    """Returns the messages of checking each cell with SHEET_ROW_COL_CONV and SHEET_FULL_LOG_CONV, and the values of each row
+       (the values of the main columns, then [Length, Grade, Defect] of each log)"""
+    errors = []
+    values = []
+    for i, row in enumerate(rows):
+        # [Cell index, Col number, Check]
+        checks = [[j, j, SHEET_ROW_COL_CONV[j]] for j in range(1, 8 if cruise_type == 'q' else 6)]
+        if cruise_type == 'f':
+            checks.append([6, 7, lambda val, row_num, col_num: is_err_num(val, row_num, col_num, int, default=1)])
+            checks += [[j + k, j + k, SHEET_FULL_LOG_CONV[k]] for j in range(7, len(row), 4) if row[j] not in ['', None]
+                       for k in range(4)]
+        checked = [check(row[j], i, col_num) for j, col_num, check in checks]
+        errors += [message for err, _, message in checked if err]
+        row_values = [val for _, val, _ in checked]
+        if cruise_type == 'f':
+            row_values = row_values[:5] + [row_values[k:k + 3] for k in range(6, len(row_values), 4)]
+        values.append(row_values)
+    return errors, values
+
+
+def get_clean_values(clean_rows, cruise_type):
+    if cruise_type == 'q':
+        return [row[1:] for row in clean_rows]
+    return [row[1:6] + [log[1:] for log in row[6]] for row in clean_rows]
+
+
+@pytest.mark.parametrize('sheet, stand_name, error_check', ERROR_SHEETS, ids=[sheet[0] for sheet in ERROR_SHEETS])
+def test_error_messages_match_baseline(sheet, stand_name, error_check):
+    with pytest.raises(ImportSheetError) as error:
+        error_check('SHEET', read_csv(data_file(f'{sheet}.csv'), stand_name))
+    with open(data_file(f'{sheet}.txt'), 'r') as f:
+        assert error.value.message == f.read()
+
+
+@pytest.mark.parametrize('sorted_by_plot', [False, True], ids=['spilled', 'sorted'])
+def test_stream_matches_batch_import(example_stand, sorted_by_plot):
+    batch = import_stand(*example_stand)
+    stream = import_stand(*example_stand, stream=True, sorted_by_plot=sorted_by_plot)
+    assert stream.get_console_report_text() == batch.get_console_report_text()
+    assert stream.table_data == batch.table_data
+    assert stream.logs == batch.logs
+
+
+def test_stream_in_small_batches(monkeypatch, ok2):
+    monkeypatch.setattr(stand_module, 'STREAM_PLOT_BATCH', 2)
+    stream = import_stand('OK2', 46.94, 'Example_CSV_full.csv', 'f', stream=True)
+    assert stream.table_data == ok2.table_data
+
+
+@pytest.mark.parametrize('cruise_type', ['q', 'f'])
+@pytest.mark.parametrize('seed', range(5))
+def test_check_columns_matches_each_cell(cruise_type, seed):
+    rand = random.Random(seed)
+    for good in [False, True]:
+        number_cells = ['12', ' 7 ', '+3', '0', '-0', 17, 23.9, 0.0] if good else NUMBER_CELLS
+        species_cells = SPECIES_CELLS[:4] if good else SPECIES_CELLS
+        grade_cells = GRADE_CELLS[:5] if good else GRADE_CELLS
+        rows = []
+        for i in range(40):
+            row = ['1'] + [rand.choice(number_cells) for _ in range(7 if cruise_type == 'q' else 6)]
+            row[3] = rand.choice(species_cells)
+            if good:
+                row[1:3] = [str(i + 1), '1']
+                row[4] = rand.choice(['12', 23.9, '5.5'])
+            if cruise_type == 'f':
+                for _ in range(rand.randint(0, 3)):
+                    row += [rand.choice(number_cells), rand.choice(grade_cells)] + [rand.choice(number_cells) for _ in range(2)]
+                    if good:
+                        row[-4] = rand.choice(['40', 32, '16'])
+            rows.append(row)
+
+        expected_errors, expected_values = check_each_cell(rows, cruise_type)
+        clean_rows, errors = check_columns(rows, cruise_type)
+        assert errors == expected_errors
+        if good:
+            assert not errors
+            values = get_clean_values(clean_rows, cruise_type)
+            assert values == expected_values
+            assert repr(values) == repr(expected_values)
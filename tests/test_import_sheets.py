@@ -0,0 +1,77 @@
+import csv
+import pytest
+from treetopper import (
+    Stand,
+    ImportSheetError
+)
+from conftest import (
+    example_file,
+    data_file,
+    import_stand
+)
+
+
+def split_sheet(file_name, stand_name, directory, pieces):
+    """Splits the stand's rows of an example cruise sheet by plot into pieces CSV files, returns the file paths"""
+    with open(example_file(file_name), 'r', newline='') as f:
+        rows = list(csv.reader(f))
+    plots = []
+    for row in rows[1:]:
+        if row[0].upper() == stand_name.upper() and row[1] not in plots:
+            plots.append(row[1])
+    file_paths = []
+    for i in range(pieces):
+        piece_plots = plots[i::pieces]
+        file_path = str(directory / f'{stand_name}_{i}.csv')
+        with open(file_path, 'w', newline='') as f:
+            csv.writer(f).writerows([rows[0]] + [row for row in rows[1:] if row[0] == stand_name and row[1] in piece_plots])
+        file_paths.append(file_path)
+    return file_paths
+
+
+@pytest.mark.parametrize('processes', [0, None], ids=['in_process', 'process_pool'])
+def test_import_sheets_keeps_file_order(tmp_path, processes):
+    file_paths = split_sheet('Example_CSV_full.csv', 'OK2', tmp_path, 3)
+    for order in [file_paths, file_paths[::-1]]:
+        stand = Stand('OK2', 46.94)
+        stand.import_sheets(order, 'f', processes=processes)
+
+        expected = Stand('OK2', 46.94)
+        for file_path in order:
+            expected.import_sheet_full(file_path)
+        assert stand.table_data == expected.table_data
+        assert stand.get_console_report_text() == expected.get_console_report_text()
+
+
+def test_import_sheets_matches_one_sheet(tmp_path):
+    ex1 = import_stand('EX1', -20, 'Example_CSV_quick.csv', 'q')
+    file_paths = split_sheet('Example_CSV_quick.csv', 'EX1', tmp_path, 1)
+    stand = Stand('EX1', -20)
+    stand.import_sheets(file_paths, 'q', processes=0)
+    assert stand.get_console_report_text() == ex1.get_console_report_text()
+
+
+def test_import_sheets_raises_first_error(tmp_path):
+    file_paths = split_sheet('Example_CSV_quick.csv', 'EX1', tmp_path, 2)
+    stand = Stand('EX1', -20)
+    with pytest.raises(ImportSheetError) as error:
+        stand.import_sheets(file_paths + [data_file('errors_quick.csv')], 'q', processes=0)
+    assert 'errors_quick.csv' in error.value.message
+    assert stand.plot_count == 0
+    assert stand.input_hash is None
+
+
+@pytest.mark.parametrize('options', [{}, {'stream': True}], ids=['batch', 'stream'])
+def test_sheet_with_errors_keeps_input_hash(options):
+    stand = import_stand('EX1', -20, 'Example_CSV_quick.csv', 'q')
+    input_hash = stand.input_hash
+    with pytest.raises(ImportSheetError):
+        stand.import_sheet_quick(data_file('errors_quick.csv'), **options)
+    assert stand.input_hash == input_hash
+
+    with pytest.raises(ImportSheetError):
+        stand.import_sheets([example_file('Example_CSV_quick.csv'), data_file('errors_quick.csv')], 'q', processes=0)
+    assert stand.input_hash == input_hash
+
+    stand.import_sheet_quick(example_file('Example_CSV_quick.csv'), **options)
+    assert stand.input_hash not in [None, input_hash]
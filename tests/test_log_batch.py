@@ -0,0 +1,111 @@
+import pytest
+from treetopper import TimberFull
+from treetopper import _log_batch
+from treetopper._log_batch import add_full_logs
+from conftest import (
+    EXAMPLE_STANDS,
+    import_stand
+)
+
+
+FULL_STANDS = [stand for stand in EXAMPLE_STANDS if stand[3] == 'f']
+TREE_ATTRS = ['bf', 'cf', 'bf_ac', 'cf_ac', 'vbar']
+
+
+def get_sheet_trees(stand):
+    """Returns [tree args, logs] of every tree of the stand, the logs as [stem height, length, grade, defect]"""
+    return [[[stand.plot_factor, tree.species, tree.dbh, tree.height],
+             [[log.stem_height, log.length, log.grade, log.defect] for log in tree.logs.values()]]
+            for plot in stand.plots for tree in plot.trees]
+
+
+def add_each_log(tree_args, logs):
+    tree = TimberFull(*tree_args)
+    for log in logs:
+        tree.add_log(*log)
+    return tree
+
+
+def assert_same_tree(tree, expected):
+    assert [tree[attr] for attr in TREE_ATTRS] == [expected[attr] for attr in TREE_ATTRS]
+    assert list(tree.logs) == list(expected.logs)
+    for num in expected.logs:
+        log = {key: val for key, val in vars(tree.logs[num]).items() if key != 'tree'}
+        expected_log = {key: val for key, val in vars(expected.logs[num]).items() if key != 'tree'}
+        assert log == expected_log
+        assert tree.logs[num].tree is tree
+
+
+@pytest.fixture(params=FULL_STANDS, ids=[stand[0] for stand in FULL_STANDS])
+def sheet_trees(request):
+    return get_sheet_trees(import_stand(*request.param))
+
+
+def test_add_logs_matches_add_log(sheet_trees):
+    for tree_args, logs in sheet_trees:
+        tree = TimberFull(*tree_args)
+        tree.add_logs(logs)
+        assert_same_tree(tree, add_each_log(tree_args, logs))
+
+
+def test_batch_matches_add_log(sheet_trees):
+    trees = [TimberFull(*tree_args) for tree_args, _ in sheet_trees]
+    add_full_logs(trees, [logs for _, logs in sheet_trees])
+    for tree, (tree_args, logs) in zip(trees, sheet_trees):
+        assert_same_tree(tree, add_each_log(tree_args, logs))
+
+
+def test_add_logs_after_add_log(sheet_trees):
+    for tree_args, logs in sheet_trees:
+        tree = TimberFull(*tree_args)
+        tree.add_log(*logs[0])
+        tree.add_logs(logs[1:])
+        assert_same_tree(tree, add_each_log(tree_args, logs))
+
+
+def test_top_dib_recheck_fallback(sheet_trees, monkeypatch):
+    # Every top DIB counts as close to a whole number, so every log goes through the Log Class' own taper equation
+    monkeypatch.setattr(_log_batch, 'DIB_RECHECK', 1)
+    trees = [TimberFull(*tree_args) for tree_args, _ in sheet_trees]
+    add_full_logs(trees, [logs for _, logs in sheet_trees])
+    for tree, (tree_args, logs) in zip(trees, sheet_trees):
+        assert_same_tree(tree, add_each_log(tree_args, logs))
+
+
+def test_missing_grade_fallback():
+    # Logs without a grade are graded by the Log Class from the official grades
+    tree_args = [-20, 'DF', 29.5, 119]
+    logs = [[42, 40, '', 5], [83, 40, 's3', 0], [102, 18, '', 10]]
+    tree = TimberFull(*tree_args)
+    tree.add_logs(logs)
+    expected = add_each_log(tree_args, logs)
+    assert_same_tree(tree, expected)
+    assert all(log.grade for log in tree.logs.values())
+
+
+def test_above_height_matches_add_log():
+    # The Czaplewski equation still gives a DIB above the tree's height
+    tree_args = [-20, 'DF', 29.5, 119]
+    logs = [[42, 40, 'S2', 5], [150, 40, 'S2', 0]]
+    tree = TimberFull(*tree_args)
+    tree.add_logs(logs)
+    assert_same_tree(tree, add_each_log(tree_args, logs))
+
+
+@pytest.mark.parametrize('species, bad_log', [['DF', [42, 40, 'XX', 0]], ['RA', [150, 40, 'S2', 0]], ['RC', [150, 40, 'CR', 0]],
+                                              ['JP', [150, 40, 'S2', 0]]],
+                         ids=['unknown grade', 'kozak1969 above height', 'kozak1988 above height', 'wensel above height'])
+def test_bad_log_raises_like_add_log(species, bad_log):
+    tree_args = [-20, species, 29.5, 119]
+    grade = 'CR' if species == 'RC' else 'S2'
+    logs = [[42, 40, grade, 5], bad_log, [102, 18, grade, 10]]
+
+    expected = TimberFull(*tree_args)
+    with pytest.raises(Exception) as expected_error:
+        for log in logs:
+            expected.add_log(*log)
+
+    tree = TimberFull(*tree_args)
+    with pytest.raises(expected_error.type):
+        tree.add_logs(logs)
+    assert_same_tree(tree, expected)
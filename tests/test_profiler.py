@@ -0,0 +1,120 @@
+import pytest
+from treetopper import (
+    Stand,
+    ImportCache,
+    HeightModel
+)
+from treetopper.profiler import (
+    PipelineProfile,
+    PHASES
+)
+from treetopper.__main__ import main
+from treetopper._phases import set_phase_callback
+from conftest import (
+    EXAMPLE_STANDS,
+    example_file,
+    import_stand
+)
+
+
+def profile_stand(name, plot_factor, file_name, cruise_type, **kwargs):
+    profile = PipelineProfile(example_file(file_name), name, cruise_type, plot_factor, **kwargs)
+    profile.run()
+    return profile
+
+
+def get_phase_names(profile):
+    return [phase for phase, _, _ in profile.phases]
+
+
+@pytest.mark.parametrize('options', [{}, {'stream': True}, {'stream': True, 'sorted_by_plot': True}],
+                         ids=['batch', 'stream', 'sorted'])
+def test_profile_matches_import(example_stand, options):
+    profile = profile_stand(*example_stand, memory=False, **options)
+    stand = import_stand(*example_stand, **options)
+    assert profile.stand.get_console_report_text() == stand.get_console_report_text()
+
+    names = get_phase_names(profile)
+    assert names == [phase for phase in PHASES + ['other'] if phase in names]
+    for phase in ['parse', 'validate', 'heights', 'taper/bucking', 'aggregation', 'summaries', 'pdf layout', 'fvs export']:
+        assert phase in names
+    assert 'cache' not in names
+    assert all(seconds >= 0 for _, seconds, _ in profile.phases)
+
+
+def test_profile_height_model():
+    name, plot_factor, file_name, _ = EXAMPLE_STANDS[0]
+    profile = profile_stand(*EXAMPLE_STANDS[0], height_model='curtis')
+    assert 'heights' in get_phase_names(profile)
+    assert profile.stand.height_model.form == 'curtis'
+
+    stand = Stand(name, plot_factor)
+    stand.height_model = HeightModel('curtis')
+    stand.import_sheet_quick(example_file(file_name))
+    assert profile.stand.get_console_report_text() == stand.get_console_report_text()
+
+
+def test_profile_cache(tmp_path):
+    cache = ImportCache(str(tmp_path))
+    miss = profile_stand(*EXAMPLE_STANDS[3], memory=False, cache=cache)
+    hit = profile_stand(*EXAMPLE_STANDS[3], memory=False, cache=cache)
+    assert cache.stats['hits'] == 1
+    assert 'cache' in get_phase_names(miss)
+    assert 'taper/bucking' in get_phase_names(miss)
+    assert 'cache' in get_phase_names(hit)
+    assert 'taper/bucking' not in get_phase_names(hit)
+    assert hit.stand.get_console_report_text() == miss.stand.get_console_report_text()
+
+
+def test_profile_memory_and_report():
+    profile = profile_stand(*EXAMPLE_STANDS[0])
+    assert any(peak > 0 for _, _, peak in profile.phases)
+    text = profile.get_report_text()
+    assert text.startswith('treetopper profile -- Example_CSV_quick.csv -- Stand EX1 (q)')
+    for phase, _, _ in profile.phases:
+        assert f'\n{phase}' in text
+    assert text.splitlines()[-1].startswith('TOTAL')
+
+
+def test_profile_restores_callback():
+    def callback(name, starting):
+        pass
+    previous = set_phase_callback(callback)
+    try:
+        profile_stand(*EXAMPLE_STANDS[0], memory=False)
+        assert set_phase_callback(None) is callback
+    finally:
+        set_phase_callback(previous)
+
+
+def test_profile_files(tmp_path):
+    prof_file = tmp_path / 'ok2.prof'
+    collapsed_file = tmp_path / 'ok2.txt'
+    profile_stand(*EXAMPLE_STANDS[3], memory=False, prof_file=str(prof_file), collapsed_file=str(collapsed_file))
+    assert prof_file.stat().st_size > 0
+    lines = collapsed_file.read_text().splitlines()
+    assert lines
+    for line in lines:
+        stack, count = line.rsplit(' ', 1)
+        assert stack.split(';')[0] in PHASES + ['other']
+        assert int(count) > 0
+
+
+def test_profile_bad_cruise_type():
+    with pytest.raises(ValueError):
+        PipelineProfile(example_file('Example_CSV_quick.csv'), 'EX1', 'x')
+
+
+def test_profile_command(tmp_path, capsys):
+    args = ['profile', example_file('Example_CSV_full.csv'), '--stand', 'OK2', '--type', 'f', '--plot-factor', '46.94',
+            '--stream', '--cache', str(tmp_path), '--no-memory']
+    assert main(args) == 0
+    out = capsys.readouterr().out
+    assert 'stream, cache' in out
+    assert '\ncache' in out
+
+    # Stands with a height_model are not cached
+    assert main(args + ['--height-model', 'wykoff']) == 0
+    out = capsys.readouterr().out
+    assert 'stream, wykoff height model, cache' in out
+    assert '\ncache' not in out
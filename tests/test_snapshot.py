@@ -0,0 +1,91 @@
+import json
+import numpy as np
+import pytest
+from os.path import join
+from treetopper import (
+    Stand,
+    SnapshotError
+)
+from treetopper import _columns
+from treetopper._snapshot import HEADER_FILE
+from treetopper._utils import get_input_hash
+from conftest import (
+    example_file,
+    import_stand,
+    rebuild_stand
+)
+
+
+def test_snapshot_round_trip(example_stand, tmp_path):
+    stand = import_stand(*example_stand)
+    stand.save(str(tmp_path))
+    loaded = Stand.load(str(tmp_path))
+
+    assert loaded._plots is None
+    assert loaded.get_console_report_text() == stand.get_console_report_text()
+    assert loaded.species_stats == stand.species_stats
+    assert isinstance(loaded._columns['trees']['dbh'], np.memmap)
+
+    # The plots are only restored when they are needed
+    assert loaded.table_data == stand.table_data
+    assert loaded._plots is not None
+    assert loaded.logs == stand.logs
+    assert loaded.species_gross == stand.species_gross
+    assert rebuild_stand(loaded).get_console_report_text() == stand.get_console_report_text()
+
+
+def test_snapshot_restores_in_chunks(monkeypatch, ok2, tmp_path):
+    monkeypatch.setattr(_columns, 'RESTORE_CHUNK', 3)
+    ok2.save(str(tmp_path))
+    loaded = Stand.load(str(tmp_path))
+    assert loaded.table_data == ok2.table_data
+    for plot, loaded_plot in zip(ok2.plots, loaded.plots):
+        for tree, loaded_tree in zip(plot.trees, loaded_plot.trees):
+            assert list(tree.logs) == list(loaded_tree.logs)
+            assert [log.bf_ac for log in tree.logs.values()] == [log.bf_ac for log in loaded_tree.logs.values()]
+
+
+def test_snapshot_changes_after_load(ex1, tmp_path):
+    ex1.save(str(tmp_path))
+    loaded = Stand.load(str(tmp_path))
+    loaded.remove_plot(0)
+    ex1.remove_plot(0)
+    assert loaded.get_console_report_text() == ex1.get_console_report_text()
+
+
+def test_snapshot_aggregate_totals(ok2, tmp_path):
+    ok2.save(str(tmp_path))
+    loaded = Stand.load(str(tmp_path))
+    assert vars(loaded.aggregate) == vars(ok2.aggregate)
+
+    # The Fraction totals are written as small numerators and denominators
+    with open(join(str(tmp_path), HEADER_FILE), 'r') as f:
+        totals = [numbers for line in f.read().split('"__fraction__": "')[1:] for numbers in line.split('"')[0].split('/')]
+    assert totals
+    assert max(len(numbers.lstrip('-')) for numbers in totals) < 60
+
+
+def test_snapshot_stale_input_hash(tmp_path):
+    stand = import_stand('EX1', -20, 'Example_CSV_quick.csv', 'q')
+    stand.save(str(tmp_path))
+    fresh = get_input_hash(example_file('Example_CSV_quick.csv'), 'EX1', 'q', -20)
+    assert Stand.load(str(tmp_path), fresh).input_hash == fresh
+    with pytest.raises(SnapshotError):
+        Stand.load(str(tmp_path), get_input_hash(example_file('Example_CSV_quick.csv'), 'EX1', 'q', -25))
+
+
+def test_snapshot_version_mismatch(ex1, tmp_path):
+    ex1.save(str(tmp_path))
+    header_file = join(str(tmp_path), HEADER_FILE)
+    with open(header_file, 'r') as f:
+        header = json.load(f)
+    header['treetopper_version'] = '0.0.0'
+    with open(header_file, 'w') as f:
+        json.dump(header, f)
+    with pytest.raises(SnapshotError):
+        Stand.load(str(tmp_path))
+
+
+def test_missing_snapshot(tmp_path):
+    with pytest.raises(SnapshotError):
+        Stand.load(str(tmp_path))
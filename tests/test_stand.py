@@ -0,0 +1,216 @@
+import csv
+import pytest
+from zipfile import ZipFile
+from statistics import (
+    mean,
+    variance
+)
+from functools import reduce
+from openpyxl import load_workbook
+from treetopper import (
+    Stand,
+    StandAggregate
+)
+from conftest import (
+    import_stand,
+    rebuild_stand
+)
+
+
+def assert_same_stand(stand, rebuilt):
+    assert stand.get_console_report_text() == rebuilt.get_console_report_text()
+    assert list(stand.species) == list(rebuilt.species)
+    assert stand.species_stats == rebuilt.species_stats
+    assert stand.species_gross == rebuilt.species_gross
+    assert stand.logs == rebuilt.logs
+
+
+def test_remove_plot_matches_rebuild(example_stand):
+    plot_count = len(import_stand(*example_stand).plots)
+    for i in range(plot_count):
+        stand = import_stand(*example_stand)
+        removed = stand.remove_plot(i)
+        assert removed not in stand.plots
+        assert stand.plot_count == plot_count - 1
+        assert_same_stand(stand, rebuild_stand(stand))
+
+
+def test_replace_plot_matches_rebuild(example_stand):
+    plot_count = len(import_stand(*example_stand).plots)
+    for i in range(plot_count):
+        stand = import_stand(*example_stand)
+        stand.replace_plot(i, stand.plots[(i + 1) % plot_count])
+        assert_same_stand(stand, rebuild_stand(stand))
+
+
+def test_replace_plot_with_same_plot_has_no_variance(ex1):
+    ex1.replace_plot(1, ex1.plots[0])
+    ex1.replace_plot(2, ex1.plots[0])
+    for met in ex1.metrics:
+        assert ex1.species_stats['totals_all'][met]['variance'] == 0
+    assert_same_stand(ex1, rebuild_stand(ex1))
+
+
+def test_remove_every_plot(ex1):
+    while ex1.plots:
+        ex1.remove_plot(0)
+    assert ex1.plot_count == 0
+    assert ex1.species == {}
+    assert ex1.logs == {}
+    assert ex1.aggregate.species_moments == {}
+
+
+def test_stats_match_statistics_module(example_stand):
+    stand = import_stand(*example_stand)
+    for species in stand.species:
+        for met in stand.metrics:
+            values = stand.species_gross[species][met]
+            assert len(values) == stand.plot_count
+            assert stand.species[species][met] == mean(values)
+            assert stand.species_stats[species][met]['variance'] == variance(values)
+
+
+def test_species_gross_and_logs_gross_are_per_plot(ex1):
+    for plot_idx, plot in enumerate(ex1.plots):
+        for species in ex1.species:
+            expected = plot.species[species]['tpa'] if species in plot.species else 0
+            assert ex1.species_gross[species]['tpa'][plot_idx] == expected
+    cell = ex1.logs['DF']['S2']['31 - 40 feet']['bf_ac']
+    assert len(cell['gross']) == ex1.plot_count
+    assert cell['mean'] == pytest.approx(mean(cell['gross']))
+
+
+def test_avg_hgt_of_int_heights_is_int(ex1):
+    for species in ex1.species:
+        if species == 'totals_all':
+            continue
+        heights = [tree.height for plot in ex1.plots for tree in plot.trees if tree.species == species]
+        assert ex1.species[species]['avg_hgt'] == mean(heights)
+        assert type(ex1.species[species]['avg_hgt']) is type(mean(heights))
+
+
+def test_aggregate_merge_any_order(ok2):
+    plots = ok2.plots
+    batches = [StandAggregate(plots[i::3]) for i in range(3)]
+    forward = reduce(StandAggregate.merge, batches).finalize()
+    backward = reduce(StandAggregate.merge, batches[::-1]).finalize()
+    assert forward['species_stats'] == backward['species_stats']
+    assert forward['species_stats'] == StandAggregate(plots).finalize()['species_stats']
+    assert forward['bf_ac'] == ok2.bf_ac
+
+
+def test_empty_stand():
+    stand = Stand('EMPTY', -20)
+    stand.add_plots([])
+    assert stand.plot_count == 0
+    assert stand.species_gross == {}
+
+
+def set_relative_sheet_targets(file):
+    """Rewrites the workbook's sheet relationships with targets relative to the workbook, as Excel writes them"""
+    with ZipFile(file) as archive:
+        parts = {name: archive.read(name) for name in archive.namelist()}
+    rels = 'xl/_rels/workbook.xml.rels'
+    parts[rels] = parts[rels].replace(b'Target="/xl/worksheets/', b'Target="worksheets/')
+    with ZipFile(file, 'w') as archive:
+        for name, data in parts.items():
+            archive.writestr(name, data)
+
+
+@pytest.mark.parametrize('relative_targets', [False, True], ids=['openpyxl', 'excel'])
+def test_table_to_excel_append_keeps_sheet_settings(ex1, tmp_path, relative_targets):
+    ex1.table_to_excel('table', str(tmp_path))
+    file = str(tmp_path / 'table.xlsx')
+    wb = load_workbook(file)
+    ws = wb.active
+    ws.column_dimensions['A'].width = 31
+    ws.column_dimensions['C'].hidden = True
+    ws.freeze_panes = 'B2'
+    ws.merge_cells('K1:L1')
+    ws.sheet_properties.tabColor = 'FF0000'
+    ws.page_setup.orientation = 'landscape'
+    hidden = wb.create_sheet('hidden')
+    hidden['A1'] = 'notes'
+    hidden.sheet_state = 'hidden'
+    wb.save(file)
+    if relative_targets:
+        set_relative_sheet_targets(file)
+
+    ex1.table_to_excel('table', str(tmp_path))
+    wb = load_workbook(file)
+    ws = wb.worksheets[0]
+    assert ws.max_row == 2 * len(ex1.table_data) - 1
+    assert ws.column_dimensions['A'].width == 31
+    assert ws.column_dimensions['C'].hidden
+    assert ws.freeze_panes == 'B2'
+    assert [str(merged) for merged in ws.merged_cells.ranges] == ['K1:L1']
+    assert ws.sheet_properties.tabColor.rgb == '00FF0000'
+    assert ws.page_setup.orientation == 'landscape'
+    assert wb['hidden'].sheet_state == 'hidden'
+
+
+def read_csv(file):
+    with open(file, 'r', newline='') as f:
+        return list(csv.reader(f))
+
+
+def as_csv_rows(table_data):
+    return [[str(val) for val in row] for row in table_data]
+
+
+def test_table_to_csv_incremental_appends_new_trees(ex1, tmp_path):
+    file = str(tmp_path / 'table.csv')
+    stand = Stand(ex1.name, ex1.plot_factor)
+    stand.add_plots(ex1.plots[:3])
+    stand.table_to_csv('table', str(tmp_path), incremental=True)
+    stand.table_to_csv('table', str(tmp_path), incremental=True)
+    assert read_csv(file) == as_csv_rows(stand.table_data)
+
+    stand.add_plots(ex1.plots[3:])
+    stand.table_to_csv('table', str(tmp_path), incremental=True)
+    assert read_csv(file) == as_csv_rows(stand.table_data)
+
+
+def test_table_to_csv_incremental_widens_header(ok2, tmp_path):
+    file = str(tmp_path / 'table.csv')
+    plots = sorted(ok2.plots, key=lambda plot: max(len(tree.logs) for tree in plot.trees))
+    stand = Stand(ok2.name, ok2.plot_factor)
+    stand.add_plot(plots[0])
+    stand.table_to_csv('table', str(tmp_path), incremental=True)
+    narrow = len(read_csv(file)[0])
+
+    stand.add_plots(plots[1:])
+    stand.table_to_csv('table', str(tmp_path), incremental=True)
+    rows = read_csv(file)
+    assert len(rows[0]) > narrow
+    assert rows == as_csv_rows(stand.table_data)
+
+
+@pytest.mark.parametrize('edit', ['remove', 'replace'])
+def test_table_to_csv_incremental_after_plots_change(ex1, tmp_path, edit):
+    file = str(tmp_path / 'table.csv')
+    other = Stand('OTHER', -20)
+    other.add_plots(ex1.plots[:2])
+    other.table_to_csv('table', str(tmp_path), incremental=True)
+    ex1.table_to_csv('table', str(tmp_path), incremental=True)
+
+    if edit == 'remove':
+        ex1.remove_plot(0)
+    else:
+        ex1.replace_plot(1, ex1.plots[0])
+    ex1.table_to_csv('table', str(tmp_path), incremental=True)
+    rows = read_csv(file)
+    # The file keeps its wider header, every row is padded to it
+    expected = as_csv_rows(other.table_data)[1:] + as_csv_rows(ex1.table_data)[1:]
+    assert rows[1:] == [row + ['' for _ in range(len(rows[0]) - len(row))] for row in expected]
+    assert all(len(row) == len(rows[0]) for row in rows)
+
+
+def test_table_to_csv_incremental_without_watermark(ex1, tmp_path):
+    file = str(tmp_path / 'table.csv')
+    stand = Stand(ex1.name, ex1.plot_factor)
+    stand.add_plots(ex1.plots[:3])
+    stand.table_to_csv('table', str(tmp_path))
+    stand.add_plots(ex1.plots[3:])
+    stand.table_to_csv('table', str(tmp_path), incremental=True)
+    assert read_csv(file) == as_csv_rows(stand.table_data)
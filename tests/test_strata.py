@@ -0,0 +1,120 @@
+import math
+import statistics
+import pytest
+from treetopper import (
+    Stand,
+    Strata,
+    StrataError
+)
+from conftest import (
+    EXAMPLE_STANDS,
+    import_stand
+)
+
+
+METRICS = ['tpa', 'ba_ac', 'rd_ac', 'bf_ac', 'cf_ac']
+
+
+def get_stand(index, acres):
+    stand = import_stand(*EXAMPLE_STANDS[index])
+    stand.acres = acres
+    return stand
+
+
+def test_weighted_means_and_stderr():
+    stands = [get_stand(0, 40), get_stand(3, 25.5), get_stand(4, 80)]
+    strata = Strata('sale', stands)
+    total_acres = 40 + 25.5 + 80
+    assert strata.acres == total_acres
+    assert strata.stand_count == 3
+
+    for met in METRICS:
+        mean = 0
+        variance = 0
+        for stand in stands:
+            values = [plot[met] for plot in stand.plots]
+            weight = stand.acres / total_acres
+            mean += weight * statistics.mean(values)
+            variance += weight ** 2 * statistics.variance(values) / len(values)
+        stats = strata[f'{met}_stats']
+        assert strata[met] == pytest.approx(mean)
+        assert stats['mean'] == pytest.approx(mean)
+        assert stats['total'] == pytest.approx(mean * total_acres)
+        assert stats['variance'] == pytest.approx(variance)
+        assert stats['stderr'] == pytest.approx(math.sqrt(variance))
+        assert stats['stderr_pct'] == pytest.approx(math.sqrt(variance) / mean * 100)
+        assert stats['total_stderr'] == pytest.approx(math.sqrt(variance) * total_acres)
+
+    assert list(strata.stand_data) == [stand.name for stand in stands]
+    assert sum(data['weight'] for data in strata.stand_data.values()) == pytest.approx(1)
+
+
+def test_add_stand_matches_init():
+    stands = [get_stand(0, 40), get_stand(3, 25.5)]
+    strata = Strata('sale')
+    for stand in stands:
+        strata.add_stand(stand)
+    assert strata.get_console_report_text() == Strata('sale', stands).get_console_report_text()
+
+
+@pytest.mark.parametrize('index', range(len(EXAMPLE_STANDS)), ids=[stand[0] for stand in EXAMPLE_STANDS])
+def test_single_stand_equals_stand(index):
+    stand = get_stand(index, 12)
+    strata = Strata('one', [stand])
+    for met in METRICS:
+        stand_stats = stand[f'{met}_stats']
+        stats = strata[f'{met}_stats']
+        assert strata[met] == pytest.approx(stand[met])
+        assert stats['mean'] == pytest.approx(stand_stats['mean'])
+        assert stats['variance'] == pytest.approx(stand_stats['variance'] / stand.plot_count)
+        assert stats['stderr'] == pytest.approx(stand_stats['stderr'])
+        assert stats['stderr_pct'] == pytest.approx(stand_stats['stderr_pct'])
+        assert stats['low_avg_high'] == pytest.approx(stand_stats['low_avg_high'])
+
+
+def test_duplicate_name_raises():
+    ex1 = get_stand(0, 40)
+    with pytest.raises(StrataError):
+        Strata('dup', [ex1, ex1])
+
+    other = get_stand(0, 10)
+    strata = Strata('dup', [ex1])
+    with pytest.raises(StrataError):
+        strata.add_stand(other)
+    assert strata.stand_count == 1
+    assert len(strata.stand_data) == 1
+
+
+@pytest.mark.parametrize('acres', [None, 0, -5])
+def test_bad_acres_raises(acres):
+    stand = get_stand(0, 40)
+    stand.acres = acres
+    with pytest.raises(StrataError):
+        Strata('bad', [stand])
+
+
+def test_no_plots_raises():
+    with pytest.raises(StrataError):
+        Strata('bad', [Stand('EMPTY', -20, acres=10)])
+
+
+def test_one_plot_stand_not_enough_data():
+    # The stratified variance needs the plot variance of every stand, one stand with a single plot blanks the strata's errors
+    ex1 = get_stand(0, 40)
+    one_plot = Stand('ONE', -20, acres=5)
+    one_plot.add_plot(ex1.plots[0])
+    strata = Strata('sale', [ex1, one_plot])
+
+    for met in METRICS:
+        stats = strata[f'{met}_stats']
+        mean = (40 * ex1[met] + 5 * one_plot[met]) / 45
+        assert stats['mean'] == pytest.approx(mean)
+        assert stats['total'] == pytest.approx(mean * 45)
+        for key in ['variance', 'stderr', 'stderr_pct', 'total_stderr', 'low_avg_high']:
+            assert stats[key] == 'Not enough data'
+    assert strata.stand_data['ONE']['plots'] == 1
+
+    stats_table = strata.summary_strata['STRATIFIED STATISTICS']
+    assert all(row[3] == 'Not enough data' for row in stats_table[1:])
+    assert 'Not enough data' in strata.get_console_report_text()
+    assert strata.get_pdf_report_bytes_io().getvalue().startswith(b'%PDF')
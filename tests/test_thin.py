@@ -0,0 +1,271 @@
+import numpy as np
+import pytest
+from statistics import mean
+import treetopper
+from treetopper._constants import SORTED_HEADS
+from treetopper._utils import format_comma
+from conftest import (
+    data_file,
+    import_stand
+)
+
+
+# [Stand name, Plot factor, Example file, Cruise type]
+THIN_STANDS = {'EX1': ['EX1', -20, 'Example_CSV_quick.csv', 'q'],
+               'EX4': ['EX4', -30, 'Example_Excel_quick.xlsx', 'q'],
+               'OK2': ['OK2', 46.94, 'Example_CSV_full.csv', 'f'],
+               'OK1': ['OK1', -30, 'Example_Excel_full.xlsx', 'f']}
+
+# [Stand name, Thinning Class, Target density, kwargs], the reports in tests/data are from treetopper 1.1.1
+THIN_CASES = [['OK2', 'ThinBA', 140, {'species_to_cut': ['DF', 'WH', 'RA'], 'max_dbh_to_cut': 24}],
+              ['EX1', 'ThinTPA', 100, {}],
+              ['EX1', 'ThinBA', 120, {}],
+              ['EX1', 'ThinRD', 25, {}],
+              ['EX4', 'ThinTPA', 80, {'species_to_cut': ['DF', 'WH']}],
+              ['OK1', 'ThinRD', 30, {'min_dbh_to_cut': 10, 'max_dbh_to_cut': 18}]]
+
+
+@pytest.mark.parametrize('name, thin, target, kwargs', THIN_CASES, ids=['{}-{}-{}'.format(*case[:3]) for case in THIN_CASES])
+def test_thin_report_matches_baseline(name, thin, target, kwargs):
+    stand = import_stand(*THIN_STANDS[name])
+    report = getattr(treetopper, thin)(stand, target, **kwargs).get_console_report_text()
+    with open(data_file('thin_{}_{}_{}.txt'.format(name, thin, target)), 'r') as f:
+        assert report == f.read()
+
+
+def test_thin_current_avg_hgt_is_mean_of_trees(ok2):
+    thin = treetopper.ThinBA(ok2, 140, species_to_cut=['DF', 'WH', 'RA'], max_dbh_to_cut=24)
+    for spp, data in thin.species_data['current_'].items():
+        if spp == 'totals_all':
+            continue
+        heights = [tree.height for plot in ok2.plots for tree in plot.trees if tree.species == spp]
+        assert data['avg_hgt'] == mean(heights)
+        assert type(data['avg_hgt']) is type(mean(heights))
+
+
+def test_optimizer_removal_fraction_is_one_minus_residual_ratio(ok2):
+    optimizer = treetopper.ThinOptimizer(ok2, constraints={'rd_ac': 35, 'tpa': 80})
+    thin = optimizer.to_thin()
+    cut = thin.residual_ratio < 1
+    assert cut.any()
+    assert 1 - thin.residual_ratio[cut] == pytest.approx(optimizer.removal_fraction)
+    assert optimizer.removal['tpa'] == pytest.approx(thin.species_data['removal_']['totals_all']['tpa'])
+
+
+def test_sweep_removal_fraction(ok2):
+    sweep = treetopper.ThinSweep(ok2, targets={'ba_ac': [140]}, species_to_cut=[['DF', 'WH', 'RA']], max_dbh_to_cut=[24])
+    result = sweep.results[0]
+    thin = treetopper.ThinBA(ok2, 140, species_to_cut=['DF', 'WH', 'RA'], max_dbh_to_cut=24)
+    cut = thin.residual_ratio < 1
+    assert 1 - thin.residual_ratio[cut] == pytest.approx(result['removal_fraction'])
+
+
+THIN_CLASSES = {'tpa': 'ThinTPA', 'ba_ac': 'ThinBA', 'rd_ac': 'ThinRD'}
+METRICS = ['tpa', 'ba_ac', 'rd_ac', 'bf_ac', 'cf_ac']
+
+
+def get_current(stand):
+    return {met: float(stand.diameter_table[met].sum()) for met in METRICS}
+
+
+@pytest.mark.parametrize('stand_name', list(THIN_STANDS))
+def test_sweep_matches_thin_classes(stand_name):
+    stand = import_stand(*THIN_STANDS[stand_name])
+    current = get_current(stand)
+    # The first species can not reach the lowest targets on its own, so the sweep has scenarios that are not a full thin
+    targets = {met: [round(current[met] * share, 1) for share in [0.3, 0.6, 0.9]] for met in THIN_CLASSES}
+    species = ['all', [stand.diameter_table.species_list[0]]]
+    sweep = treetopper.ThinSweep(stand, targets, species_to_cut=species, min_dbh_to_cut=[0, 12], max_dbh_to_cut=[20, 999])
+    assert len(sweep.results) == 3 * 3 * 2 * 2 * 2
+    assert not all(result['full_thin'] for result in sweep.results)
+
+    for result in sweep.results:
+        thin = getattr(treetopper, THIN_CLASSES[result['metric']])(stand, result['target'], species_to_cut=result['species'],
+                                                                   min_dbh_to_cut=result['min_dbh'], max_dbh_to_cut=result['max_dbh'])
+        assert result['full_thin'] == thin.full_thin[0]
+        cut = thin._get_cut_cells()
+        assert 1 - thin.residual_ratio[cut] == pytest.approx(result['removal_fraction'])
+        for condition in ['current_', 'residual_', 'removal_']:
+            for met in METRICS + ['qmd']:
+                expected = thin.species_data[condition]['totals_all'][met]
+                assert result[f'{condition}{met}'] == pytest.approx(expected, rel=1e-9, abs=1e-9)
+
+
+# Constraints of the optimizer tests as shares of the stand's current density
+OPTIMIZER_CONSTRAINTS = [{'tpa': 0.5}, {'rd_ac': 0.6}, {'bf_ac': 0.5}, {'ba_ac': 0.7, 'tpa': 0.3}, {'rd_ac': 0.9, 'ba_ac': 0.8}]
+
+
+@pytest.mark.parametrize('objective', ['bf_ac', 'tpa', 'ba_ac'])
+@pytest.mark.parametrize('stand_name', list(THIN_STANDS))
+def test_optimizer_meets_constraints(stand_name, objective):
+    stand = import_stand(*THIN_STANDS[stand_name])
+    current = get_current(stand)
+    for shares in OPTIMIZER_CONSTRAINTS:
+        constraints = {met: current[met] * share for met, share in shares.items()}
+        for limits in [{}, {'max_dbh_to_cut': 20}, {'min_dbh_to_cut': 14}]:
+            optimizer = treetopper.ThinOptimizer(stand, constraints, objective=objective, **limits)
+            assert optimizer.species
+            for met in constraints:
+                assert optimizer.residual[met] >= constraints[met]
+            for met in METRICS:
+                assert optimizer.residual[met] + optimizer.removal[met] == pytest.approx(current[met])
+
+            # The residual target of to_thin removes the optimized cells, rounding is not reported as falling short of it
+            thin = optimizer.to_thin()
+            assert thin.full_thin[0]
+            assert 'COULD NOT ACHIEVE TARGET DENSITY' not in thin.report_message
+            # The thin's ratio is found from its tpa target, so its other residuals are within rounding of the optimizer's
+            for met in constraints:
+                assert thin.species_data['residual_']['totals_all'][met] >= constraints[met] * (1 - 1e-12)
+
+
+def test_optimizer_to_thin_removing_every_cut_cell(ex1):
+    current = get_current(ex1)
+    optimizer = treetopper.ThinOptimizer(ex1, {'rd_ac': current['rd_ac'] * 0.9, 'ba_ac': current['ba_ac'] * 0.8}, objective='tpa')
+    assert optimizer.removal_fraction == 1
+    thin = optimizer.to_thin()
+    assert thin.full_thin[0]
+    cut = thin._get_cut_cells()
+    assert np.all(thin.residual_ratio[cut] == 0)
+    assert np.all(thin.residual_ratio[~cut] == 1)
+
+
+def score_red_alder_first(species, dbh):
+    return (100 if species == 'RA' else 0) - dbh
+
+
+# [Thinning Class, kwargs, per cell removal priority (lower is removed first) from the species and dbh]
+PRIORITY_CASES = [['ThinFromBelow', {}, lambda spp, dbh: dbh],
+                  ['ThinFromAbove', {}, lambda spp, dbh: -dbh],
+                  ['ThinByScore', {'score': score_red_alder_first}, lambda spp, dbh: -score_red_alder_first(spp, dbh)]]
+
+
+def get_priority_thin(stand, thin, target, kwargs, **limits):
+    if thin == 'ThinByScore':
+        return treetopper.ThinByScore(stand, target, kwargs['score'], **limits)
+    return getattr(treetopper, thin)(stand, target, **limits)
+
+
+@pytest.mark.parametrize('thin, kwargs, priority', PRIORITY_CASES, ids=[case[0] for case in PRIORITY_CASES])
+@pytest.mark.parametrize('metric, target', [['tpa', 60], ['ba_ac', 140], ['rd_ac', 30]])
+def test_priority_thin_residual_hits_target(ok2, thin, kwargs, priority, metric, target):
+    thinned = get_priority_thin(ok2, thin, target, kwargs, target_metric=metric)
+    assert thinned.full_thin[0]
+    assert thinned.species_data['residual_']['totals_all'][metric] == pytest.approx(target)
+    removal = thinned.species_data['removal_']['totals_all'][metric]
+    assert removal == pytest.approx(thinned[f'current_{metric}'] - target)
+
+
+@pytest.mark.parametrize('thin, kwargs, priority', PRIORITY_CASES, ids=[case[0] for case in PRIORITY_CASES])
+@pytest.mark.parametrize('stand_name', ['EX1', 'OK2'])
+def test_priority_thin_removes_cells_in_order(thin, kwargs, priority, stand_name):
+    stand = import_stand(*THIN_STANDS[stand_name])
+    thinned = get_priority_thin(stand, thin, stand.ba_ac * 0.6, kwargs, max_dbh_to_cut=30)
+    table = thinned.table
+    cut = thinned._get_cut_cells()
+    order = sorted(np.flatnonzero(cut), key=lambda i: priority(str(table.species[i]), int(table.dbh[i])))
+    ratios = thinned.residual_ratio[order]
+
+    # Whole cells are removed in priority order, then at most one cell is partially removed and the rest are untouched
+    removed = int(np.count_nonzero(ratios == 0))
+    assert 0 < removed < len(ratios)
+    assert np.all(ratios[removed + 1:] == 1)
+    assert 0 < ratios[removed] <= 1
+    assert np.all(thinned.residual_ratio[~cut] == 1)
+
+    # Cells tied on priority can be removed in either order, so only the priorities are compared
+    priorities = [priority(str(table.species[i]), int(table.dbh[i])) for i in order]
+    untouched = [p for p, ratio in zip(priorities, ratios) if ratio == 1]
+    assert max(priorities[:removed]) <= min(untouched)
+
+
+def test_thin_from_below_and_above_differ(ok2):
+    below = treetopper.ThinFromBelow(ok2, 140)
+    above = treetopper.ThinFromAbove(ok2, 140)
+    below_cut = below.table.dbh[below.residual_ratio < 1]
+    above_cut = above.table.dbh[above.residual_ratio < 1]
+    assert below_cut.max() <= above_cut.min()
+    assert below.species_data['removal_']['totals_all']['tpa'] > above.species_data['removal_']['totals_all']['tpa']
+
+
+def test_thin_by_score_removes_red_alder_first(ex1):
+    red_alder = ex1.diameter_table.species == 'RA'
+    ra_ba = float(ex1.diameter_table['ba_ac'][red_alder].sum())
+    thinned = treetopper.ThinByScore(ex1, ex1.ba_ac - ra_ba - 10, score_red_alder_first)
+    assert np.all(thinned.residual_ratio[red_alder] == 0)
+    assert 'RA' not in thinned.species_data['residual_']
+    assert thinned.species_data['removal_']['RA']['ba_ac'] == pytest.approx(ra_ba)
+
+    # Scoring every species the same leaves the diameters to order the removals, the same as ThinFromAbove
+    by_dbh = treetopper.ThinByScore(ex1, 140, lambda species, dbh: dbh)
+    assert by_dbh.get_console_report_text() == treetopper.ThinFromAbove(ex1, 140).get_console_report_text()
+
+
+@pytest.mark.parametrize('thin, kwargs, priority', PRIORITY_CASES, ids=[case[0] for case in PRIORITY_CASES])
+def test_priority_thin_reports_match_thin_ba(ok2, thin, kwargs, priority):
+    thinned = get_priority_thin(ok2, thin, 140, kwargs)
+    expected = treetopper.ThinBA(ok2, 140)
+    assert list(thinned.summary_thin) == list(expected.summary_thin)
+    for table in expected.summary_thin:
+        assert thinned.summary_thin[table][0] == expected.summary_thin[table][0]
+        assert all(len(row) == len(expected.summary_thin[table][0]) for row in thinned.summary_thin[table])
+        assert thinned.summary_thin[table][-1][0] == 'TOTALS'
+    assert thinned.summary_thin['CURRENT CONDITIONS'] == expected.summary_thin['CURRENT CONDITIONS']
+    assert thinned.report_message == expected.report_message
+
+    text = thinned.get_console_report_text()
+    assert text.startswith('\nTHINNING RESULTS\n')
+    for table in thinned.summary_thin:
+        assert table in text
+    assert thinned.get_pdf_report_bytes_io().getvalue().startswith(b'%PDF')
+
+
+def test_priority_thin_not_full(ok2):
+    thinned = treetopper.ThinFromBelow(ok2, 60, target_metric='tpa', species_to_cut=['RA'])
+    assert not thinned.full_thin[0]
+    assert 'COULD NOT ACHIEVE TARGET DENSITY' in thinned.report_message
+    assert np.all(thinned.residual_ratio[thinned.table.species == 'RA'] == 0)
+
+
+def test_priority_thin_bad_metric(ok2):
+    with pytest.raises(ValueError):
+        treetopper.ThinFromBelow(ok2, 140, target_metric='bf_ac')
+
+
+# [Thinning Class, Target density, kwargs] of the residual stand tests
+RESIDUAL_CASES = [['ThinTPA', 60, {}],
+                  ['ThinBA', 140, {'species_to_cut': ['DF', 'WH', 'RA'], 'max_dbh_to_cut': 24}],
+                  ['ThinRD', 30, {'min_dbh_to_cut': 10}],
+                  ['ThinFromBelow', 140, {}],
+                  ['ThinFromAbove', 60, {'target_metric': 'tpa'}]]
+
+
+@pytest.mark.parametrize('thin, target, kwargs', RESIDUAL_CASES, ids=[case[0] for case in RESIDUAL_CASES])
+@pytest.mark.parametrize('stand_name', ['EX1', 'OK2'])
+def test_residual_stand_matches_residual_conditions(thin, target, kwargs, stand_name):
+    stand = import_stand(*THIN_STANDS[stand_name])
+    thinned = getattr(treetopper, thin)(stand, target, **kwargs)
+    residual = thinned.residual_stand('RESIDUAL')
+    assert residual.name == 'RESIDUAL'
+    assert residual.plot_count == stand.plot_count
+
+    residual_data = thinned.species_data['residual_']
+    for key in ['tpa', 'ba_ac', 'bf_ac']:
+        assert residual[key] == pytest.approx(residual_data['totals_all'][key])
+        for spp, data in residual.species.items():
+            if spp != 'totals_all':
+                assert data[key] == pytest.approx(residual_data[spp][key])
+
+    totals = thinned.summary_thin['RESIDUAL CONDITIONS'][-1]
+    heads = [head for head, _ in SORTED_HEADS]
+    for key in ['tpa', 'ba_ac', 'bf_ac']:
+        assert totals[heads.index(key) + 1] == format_comma(residual[key])
+
+    # The stand and its trees are left as they were
+    assert stand.get_console_report_text() == import_stand(*THIN_STANDS[stand_name]).get_console_report_text()
+
+
+def test_residual_stand_can_be_thinned_again(ok2):
+    residual = treetopper.ThinBA(ok2, 160).residual_stand()
+    again = treetopper.ThinBA(residual, 120)
+    assert again.species_data['residual_']['totals_all']['ba_ac'] == pytest.approx(120)
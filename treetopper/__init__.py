@@ -7,17 +7,30 @@ from treetopper.stand import (
     ThinTPA,
     ThinBA,
     ThinRD,
+    ThinFromBelow,
+    ThinFromAbove,
+    ThinByScore,
+    ThinSweep,
+    ThinOptimizer,
     FVS
 )
+from treetopper.strata import Strata
+from treetopper.aggregate import StandAggregate
+from treetopper.cache import ImportCache
+from treetopper.height_model import HeightModel
 from treetopper._exceptions import (
     TargetDensityError,
-    ImportSheetError
+    ImportSheetError,
+    SnapshotError,
+    StrataError,
+    BatchConfigError
 )
+from treetopper._constants import TREETOPPER_VERSION as __version__
 
 
 # REFERENCE FOR INDEX.RST FROM SPHINX
 """
-treetopper 1.1.1
+treetopper 1.2.0
 =================
 **Python inventory program from timber stands of the western united states.**
 
@@ -65,7 +78,7 @@ TimberFull
 
 The TimberFull class can be used if the user has cruised his/her own trees within an inventory. TimberFull still needs the base
 params of Plot Factor, Species, DBH and Total Height. And then log data can be added with the add_log() method of TimberFull.
-The params for add_log() are Stem Height, Log Length, Log Grade, and Log Defect
+The params for add_log() are Stem Height, Log Length, Log Grade, and Log Defect, a list of logs can be added at once with add_logs()
 
 If manually creating a Stand with the TimberFull class, the flow could look like this:
 ::
@@ -89,8 +102,7 @@ If manually creating a Stand with the TimberFull class, the flow could look like
    for row in tree_list:
       plot = Plot()
       for tree, logs in row:
-          for log in logs:
-              tree.add_log(*log)
+          tree.add_logs(logs)
           plot.add_tree(tree)
       stand.add_plot(plot)
 
@@ -119,6 +131,83 @@ Once inventory data is in a correctly formatted sheet, the work flow could look
    # If using a full cruise sheet
    stand.import_sheet_full(File Path)
 
+Very large sheets can be streamed with stream=True, the rows are read one at a time and the plots are added to the stand in batches.
+If the rows of each plot are together within the sheet, sorted_by_plot=True completes each plot as soon as its last row is read,
+otherwise the rows are grouped by plot within a temporary file on disk:
+::
+   stand.import_sheet_full(File Path, sorted_by_plot=True)
+
+Cruise data split over many sheets (for example one per crew) can be imported at once with Stand.import_sheets(), the sheets are read
+in a thread pool and their trees are cruised in a process pool. The plots are added in the order of the file paths, so the stand
+is the same no matter which sheet finishes first:
+::
+   stand.import_sheets(['crew_1.csv', 'crew_2.xlsx', 'crew_3.csv'], 'q')
+
+Missing total heights are filled from the sheet's average height-to-diameter ratio. If the stand is given a HeightModel, the missing
+heights are predicted from height-diameter curves (Wykoff or Curtis forms) fit by species to the measured trees instead, species
+with few measured trees use the pooled fit of all species. The model keeps its fits, so later imports into the stand reuse them
+and add their measured trees to them:
+::
+   from treetopper import HeightModel
+
+   stand = Stand('EX1', -20)
+   stand.height_model = HeightModel('wykoff', min_trees=5)
+   stand.import_sheet_quick('example_quick_cruise_sheet.xlsx')
+   print(stand.height_model.fits)
+
+
+
+Saving and Loading Stands
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+A stand can be saved to a binary snapshot directory and loaded again without re-importing or re-cruising the trees. The snapshot holds
+the tree and log data as raw columns along with the stand's calculations. If the input hash of the cruise sheet is given when loading,
+a snapshot made from an older version of the sheet will raise a SnapshotError:
+::
+   from treetopper import Stand
+   from treetopper._utils import get_input_hash
+
+   stand = Stand('EX1', -20)
+   stand.import_sheet_quick('example_quick_cruise_sheet.xlsx')
+   stand.save('EX1_snapshot')
+
+   input_hash = get_input_hash('example_quick_cruise_sheet.xlsx', 'EX1', 'q', -20)
+   stand = Stand.load('EX1_snapshot', input_hash=input_hash)
+
+Cruise sheets that are imported again and again can go through an ImportCache, an on-disk cache of stand snapshots keyed by the
+sheet's contents, stand name, cruise type, plot factor and the treetopper version. The least recently used stands are removed once
+the cache is larger than max_size (bytes), the directory and size default to the TREETOPPER_CACHE_DIR and TREETOPPER_CACHE_MAX_SIZE
+environment variables:
+::
+   from treetopper import ImportCache
+
+   cache = ImportCache('cruise_cache', max_size=500 * 1024 ** 2)
+   stand = Stand('EX1', -20)
+   stand.import_sheet_quick('example_quick_cruise_sheet.xlsx', cache=cache)
+   print(cache.stats)
+
+The stand's calculations are made from a StandAggregate of running totals. Aggregates of separate batches of plots can be merged in
+any order, so a very large stand can be aggregated across worker processes and reduced into one set of stand calculations:
+::
+   from functools import reduce
+   from treetopper import StandAggregate
+
+   batch_aggregates = [StandAggregate(batch) for batch in batches_of_plots]
+   stand_data = reduce(StandAggregate.merge, batch_aggregates).finalize()
+
+The stand's logs can be exported in long format, one row per log (stand, plot, tree, log, stem_height, length, grade, defect,
+top_dib, bf, cf), to a CSV file or, if pyarrow is installed, to a typed Parquet or Arrow file. The rows are written in chunks:
+::
+   stand.log_table_to_csv('EX1_logs.csv')
+   stand.log_table_to_parquet('EX1_logs.parquet')
+   stand.log_table_to_parquet('EX1_logs.arrow', file_format='arrow')
+
+If pandas is installed, the stand's tree-level or log-level data can be pulled into a DataFrame that shares the stand's column memory,
+and a stand can be built from DataFrames of trees (and logs for full cruises) without writing them to a sheet first:
+::
+   trees = stand.to_frame('trees')
+   logs = stand.to_frame('logs')
+   new_stand = Stand.from_frame(trees, 'f', 'EX2', -20, logs=logs)
 
 
 Stand Reports
@@ -132,6 +221,12 @@ by species and totals. To generate these reports call either:
    stand.pdf_report() #OR
    stand.console_report()
 
+A stand and stock table, the stand conditions broken down by species and whole-number diameter, can be printed to the console
+or exported to its own pdf. The table is cached on the stand (stand.diameter_table) and it is what the Thinning Classes start from:
+::
+   stand.stand_stock_pdf_report('stand_stock.pdf') #OR
+   stand.stand_stock_report()
+
 
 
 Thinning a Stand
@@ -151,6 +246,58 @@ choose only certain species to cut, and minimum and maximum diameter limits. A w
    thin80tpa = ThinTPA(stand, 80, species_to_cut=['DF', 'RC', 'WH'], maximum_dbh_to_cut=18)
    thin80tpa.console_report()
 
+The residual stand of a thinning can be made into a new Stand with residual_stand(), its trees keep their logs with the per acre
+values scaled to what is left after the thinning, so it can be thinned again or linked to FVS:
+::
+   residual = thin80tpa.residual_stand('EX1_RESIDUAL')
+   second_entry = ThinTPA(residual, 50)
+
+The ThinTPA, ThinBA and ThinRD classes remove the same ratio of every diameter they are allowed to cut. To remove trees in priority
+order instead, use ThinFromBelow (smallest diameters first), ThinFromAbove (largest diameters first) or ThinByScore (highest
+user score first, the score is a function of species and diameter). The target metric can be 'tpa', 'ba_ac' or 'rd_ac':
+::
+   from treetopper import ThinFromBelow, ThinByScore
+
+   thin120ba = ThinFromBelow(stand, 120, target_metric='ba_ac', species_to_cut=['DF', 'WH'])
+   thin_alder_first = ThinByScore(stand, 120, lambda species, dbh: (100 if species == 'RA' else 0) - dbh)
+
+To compare many prescriptions at once, the ThinSweep Class thins every combination of the targets, species to cut and diameter
+limits in one pass over the stand's stand and stock table, the results can be ranked by any of their values:
+::
+   from treetopper import ThinSweep
+
+   sweep = ThinSweep(stand, targets={'ba_ac': [80, 100, 120, 140]}, species_to_cut=['all', ['DF']], max_dbh_to_cut=[18, 999])
+   sweep.console_report()
+   best = sweep.rank('removal_bf_ac')[0]
+
+The ThinOptimizer Class searches the species to cut and the diameter limits for the prescription that removes the most board feet
+per acre (or another objective) while the residual stand stays above minimums such as RD and TPA:
+::
+   from treetopper import ThinOptimizer
+
+   optimizer = ThinOptimizer(stand, constraints={'rd_ac': 35, 'tpa': 80})
+   optimizer.console_report()
+   thin = optimizer.to_thin()
+
+
+Combining Stands into Strata
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Several stands with different acreages (for example the units of a timber sale) can be combined into one stratified estimate
+with the Strata Class. Each stand needs its acres set and a name of its own. The Strata Class calculates the acreage-weighted means, the totals over
+all acres and the stratified standard errors for TPA, Basal Area, RD, Board Feet and Cubic Feet:
+::
+   from treetopper import Stand, Strata
+
+   unit1 = Stand('UNIT1', -20, acres=42.5)
+   unit1.import_sheet_quick('unit1_quick_cruise_sheet.xlsx')
+
+   unit2 = Stand('UNIT2', 40, acres=18)
+   unit2.import_sheet_quick('unit2_quick_cruise_sheet.xlsx')
+
+   sale = Strata('SALE1', [unit1, unit2])
+   sale.console_report()
+
 
 Linking to FVS
 ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -174,6 +321,53 @@ could look like this:
    # create a FVS-formatted SQLite Database
    fvs.sqlite_db('example_sqlite_db.db')
 
+Many stands can be written to one database at once by adding each stand with fvs.add_stand(), which takes the same arguments as
+fvs.set_stand(). The SQLite database is then written in one connection and transaction, with indexes on Stand_ID built after the load:
+::
+   fvs = FVS()
+   for stand in stands:
+       fvs.add_stand(stand, 'PN', 612, 6, 45, 'DF', 110)
+   fvs.sqlite_db('all_stands.db')
+
+To keep an existing SQLite or Excel database up to date, pass sync=True. Each stand's exported rows are hashed and compared with the
+digests stored in the database, only the stands that are new or have changed are replaced and their names are kept in fvs.synced_stands.
+Writing to a synced database without sync drops the digests of the appended stands, so the next sync replaces all of their rows:
+::
+   fvs.sqlite_db('all_stands.db', sync=True)
+   print(fvs.synced_stands)
+
+
+Batch Processing
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+A directory (or glob pattern) of cruise sheets can be run from the terminal. Every stand found within the sheets is imported in a worker
+process and its reports, tables and snapshot are written to [output]/stands/[stand name], then the FVS databases are written with all
+of the finished stands. The plot factors, cruise types, outputs and FVS arguments come from a JSON config file
+(see treetopper.batch.load_config):
+::
+   python -m treetopper batch cruises/ --config batch_config.json --output batch_out --processes 4
+
+Each finished stand is recorded in [output]/checkpoint.jsonl, running the same command again skips the stands that are done (unless
+their sheets or settings have changed), so a batch that stopped part way through restarts where it stopped. Use --restart to run
+every stand again. The batch can also be run from Python with treetopper.batch.run_batch.
+
+
+Profiling
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+To see where the time and memory go for a stand, import one stand of a cruise sheet through Stand.import_sheet_quick or
+Stand.import_sheet_full and build its reports and FVS export, timing each phase of the pipeline (parse, validate, heights,
+taper/bucking, aggregation, summaries, cache, pdf layout, fvs export) as it runs. A table of the time and peak memory of each phase is
+printed, --prof saves the cProfile stats and --collapsed saves sampled collapsed stacks for flamegraph.pl or speedscope. The import
+options can be profiled too, --stream and --sorted stream the sheet, --height-model fills missing heights with a HeightModel and
+--cache imports through an ImportCache within a directory:
+::
+   python -m treetopper profile example_full_cruise_sheet.xlsx --stand OK2 --type f --plot-factor 46.94 --prof ok2.prof --collapsed ok2.txt
+   python -m treetopper profile example_full_cruise_sheet.xlsx --stand OK2 --type f --plot-factor 46.94 --stream --height-model wykoff
+
+Tracing memory slows the pipeline down, use --no-memory for times closer to a normal run. The profile can also be run from Python with
+treetopper.profiler.PipelineProfile.
+
 
 Workflow Tutorial and Walk Through
 ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -0,0 +1,70 @@
+import argparse
+import sys
+from treetopper.batch import run_batch
+from treetopper.profiler import PipelineProfile
+from treetopper.cache import ImportCache
+from treetopper._exceptions import (
+    BatchConfigError,
+    ImportSheetError
+)
+
+
+def main(args=None):
+    """The treetopper command line, run with python -m treetopper [command]"""
+    parser = argparse.ArgumentParser(prog='python -m treetopper', description='treetopper command line tools')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    batch = commands.add_parser('batch', help='Import, report and export every stand within a directory of cruise sheets',
+                                description='Runs every stand found within the cruise sheets in worker processes, with the '
+                                            'settings of a JSON config file. Finished stands are recorded in checkpoint.jsonl '
+                                            'within the output directory, running the same batch again resumes where it stopped')
+    batch.add_argument('sheets', help='A directory of cruise sheets (.csv, .xlsx) or a glob pattern such as "cruises/*.csv"')
+    batch.add_argument('-c', '--config', required=True, help='The JSON config file of the batch')
+    batch.add_argument('-o', '--output', default=None, help='The output directory [treetopper_batch]')
+    batch.add_argument('-p', '--processes', type=int, default=None,
+                       help='The number of worker processes, 0 runs the stands within this process [CPU count]')
+    batch.add_argument('--restart', action='store_true', help='Ignore the checkpoint and run every stand again')
+    batch.add_argument('-q', '--quiet', action='store_true', help='Do not show the progress')
+
+    profile = commands.add_parser('profile', help='Show the time and peak memory of each phase of the pipeline for one stand',
+                                  description='Imports one stand of a cruise sheet, builds its reports and FVS export under '
+                                              'tracemalloc and shows the time and peak memory of each phase of the pipeline (parse, '
+                                              'validate, heights, taper/bucking, aggregation, summaries, cache, pdf layout, fvs export)')
+    profile.add_argument('file', help='The cruise sheet (.csv, .xlsx)')
+    profile.add_argument('-s', '--stand', required=True, help='The name of the stand within the sheet')
+    profile.add_argument('-t', '--type', required=True, choices=['q', 'f'], help='The cruise type, quick (q) or full (f)')
+    profile.add_argument('--plot-factor', type=float, default=-20, help='The plot factor of the stand [-20]')
+    profile.add_argument('--stream', action='store_true', help='Stream the sheet in batches of plots')
+    profile.add_argument('--sorted', action='store_true', help='The streamed sheet\'s rows are sorted by plot')
+    profile.add_argument('--height-model', default=None, choices=['wykoff', 'curtis'],
+                         help='Fill missing heights with a HeightModel of this form')
+    profile.add_argument('--cache', default=None, help='Import the stand through an ImportCache within this directory')
+    profile.add_argument('--prof', default=None, help='Save the cProfile stats of the pipeline to this .prof file')
+    profile.add_argument('--collapsed', default=None, help='Save sampled collapsed stacks (for flamegraph.pl) to this file')
+    profile.add_argument('--interval', type=float, default=1.0, help='The milliseconds between the collapsed stack samples [1.0]')
+    profile.add_argument('--no-memory', action='store_true', help='Do not trace memory, the times are closer to an untraced run')
+
+    args = parser.parse_args(args)
+    if args.command == 'batch':
+        try:
+            summary = run_batch(args.sheets, args.config, args.output, args.processes, not args.restart, not args.quiet)
+        except BatchConfigError as e:
+            print(e.message, file=sys.stderr)
+            return 2
+        return 1 if summary['failed'] else 0
+
+    elif args.command == 'profile':
+        pipeline = PipelineProfile(args.file, args.stand, args.type, args.plot_factor, not args.no_memory, args.prof,
+                                   args.collapsed, args.interval / 1000, args.stream, args.sorted, args.height_model,
+                                   ImportCache(args.cache) if args.cache else None)
+        try:
+            pipeline.run()
+        except ImportSheetError as e:
+            print(e.message, file=sys.stderr)
+            return 2
+        print(pipeline.get_report_text())
+        return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
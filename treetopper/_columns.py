@@ -0,0 +1,153 @@
+import numpy as np
+from treetopper.plot import Plot
+from treetopper.timber import (
+    TimberQuick,
+    TimberFull
+)
+from treetopper.log import Log
+from treetopper._constants import (
+    GRADE_NAMES,
+    LOG_LENGTHS
+)
+
+
+# TREE-LEVEL COLUMNS -- [Column Name, Numpy dtype], 'plot' is the index of the tree's plot within the stand's plots list
+TREE_COLUMNS = [['plot', 'i8'], ['tree', 'i8'], ['cruise_type', 'U1'], ['plot_factor', 'f8'], ['species', 'U2'], ['dbh', 'f8'],
+                ['height', 'i8'], ['pref_log', 'i8'], ['min_log', 'i8'], ['hdr', 'f8'], ['ba', 'f8'], ['rd', 'f8'],
+                ['merch_dib', 'i8'], ['merch_height', 'i8'], ['tpa', 'f8'], ['ba_ac', 'f8'], ['rd_ac', 'f8'], ['bf', 'i8'],
+                ['cf', 'f8'], ['bf_ac', 'f8'], ['cf_ac', 'f8'], ['vbar', 'f8'], ['log_count', 'i8']]
+
+# LOG-LEVEL COLUMNS -- [Column Name, Numpy dtype], 'tree' is the index of the log's tree within the tree-level columns
+LOG_COLUMNS = [['tree', 'i8'], ['log', 'i8'], ['stem_height', 'i8'], ['length', 'i8'], ['defect', 'i8'], ['grade', 'U2'],
+               ['top_dib', 'i8'], ['scrib', 'f8'], ['bf', 'i8'], ['cf', 'f8'], ['lpa', 'f8'], ['bf_ac', 'f8'], ['cf_ac', 'f8']]
+
+# TimberFull does not cruise its own logs, these TimberQuick-only columns are filled with -1 for TimberFull trees
+QUICK_ONLY = ['pref_log', 'min_log', 'merch_dib', 'merch_height']
+
+# THE COLUMNS HELD BY THE RESTORED TimberQuick, TimberFull AND Log CLASSES
+QUICK_KEYS = ['plot_factor', 'species', 'dbh', 'height', 'pref_log', 'min_log', 'hdr', 'ba', 'rd', 'merch_dib', 'merch_height',
+              'tpa', 'ba_ac', 'rd_ac', 'bf', 'cf', 'bf_ac', 'cf_ac', 'vbar']
+FULL_KEYS = ['plot_factor', 'species', 'dbh', 'height', 'hdr', 'ba', 'rd', 'tpa', 'ba_ac', 'rd_ac', 'bf', 'cf', 'bf_ac', 'cf_ac', 'vbar']
+LOG_KEYS = ['log', 'stem_height', 'length', 'defect', 'lpa', 'top_dib', 'grade', 'scrib', 'bf', 'cf', 'bf_ac', 'cf_ac']
+
+# TREES RESTORED FROM THE COLUMNS AT A TIME
+RESTORE_CHUNK = 8192
+
+
+def get_stand_columns(stand, tables: list = None):
+    """Returns the stand's tree-level and log-level data as dictionaries of numpy arrays {'trees': {...}, 'logs': {...}},
+       the columns are cached on the stand until its plots change. If tables is given (such as ['trees']) only those tables
+       are built, the others are built when they are first asked for"""
+    if stand._columns is None:
+        stand._columns = {}
+    for table in tables if tables else ['trees', 'logs']:
+        if table not in stand._columns:
+            stand._columns[table] = get_tree_columns(stand.plots) if table == 'trees' else get_log_columns(stand.plots)
+    return stand._columns
+
+
+def get_tree_columns(plots):
+    """Returns the tree-level columns of the trees within the plots as a dictionary of numpy arrays"""
+    rows = []
+    for i, plot in enumerate(plots):
+        for j, tree in enumerate(plot.trees):
+            if isinstance(tree, TimberQuick):
+                quick = [tree.pref_log, tree.min_log, tree.merch_dib, tree.merch_height]
+                cruise_type = 'q'
+            else:
+                quick = [-1, -1, -1, -1]
+                cruise_type = 'f'
+            rows.append((i, j + 1, cruise_type, tree.plot_factor, tree.species, tree.dbh, tree.height, *quick, tree.hdr, tree.ba,
+                         tree.rd, tree.tpa, tree.ba_ac, tree.rd_ac, tree.bf, tree.cf, tree.bf_ac, tree.cf_ac, tree.vbar, len(tree.logs)))
+    order = ['plot', 'tree', 'cruise_type', 'plot_factor', 'species', 'dbh', 'height'] + QUICK_ONLY + \
+            ['hdr', 'ba', 'rd', 'tpa', 'ba_ac', 'rd_ac', 'bf', 'cf', 'bf_ac', 'cf_ac', 'vbar', 'log_count']
+    return _rows_to_columns(rows, order, TREE_COLUMNS)
+
+
+def get_log_columns(plots):
+    """Returns the log-level columns of the logs within the plots' trees as a dictionary of numpy arrays"""
+    rows = []
+    tree_idx = 0
+    for plot in plots:
+        for tree in plot.trees:
+            for lnum in tree.logs:
+                log = tree.logs[lnum]
+                rows.append((tree_idx, lnum, log.stem_height, log.length, log.defect, log.grade, log.top_dib, log.scrib,
+                             log.bf, log.cf, log.lpa, log.bf_ac, log.cf_ac))
+            tree_idx += 1
+    order = [col for col, _ in LOG_COLUMNS]
+    return _rows_to_columns(rows, order, LOG_COLUMNS)
+
+
+def restore_plots(tree_columns, log_columns, plot_count):
+    """Returns a list of Plot Classes rebuilt from tree-level and log-level columns. The Timber and Log Classes are restored from
+       their column values, so the trees are not re-cruised.
+
+       The columns (which may be memory-mapped) are read RESTORE_CHUNK trees at a time and only the columns that the Timber and
+       Log Classes hold are converted to Python values, so the whole of the columns is never held as Python lists"""
+    plots = [Plot() for _ in range(plot_count)]
+    tree_total = len(tree_columns['plot'])
+    log_ends = np.cumsum(tree_columns['log_count']) if tree_total else []
+    log_start = 0
+    for start in range(0, tree_total, RESTORE_CHUNK):
+        stop = min(start + RESTORE_CHUNK, tree_total)
+        log_stop = int(log_ends[stop - 1])
+        trees = {col: tree_columns[col][start: stop].tolist() for col in ['plot', 'cruise_type', 'log_count'] + QUICK_KEYS}
+        logs = {col: log_columns[col][log_start: log_stop].tolist() for col in LOG_KEYS}
+        _restore_trees(plots, trees, logs)
+        log_start = log_stop
+    return plots
+
+
+def _restore_trees(plots, trees, logs):
+    """Restores the Timber and Log Classes of a chunk of the tree-level and log-level columns (as lists) and adds the trees to
+       their plots, used internally"""
+    log_idx = 0
+    for i in range(len(trees['plot'])):
+        if trees['cruise_type'][i] == 'q':
+            tree = TimberQuick.__new__(TimberQuick)
+            keys = QUICK_KEYS
+        else:
+            tree = TimberFull.__new__(TimberFull)
+            keys = FULL_KEYS
+        tree.__dict__.update({key: trees[key][i] for key in keys})
+        tree.logs = {}
+
+        for _ in range(trees['log_count'][i]):
+            log = Log.__new__(Log)
+            log.__dict__.update({'tree': tree,
+                                 'stem_height': logs['stem_height'][log_idx],
+                                 'length': logs['length'][log_idx],
+                                 'defect': logs['defect'][log_idx],
+                                 'species': tree.species,
+                                 'lpa': logs['lpa'][log_idx],
+                                 'top_dib': logs['top_dib'][log_idx],
+                                 'grade': logs['grade'][log_idx],
+                                 'scrib': logs['scrib'][log_idx],
+                                 'bf': logs['bf'][log_idx],
+                                 'cf': logs['cf'][log_idx],
+                                 'bf_ac': logs['bf_ac'][log_idx],
+                                 'cf_ac': logs['cf_ac'][log_idx],
+                                 'grade_name': GRADE_NAMES[logs['grade'][log_idx]],
+                                 'length_range': _get_length_range(logs['length'][log_idx])})
+            tree.logs[logs['log'][log_idx]] = log
+            log_idx += 1
+
+        plots[trees['plot'][i]].add_tree(tree)
+
+
+def _rows_to_columns(rows, order, columns):
+    """Transposes a list of row tuples in the column order of the order arg to a dictionary of typed numpy arrays"""
+    dtypes = dict(columns)
+    if rows:
+        transposed = list(zip(*rows))
+    else:
+        transposed = [[] for _ in order]
+    return {col: np.array(transposed[i], dtype=dtypes[col]) for i, col in enumerate(order)}
+
+
+def _get_length_range(length):
+    """Returns the log length range of the length arg, the same as the Log Class"""
+    for rng in LOG_LENGTHS:
+        if LOG_LENGTHS[rng][0] <= length <= LOG_LENGTHS[rng][1]:
+            return rng
@@ -4,34 +4,59 @@ from treetopper._utils import (
 )
 
 
-# TAPER EQUATION FUNCTIONS
-def czaplewski(DBH, Total_Height, Stem_Height, a, b, c, d, e, f):
+TREETOPPER_VERSION = '1.2.0'
+
+
+# TAPER EQUATION FUNCTIONS, THE *_dib FORMS RETURN THE UNFLOORED DIB AND TAKE THE MODULE (lib) OF sqrt, log AND exp,
+# SO THE SAME EQUATIONS RUN ON ONE TREE (math) OR ON ARRAYS OF LOGS (numpy, see treetopper._log_batch)
+def czaplewski_dib(DBH, Total_Height, Stem_Height, a, b, c, d, e, f, lib=math):
     Z = Stem_Height / Total_Height
     Z2 = (Stem_Height ** 2) / (Total_Height ** 2)
-    I1 = int(Z < a)
-    I2 = int(Z < b)
-    dib = DBH * math.sqrt((c * (Z - 1)) + (d * (Z2 - 1)) + (e * ((a - Z) ** 2) * I1) + (f * ((b - Z) ** 2) * I2))
-    return math.floor(dib)
+    I1 = Z < a
+    I2 = Z < b
+    return DBH * lib.sqrt((c * (Z - 1)) + (d * (Z2 - 1)) + (e * ((a - Z) ** 2) * I1) + (f * ((b - Z) ** 2) * I2))
 
 
-def kozak1969(DBH, Total_Height, Stem_Height, a, b, c):
+def kozak1969_dib(DBH, Total_Height, Stem_Height, a, b, c, lib=math):
     Z = Stem_Height / Total_Height
     Z2 = (Stem_Height ** 2) / (Total_Height ** 2)
-    dib = DBH * math.sqrt(a + (b * Z) + (c * Z2))
-    return math.floor(dib)
+    return DBH * lib.sqrt(a + (b * Z) + (c * Z2))
 
 
-def kozak1988(DBH, Total_Height, Stem_Height, a, b, c, d, e, f, g, h, i):
+def kozak1988_dib(DBH, Total_Height, Stem_Height, a, b, c, d, e, f, g, h, i, lib=math):
     Z = Stem_Height / Total_Height
-    dib = (a * (DBH ** b) * (c ** DBH)) * ((1 - (Z ** 0.5)) / (1 - (d ** 0.5))) ** ((e * (Z ** 2)) + (f * math.log(Z + 0.001)) + (g * (Z ** 0.5)) + (h * math.exp(Z)) + (i * (DBH / Total_Height)))
-    return math.floor(dib)
+    return (a * (DBH ** b) * (c ** DBH)) * ((1 - (Z ** 0.5)) / (1 - (d ** 0.5))) ** ((e * (Z ** 2)) + (f * lib.log(Z + 0.001)) + (g * (Z ** 0.5)) + (h * lib.exp(Z)) + (i * (DBH / Total_Height)))
 
 
-def wensel(DBH, Total_Height, Stem_Height, a, b, c, d, e):
+def wensel_dib(DBH, Total_Height, Stem_Height, a, b, c, d, e, lib=math):
     Z = (Stem_Height - 1) / (Total_Height - 1)
     X = (c + (d * DBH) + (e * Total_Height))
-    dib = DBH * (a - (X * (math.log(1 - (Z ** b) * (1 - math.exp(a / X))))))
-    return math.floor(dib)
+    return DBH * (a - (X * (lib.log(1 - (Z ** b) * (1 - lib.exp(a / X))))))
+
+
+def czaplewski(DBH, Total_Height, Stem_Height, a, b, c, d, e, f):
+    return math.floor(czaplewski_dib(DBH, Total_Height, Stem_Height, a, b, c, d, e, f))
+
+
+def kozak1969(DBH, Total_Height, Stem_Height, a, b, c):
+    return math.floor(kozak1969_dib(DBH, Total_Height, Stem_Height, a, b, c))
+
+
+def kozak1988(DBH, Total_Height, Stem_Height, a, b, c, d, e, f, g, h, i):
+    return math.floor(kozak1988_dib(DBH, Total_Height, Stem_Height, a, b, c, d, e, f, g, h, i))
+
+
+def wensel(DBH, Total_Height, Stem_Height, a, b, c, d, e):
+    return math.floor(wensel_dib(DBH, Total_Height, Stem_Height, a, b, c, d, e))
+
+
+# UNFLOORED DIB FORM OF EACH TAPER EQUATION
+TAPER_DIB = {
+    czaplewski: czaplewski_dib,
+    kozak1969: kozak1969_dib,
+    kozak1988: kozak1988_dib,
+    wensel: wensel_dib
+}
 
 # STEM TAPER EQUATION ACCORDING TO SPECIES
 TAPER_EQ = {
@@ -243,6 +268,27 @@ SHEET_FULL_LOG_CONV = {
     3: lambda val, row, col: is_err_num(val, row, col, int, default=0)
 }
 
+# COLUMN CHECKS BY LIST INDEX, THE CHECKS OF SHEET_ROW_COL_CONV AND SHEET_FULL_LOG_CONV RUN ON WHOLE COLUMNS AT ONCE
+# ['number', Number Type, Required, Default] OR ['species'] OR ['grade']
+SHEET_ROW_COL_CHECKS = {
+    1: ['number', int, True, None],
+    2: ['number', int, True, None],
+    3: ['species'],
+    4: ['number', float, True, None],
+    5: ['number', float, False, None],
+    6: ['number', int, True, 40],
+    7: ['number', int, True, 16]
+}
+
+SHEET_STUMP_CHECK = ['number', int, True, 1]
+
+SHEET_FULL_LOG_CHECKS = {
+    0: ['number', int, True, None],
+    1: ['grade'],
+    2: ['number', int, True, 0],
+    3: ['number', int, True, 0]
+}
+
 SORTED_HEADS = [['tpa', 'TPA'], ['ba_ac', 'BASAL AREA'], ['rd_ac', 'RD'], ['qmd', 'QMD'], ['vbar', 'VBAR'],
                 ['avg_hgt', 'AVG HEIGHT'], ['hdr', 'HDR'], ['bf_ac', 'BOARD FEET'], ['cf_ac', 'CUBIC FEET']]
 
@@ -331,6 +377,12 @@ SQL_TREE_COLS = ['FVS_TreeInit', [['Stand_ID', 'TEXT'], ['StandPlot_ID', 'TEXT']
                  ['Age', 'REAL'], ['Slope', 'INTEGER'], ['Aspect', 'INTEGER'], ['PV_Code', 'TEXT'], ['TopoCode', 'REAL'],
                  ['SitePrep', 'REAL']]]
 
+# SQLITE INDEXES [Index Name, Table, Column], FVS selects the stand and tree rows by Stand_ID
+SQL_INDEXES = [['FVS_StandInit_Stand_ID', 'FVS_StandInit', 'Stand_ID'], ['FVS_TreeInit_Stand_ID', 'FVS_TreeInit', 'Stand_ID']]
+
+# DIGESTS OF THE EXPORTED ROWS OF EACH STAND, USED BY THE FVS SYNC MODE (NOT AN FVS TABLE)
+DIGEST_COLS = ['treetopper_Digests', [['Stand_ID', 'TEXT PRIMARY KEY'], ['Digest', 'TEXT']]]
+
 
 
 
@@ -11,4 +11,23 @@ class ImportSheetError(Exception):
     def __init__(self, filename, message_bucket):
         mesaages = '\n-'.join(message_bucket)
         self.message = f'\nFile: {filename}\n-{mesaages}'
-        super(ImportSheetError, self).__init__(self.message)
\ No newline at end of file
+        super(ImportSheetError, self).__init__(self.message)
+
+
+class SnapshotError(Exception):
+    def __init__(self, path, message):
+        self.message = f'\nSnapshot: {path}\n-{message}'
+        super(SnapshotError, self).__init__(self.message)
+
+
+class StrataError(Exception):
+    def __init__(self, stand_name, problem):
+        self.message = f'Stand {stand_name} cannot be added to the Strata. {problem}'
+        super(StrataError, self).__init__(self.message)
+
+
+class BatchConfigError(Exception):
+    def __init__(self, config_file, message_bucket):
+        messages = '\n-'.join(message_bucket)
+        self.message = f'\nConfig: {config_file}\n-{messages}'
+        super(BatchConfigError, self).__init__(self.message)
@@ -0,0 +1,189 @@
+import numpy as np
+from csv import (
+    writer,
+    excel
+)
+from treetopper.plot import Plot
+from treetopper.timber import (
+    TimberQuick,
+    TimberFull
+)
+from treetopper._columns import get_stand_columns
+from treetopper._constants import (
+    ALL_SPECIES_NAMES,
+    GRADE_NAMES
+)
+from treetopper._log_batch import add_full_logs
+from treetopper._exceptions import ImportSheetError
+
+try:
+    import pandas
+except ImportError:
+    pandas = None
+
+try:
+    import pyarrow
+    from pyarrow import (
+        ipc,
+        parquet
+    )
+except ImportError:
+    pyarrow = None
+
+
+# LONG-FORMAT LOG TABLE COLUMNS -- [Column Name, Numpy dtype], one row per log, 'plot' and 'tree' are the plot and tree numbers
+LOG_TABLE_COLUMNS = [['stand', 'U'], ['plot', 'i8'], ['tree', 'i8'], ['log', 'i8'], ['stem_height', 'i8'], ['length', 'i8'],
+                     ['grade', 'U2'], ['defect', 'i8'], ['top_dib', 'i8'], ['bf', 'i8'], ['cf', 'f8']]
+
+CHUNK_SIZE = 50000
+
+# COLUMNS NEEDED BY from_frame, THE QUICK CRUISE COLUMNS pref_log AND min_log ARE OPTIONAL (DEFAULTS OF 40 AND 16)
+FRAME_TREE_COLUMNS = ['plot', 'species', 'dbh', 'height']
+FRAME_LOG_COLUMNS = ['tree', 'stem_height', 'length', 'grade', 'defect']
+
+
+def iter_log_table(stand, chunk_size: int = CHUNK_SIZE):
+    """Yields the stand's long-format log table in chunks of up to chunk_size logs, each chunk is a dictionary of numpy arrays
+       (a list for the stand column) keyed by the LOG_TABLE_COLUMNS names. The chunks are sliced from the stand's cached tree and log columns"""
+    columns = get_stand_columns(stand)
+    trees = columns['trees']
+    logs = columns['logs']
+    for start in range(0, len(logs['tree']), chunk_size):
+        tree_idx = logs['tree'][start: start + chunk_size]
+        chunk = {'stand': [stand.name] * len(tree_idx),
+                 'plot': trees['plot'][tree_idx] + 1,
+                 'tree': trees['tree'][tree_idx]}
+        for col, _ in LOG_TABLE_COLUMNS[3:]:
+            chunk[col] = logs[col][start: start + chunk_size]
+        yield chunk
+
+
+def log_table_to_csv(stand, file: str, chunk_size: int = CHUNK_SIZE):
+    """Writes the stand's long-format log table to a CSV file, chunk by chunk"""
+    cols = [col for col, _ in LOG_TABLE_COLUMNS]
+    with open(file, 'w', newline='') as csv_file:
+        csv_write = writer(csv_file, dialect=excel)
+        csv_write.writerow(cols)
+        for chunk in iter_log_table(stand, chunk_size):
+            csv_write.writerows(zip(*[chunk[col] if col == 'stand' else chunk[col].tolist() for col in cols]))
+
+
+def log_table_to_arrow(stand, file: str, file_format: str = 'parquet', chunk_size: int = CHUNK_SIZE):
+    """Writes the stand's long-format log table to a Parquet (file_format='parquet') or Arrow IPC (file_format='arrow') file,
+       each chunk is written as a record batch (a row group for Parquet). Requires pyarrow"""
+    if pyarrow is None:
+        raise ImportError('pyarrow is required to write Parquet or Arrow files, install it with "pip install pyarrow"')
+    if file_format not in ['parquet', 'arrow']:
+        raise ValueError(f'file_format must be "parquet" or "arrow", not "{file_format}"')
+
+    schema = pyarrow.schema([(col, _get_arrow_type(dtype)) for col, dtype in LOG_TABLE_COLUMNS])
+    if file_format == 'parquet':
+        file_writer = parquet.ParquetWriter(file, schema)
+    else:
+        file_writer = ipc.new_file(file, schema)
+    with file_writer:
+        for chunk in iter_log_table(stand, chunk_size):
+            batch = pyarrow.record_batch([pyarrow.array(chunk[col], type=schema.field(col).type) for col in schema.names], schema=schema)
+            if file_format == 'parquet':
+                file_writer.write_table(pyarrow.Table.from_batches([batch]))
+            else:
+                file_writer.write_batch(batch)
+
+
+def to_frame(stand, level: str = 'trees'):
+    """Returns a pandas DataFrame of the stand's tree-level (level='trees') or log-level (level='logs') columns. The DataFrame is
+       built on the stand's cached numpy columns without copying the numeric columns. Requires pandas"""
+    if pandas is None:
+        raise ImportError('pandas is required to create DataFrames, install it with "pip install pandas"')
+    if level not in ['trees', 'logs']:
+        raise ValueError(f'level must be "trees" or "logs", not "{level}"')
+    return pandas.DataFrame(get_stand_columns(stand)[level], copy=False)
+
+
+def get_frame_plots(trees, cruise_type: str, plot_factor: float, logs=None, height_model=None):
+    """Returns a list of Plot Classes from a DataFrame (or a dictionary of arrays) of trees with the columns plot, species, dbh
+       and height, the trees are grouped into plots by the plot column in the order the plots are first found.
+
+       Trees without a height get one from the average height-to-diameter ratio of the trees with heights, or from the
+       HeightModel (after the trees with heights are added to it), as with the cruise sheet imports. For full cruises the logs
+       are a DataFrame with the columns tree (the row position of the log's tree within trees), stem_height, length, grade and
+       defect, the same layout as to_frame(stand, 'logs'). The species and grade codes are checked as they are for the cruise
+       sheets, an ImportSheetError lists every tree and log that is wrong"""
+    messages = [f'Trees are missing the column ({col})' for col in FRAME_TREE_COLUMNS if col not in trees]
+    if cruise_type == 'f':
+        if logs is None:
+            messages.append('Full cruises need a logs DataFrame')
+        else:
+            messages += [f'Logs are missing the column ({col})' for col in FRAME_LOG_COLUMNS if col not in logs]
+    if messages:
+        raise ImportSheetError('DataFrame', messages)
+
+    plot = _get_frame_column(trees, 'plot').tolist()
+    species = _check_frame_codes(_get_frame_column(trees, 'species'), ALL_SPECIES_NAMES, 'Tree {} Incorrect Species Code ({})', messages)
+    if cruise_type == 'f':
+        tree_idx = _get_frame_column(logs, 'tree')
+        grades = _check_frame_codes(_get_frame_column(logs, 'grade'), GRADE_NAMES, 'Log {} Incorrect Grade Code ({})', messages)
+        outside = np.flatnonzero((tree_idx < 0) | (tree_idx >= len(plot)))
+        messages += [f'Log {i} Tree ({tree_idx[i]}) is not a row of the trees' for i in outside.tolist()]
+    if messages:
+        raise ImportSheetError('DataFrame', messages)
+    dbh = _get_frame_column(trees, 'dbh').astype(float)
+    height = _get_frame_column(trees, 'height').astype(float)
+    has_height = height > 0
+    if height_model is not None and has_height.any():
+        height_model.add_trees(np.asarray(species)[has_height], dbh[has_height], height[has_height])
+    if height_model is not None and height_model.fitted:
+        if not has_height.all():
+            height[~has_height] = height_model.predict(np.asarray(species)[~has_height], dbh[~has_height])
+    elif not has_height.any():
+        raise ImportSheetError('DataFrame', ['At least one tree needs a height to calculate the missing heights'])
+    elif not has_height.all():
+        hdr = (height[has_height] / (dbh[has_height] / 12)).mean()
+        height[~has_height] = ((dbh[~has_height] / 12) * hdr).round(1)
+    dbh = dbh.tolist()
+    height = height.tolist()
+
+    plots = {}
+    if cruise_type == 'q':
+        count = len(plot)
+        pref_log = _get_frame_column(trees, 'pref_log').tolist() if 'pref_log' in trees else [40] * count
+        min_log = _get_frame_column(trees, 'min_log').tolist() if 'min_log' in trees else [16] * count
+        for i in range(count):
+            plots.setdefault(plot[i], Plot()).add_tree(TimberQuick(plot_factor, species[i], dbh[i], height[i], pref_log[i], min_log[i]))
+    else:
+        tree_logs = [[] for _ in plot]
+        log_cols = [grades if col == 'grade' else _get_frame_column(logs, col).tolist() for col in FRAME_LOG_COLUMNS]
+        for tree_idx, stem_height, length, grade, defect in zip(*log_cols):
+            tree_logs[tree_idx].append([stem_height, length, grade, defect])
+        frame_trees = [TimberFull(plot_factor, species[i], dbh[i], height[i]) for i in range(len(plot))]
+        add_full_logs(frame_trees, tree_logs)
+        for i, tree in enumerate(frame_trees):
+            plots.setdefault(plot[i], Plot()).add_tree(tree)
+    return list(plots.values())
+
+
+def _get_frame_column(frame, col: str):
+    """Returns a column of a DataFrame (or a dictionary of arrays) as a numpy array, without copying when possible, used internally"""
+    column = frame[col]
+    if hasattr(column, 'to_numpy'):
+        return column.to_numpy()
+    return np.asarray(column)
+
+
+def _check_frame_codes(column, codes: dict, message: str, messages: list):
+    """Returns the column's codes in upper case as a list, and adds a message (formatted with the row position and the value)
+       to messages for each value that is not one of the codes, used internally"""
+    upper = np.char.upper(column.astype(str))
+    wrong = np.flatnonzero(~np.isin(upper, list(codes)))
+    messages += [message.format(i, column[i]) for i in wrong.tolist()]
+    return upper.tolist()
+
+
+def _get_arrow_type(dtype: str):
+    """Returns the pyarrow type of a LOG_TABLE_COLUMNS numpy dtype, used internally"""
+    if dtype.startswith('U'):
+        return pyarrow.string()
+    elif dtype == 'i8':
+        return pyarrow.int64()
+    else:
+        return pyarrow.float64()
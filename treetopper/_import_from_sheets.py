@@ -1,15 +1,51 @@
+import json
+import numpy as np
 from csv import reader
+from itertools import (
+    islice,
+    zip_longest
+)
+from fractions import Fraction
 from openpyxl import load_workbook
+from sqlite3 import connect as sqcon
 from statistics import mean
+from treetopper.plot import Plot
+from treetopper.timber import (
+    TimberQuick,
+    TimberFull
+)
+from treetopper._columns import (
+    get_tree_columns,
+    get_log_columns
+)
 from treetopper._constants import (
-    SHEET_ROW_COL_CONV,
-    SHEET_FULL_LOG_CONV
+    ALL_SPECIES_NAMES,
+    GRADE_NAMES,
+    SHEET_ROW_COL_CHECKS,
+    SHEET_STUMP_CHECK,
+    SHEET_FULL_LOG_CHECKS
 )
+from treetopper.height_model import HeightModel
+from treetopper._log_batch import add_full_logs
 from treetopper._exceptions import ImportSheetError
-from treetopper._utils import (
-    get_extension,
-    is_err_num
+from treetopper._phases import (
+    phase,
+    phase_iter
 )
+from treetopper._utils import get_extension
+
+
+# FILLS THE CELLS PAST THE END OF A SHORTER ROW WHEN CHECKING THE COLUMNS OF A SHEET
+_MISSING = object()
+
+# NUMBER OF ROWS CHECKED AT ONCE WHEN STREAMING AN IMPORT
+CHECK_CHUNK_SIZE = 10000
+
+# NUMBER OF ROWS WRITTEN AT ONCE TO THE TEMPORARY DATABASE WHEN GROUPING THE ROWS OF AN UNSORTED FILE BY PLOT
+SPILL_CHUNK_SIZE = 10000
+
+# NUMBER OF PLOTS ADDED TO THE STAND AT ONCE WHEN STREAMING AN IMPORT
+STREAM_PLOT_BATCH = 500
 
 
 def read_csv(file, stand_name):
@@ -43,17 +79,7 @@ def read_excel(file, stand_name):
 
 
 def error_check_quick(file, data_from_sheet):
-    clean_rows = []
-    error_message_bucket = []
-    for i, row in enumerate(data_from_sheet):
-        data = [row[0]]
-        for j, col in enumerate(row[1:8], 1):
-            error, val, message = SHEET_ROW_COL_CONV[j](col, i, j)
-            if error:
-                error_message_bucket.append(message)
-            data.append(val)
-        clean_rows.append(data)
-
+    clean_rows, error_message_bucket = check_columns(data_from_sheet, 'q')
     if error_message_bucket:
         raise ImportSheetError(file, error_message_bucket)
     else:
@@ -61,54 +87,217 @@ def error_check_quick(file, data_from_sheet):
 
 
 def error_check_full(file, data_from_sheet):
-    clean_rows = []
-    error_message_bucket = []
-    for i, row in enumerate(data_from_sheet):
-        data = [row[0]]
-        # Main Data Check
-        for j, col in enumerate(row[1:6], 1):
-            error, val, message = SHEET_ROW_COL_CONV[j](col, i, j)
-            if error:
-                error_message_bucket.append(message)
-            data.append(val)
+    clean_rows, error_message_bucket = check_columns(data_from_sheet, 'f')
+    if error_message_bucket:
+        raise ImportSheetError(file, error_message_bucket)
+    else:
+        return clean_rows
+
+
+def check_columns(data_from_sheet, cruise_type, start=0):
+    """Checks and converts the rows of a cruise sheet column by column, returns the clean rows and the list of error messages
+       (the clean rows are empty if there are errors). start is the row number of the first row, for checking a file in chunks.
+
+       Each column is checked as a numpy array with its check from SHEET_ROW_COL_CHECKS or SHEET_FULL_LOG_CHECKS, numbers
+       are parsed with masks of the blank and the plainly written cells, species and grades are looked up in ALL_SPECIES_NAMES
+       and GRADE_NAMES, and messages are only built for the failing cells. The values and messages are the same, and the
+       messages are in the same order (row by row), as checking each cell with SHEET_ROW_COL_CONV and SHEET_FULL_LOG_CONV"""
+    rows = data_from_sheet if isinstance(data_from_sheet, list) else list(data_from_sheet)
+    if not rows:
+        return [], []
+    # The rows are transposed into columns, cells past the end of a shorter row are _MISSING
+    sheet_cols = list(zip_longest(*rows, fillvalue=_MISSING))
+    errors = []
+    columns = {}
+
+    main_cols = range(1, 8) if cruise_type == 'q' else range(1, 6)
+    for j in main_cols:
+        if j < len(sheet_cols):
+            columns[j] = _check_column(sheet_cols[j], j, SHEET_ROW_COL_CHECKS[j], j, start, errors)
 
+    log_slots = []
+    if cruise_type == 'f':
         # Stump Height Check
-        error, stem_height, message = is_err_num(row[6], i, 7, int, default=1)
-        if error:
-            error_message_bucket.append(message)
-
-        # Logs Check
-        logs = []
-        for j in range(7, len(row), 4):
-            log_length = row[j]
-            if log_length != '' and log_length is not None:
-                log = row[j: j + 4]
-                clean_log = []
-                for k, lg in enumerate(log):
-                    error, val, message = SHEET_FULL_LOG_CONV[k](lg, i, j+k)
-                    if error:
-                        error_message_bucket.append(message)
-                    clean_log.append(val)
+        columns[6] = _check_column(sheet_cols[6], 6, SHEET_STUMP_CHECK, 7, start, errors)
+
+        # Logs Check, a log is within the row if its length is filled
+        for j in range(7, len(sheet_cols), 4):
+            lengths = _get_column_array(sheet_cols[j])
+            present = (lengths != _MISSING) & ~_get_blank_mask(lengths)
+            if not present.any():
+                continue
+            log_slots.append(j)
+            for k in range(min(4, len(sheet_cols) - j)):
+                column = np.where(present, _get_column_array(sheet_cols[j + k]), _MISSING)
+                columns[j + k] = _check_column(column, j + k, SHEET_FULL_LOG_CHECKS[k], j + k, start, errors)
+
+    if errors:
+        errors.sort(key=lambda x: (x[0], x[1]))
+        return [], [message for _, _, message in errors]
+
+    main = [columns[j] for j in main_cols if j in columns]
+    if min(map(len, rows)) > main_cols[-1]:
+        clean_rows = list(map(list, zip(sheet_cols[0], *main)))
+    else:
+        clean_rows = [[row[0]] + [col[i] for col in main[:len(row) - 1]] for i, row in enumerate(rows)]
+
+    if cruise_type == 'f':
+        row_lengths = np.array(list(map(len, rows)))
+        for data, logs in zip(clean_rows, _get_row_logs(columns, log_slots, row_lengths)):
+            data.append(logs)
+    return clean_rows, []
+
 
+def _get_row_logs(columns, log_slots, row_lengths):
+    """Returns the list of logs ([Stem Height, Length, Grade, Defect]) of each row from the checked log columns. The stem heights
+       are the stump height plus the running sum of each log's length + 1 and the feet between logs, used internally"""
+    row_count = len(row_lengths)
+    present = {j: np.array([val is not _MISSING for val in columns[j]], dtype=bool) for j in log_slots}
+    if not all((row_lengths[present[j]] > j + 3).all() for j in log_slots):
+        # A row ending part way through a log, its last value is used as the feet between logs, as with checking each cell
+        row_logs = []
+        for i in range(row_count):
+            stem_height = columns[6][i]
+            logs = []
+            for j in log_slots:
+                if columns[j][i] is _MISSING:
+                    continue
+                clean_log = [columns[j + k][i] for k in range(4) if j + k in columns and columns[j + k][i] is not _MISSING]
                 stem_height += clean_log[0] + 1
                 # log_args = [Stem Height, Length, Grade, Defect]
                 log_args = [stem_height] + clean_log[:3]
                 stem_height += clean_log[-1]
-
                 logs.append(log_args)
+            row_logs.append(logs)
+        return row_logs
 
-        data.append(logs)
-        clean_rows.append(data)
+    row_logs = [[] for _ in range(row_count)]
+    stem_height = np.array(columns[6], dtype=np.int64)
+    for j in log_slots:
+        idxs = np.flatnonzero(present[j])
+        length = np.array([columns[j][i] for i in idxs.tolist()], dtype=np.int64)
+        between = np.array([columns[j + 3][i] for i in idxs.tolist()], dtype=np.int64)
+        stem_height[idxs] += length + 1
+        for i, stem in zip(idxs.tolist(), stem_height[idxs].tolist()):
+            row_logs[i].append([stem, columns[j][i], columns[j + 1][i], columns[j + 2][i]])
+        stem_height[idxs] += between
+    return row_logs
 
-    if error_message_bucket:
-        raise ImportSheetError(file, error_message_bucket)
+
+def _check_column(column, position, check, col_num, start, errors):
+    """Checks and converts one column of cells (_MISSING where a row does not have the cell) with a column check, appends
+       (row, position, message) to errors for the failing cells and returns the list of converted values, used internally"""
+    values = _get_column_array(column)
+    missing = values == _MISSING
+    blank = ~missing & _get_blank_mask(values)
+    filled = np.flatnonzero(~missing & ~blank)
+    converted = values.copy()
+
+    if check[0] == 'number':
+        _, num_type, required, default = check
+        if required and default is None:
+            errors += [(i, position, f'Row {start + i + 1}, Col {col_num + 1} Cannot be blank') for i in np.flatnonzero(blank).tolist()]
+        else:
+            converted[blank] = default
+        cells = values[filled]
+        numbers, parsed = _parse_numbers(cells, num_type)
+        with np.errstate(invalid='ignore'):
+            negative = parsed & (numbers < 0).astype(bool)
+        for i in np.flatnonzero(~parsed).tolist():
+            errors.append((filled[i], position, f'Row {start + filled[i] + 1}, Col {col_num + 1} Value: ({cells[i]}) has to be a number'))
+        for i in np.flatnonzero(negative).tolist():
+            errors.append((filled[i], position, f'Row {start + filled[i] + 1}, Col {col_num + 1} Value: ({cells[i]}) cannot be negative'))
+        converted[filled[parsed]] = numbers[parsed]
     else:
-        return clean_rows
+        name, codes, blank_message = ['Species', ALL_SPECIES_NAMES, 'Species cannot be blank'] if check[0] == 'species' else \
+                                     ['Grade', GRADE_NAMES, 'Grade cannot be blank if Log Length is filled']
+        errors += [(i, position, f'Row {start + i}, Col {col_num} {blank_message}') for i in np.flatnonzero(blank).tolist()]
+        cells = values[filled]
+        codes_found, known = _get_codes(cells, codes, reverse=check[0] == 'grade')
+        for i in np.flatnonzero(~known).tolist():
+            errors.append((filled[i], position, f'Row {start + filled[i]}, Col {col_num} Incorrect {name} Code ({cells[i]})'))
+        converted[filled[known]] = codes_found[known]
+    return converted.tolist()
 
 
-def get_plots(clean_data):
+def _get_column_array(column):
+    """Returns a column of cells as a numpy object array, used internally"""
+    if isinstance(column, np.ndarray):
+        return column
+    values = np.empty(len(column), dtype=object)
+    values[:] = column
+    return values
+
+
+def _get_blank_mask(values):
+    """Returns a boolean array of the blank cells ('' or None) of an object array, used internally"""
+    return (values == '') | np.equal(values, None).astype(bool)
+
+
+def _parse_numbers(cells, num_type):
+    """Returns an object array of the filled cells as num_type (int or float) numbers and a boolean array of the cells that are
+       numbers. Number strings that are plainly written (digits with a sign and a decimal point for floats) and the numeric
+       cells of Excel sheets are parsed as arrays, the other cells (such as '1e3', 'nan' or a mistyped number) are parsed on
+       their own with num_type, as with checking each cell, used internally"""
+    dtype = np.int64 if num_type is int else np.float64
+    numbers = np.zeros(len(cells), dtype=dtype)
+    parsed = np.zeros(len(cells), dtype=bool)
+    kinds = np.array(list(map(type, cells)), dtype=object)
+
+    idx = np.flatnonzero(kinds == str)
+    if len(idx):
+        text = np.char.strip(cells[idx].astype(str))
+        digits = np.char.lstrip(text, '+-')
+        one_sign = (np.char.str_len(text) - np.char.str_len(digits)) <= 1
+        if num_type is int:
+            # Longer numbers could overflow an int64, they are parsed on their own
+            plain = one_sign & np.char.isdecimal(digits) & (np.char.str_len(digits) <= 18)
+        else:
+            plain = one_sign & np.char.isdecimal(np.char.replace(digits, '.', '', 1))
+        numbers[idx[plain]] = text[plain].astype(dtype)
+        parsed[idx[plain]] = True
+
+    idx = np.flatnonzero((kinds == int) | (kinds == float))
+    if len(idx):
+        values = cells[idx].astype(np.float64)
+        # int() of an Excel float truncates it, numbers too large to be exact as floats are parsed on their own
+        plain = np.isfinite(values) & (np.abs(values) < 2 ** 53)
+        numbers[idx[plain]] = np.trunc(values[plain]) if num_type is int else values[plain]
+        parsed[idx[plain]] = True
+
+    numbers = numbers.astype(object)
+    for i in np.flatnonzero(~parsed).tolist():
+        try:
+            numbers[i] = num_type(cells[i])
+            parsed[i] = True
+        except (ValueError, TypeError, OverflowError):
+            pass
+    return numbers, parsed
+
+
+def _get_codes(cells, codes, reverse=False):
+    """Returns an array of the cells in upper case and a boolean array of the cells that are one of the codes, if reverse is True
+       the cells that are a code backwards (such as "2S" for "S2") are turned around, used internally"""
+    is_str = np.array(list(map(type, cells)), dtype=object) == str
+    upper = np.char.upper(cells.astype(str))
+    known = is_str & np.isin(upper, list(codes))
+    if reverse and not known.all():
+        unknown = np.flatnonzero(is_str & ~known)
+        backwards = np.array([code[::-1] for code in upper[unknown].tolist()], dtype=upper.dtype)
+        found = np.isin(backwards, list(codes))
+        upper[unknown[found]] = backwards[found]
+        known[unknown[found]] = True
+    return upper.astype(object), known
+
+
+def get_plots(clean_data, height_model=None):
     plots = {}
-    hdr = get_hdr(clean_data)
+    # The missing heights are filled from the HeightModel if it is fitted, otherwise from the sheet's average hdr
+    hdr = None
+    if height_model is not None and height_model.fitted:
+        fill_model_heights(clean_data, height_model)
+    else:
+        hdr = get_hdr(clean_data)
     for row in clean_data:
         plot = row[1]
         if plot not in plots:
@@ -127,20 +316,268 @@ def get_hdr(clean_data):
     return mean([row[5] / (row[4] / 12) for row in clean_data if row[5]])
 
 
-def import_from_sheet(file, stand_name, cruise_type):
+def add_model_trees(clean_data, height_model):
+    """Adds the trees with total heights from the checked rows to the HeightModel"""
+    measured = [row for row in clean_data if row[5]]
+    if measured:
+        height_model.add_trees([row[3] for row in measured], [row[4] for row in measured], [row[5] for row in measured])
+
+
+def fill_model_heights(clean_data, height_model):
+    """Fills the total heights of the checked rows without one from the HeightModel, all of the rows are predicted at once"""
+    missing = [row for row in clean_data if not row[5]]
+    if missing:
+        heights = height_model.predict([row[3] for row in missing], [row[4] for row in missing]).tolist()
+        for row, height in zip(missing, heights):
+            row[5] = height
+
+
+def read_from_sheet(file, stand_name, cruise_type):
+    """Returns the checked rows of the stand within a CSV or Excel file, the missing total heights are not filled"""
     ext = get_extension(file)
     if ext in ['.csv', '.xlsx']:
-        if ext == '.csv':
-            data = read_csv(file, stand_name)
-        else:
-            data = read_excel(file, stand_name)
+        with phase('parse'):
+            if ext == '.csv':
+                data = read_csv(file, stand_name)
+            else:
+                data = read_excel(file, stand_name)
+
+        with phase('validate'):
+            if cruise_type == 'q':
+                return error_check_quick(file, data)
+            else:
+                return error_check_full(file, data)
+    else:
+        raise ImportSheetError(file, [f'Not a valid sheet file with extension ({ext})', 'Need either .csv or .xlsx'])
+
+
+def import_from_sheet(file, stand_name, cruise_type, height_model=None):
+    clean = read_from_sheet(file, stand_name, cruise_type)
+    with phase('heights'):
+        if height_model is not None:
+            add_model_trees(clean, height_model)
+        return get_plots(clean, height_model)
+
+
+def get_sheet_plots(plots_trees, cruise_type, plot_factor):
+    """Returns a list of Plot Classes of the tree data of many plots from a cruise sheet (values of get_plots). For full cruises
+       the logs of all of the plots' trees are added in one batch (add_full_logs), the same as adding them one at a time"""
+    plots = []
+    if cruise_type == 'q':
+        for trees in plots_trees:
+            plot = Plot()
+            for tree_data in trees:
+                plot.add_tree(TimberQuick(plot_factor, *tree_data))
+            plots.append(plot)
+    else:
+        sheet_trees = [[TimberFull(plot_factor, *tree_data[: -1]) for tree_data in trees] for trees in plots_trees]
+        add_full_logs([tree for trees in sheet_trees for tree in trees],
+                      [tree_data[-1] for trees in plots_trees for tree_data in trees])
+        for trees in sheet_trees:
+            plot = Plot()
+            for tree in trees:
+                plot.add_tree(tree)
+            plots.append(plot)
+    return plots
+
+
+def get_sheet_columns(plots, cruise_type, plot_factor):
+    """Returns the plot count and the tree-level and log-level columns of the plots from a cruise sheet (the get_plots dict),
+       so the cruised plots can be sent back from a worker process as arrays and restored with restore_plots"""
+    sheet_plots = get_sheet_plots(list(plots.values()), cruise_type, plot_factor)
+    return len(sheet_plots), get_tree_columns(sheet_plots), get_log_columns(sheet_plots)
+
+
+def iter_csv(file, stand_name):
+    """Yields the rows of the stand within a CSV file, one row at a time"""
+    with open(file, 'r') as csv_file:
+        csv_read = reader(csv_file)
+        next(csv_read)
+        for row in csv_read:
+            if row[0].upper() == stand_name.upper():
+                yield row
 
-        if cruise_type == 'q':
-            clean = error_check_quick(file, data)
-        else:
-            clean = error_check_full(file, data)
 
-        return get_plots(clean)
+def iter_excel(file, stand_name):
+    """Yields the rows of the stand within an Excel file, one row at a time from a read-only workbook"""
+    wb = load_workbook(file, read_only=True, data_only=True)
+    try:
+        for row in wb.active.iter_rows(min_row=2, values_only=True):
+            if row[0].upper() == stand_name.upper():
+                yield row
+    finally:
+        wb.close()
+
+
+def get_sheet_stands(file):
+    """Returns the names (upper case) of the stands within a CSV or Excel file in the order they are first found"""
+    ext = get_extension(file)
+    if ext == '.csv':
+        with open(file, 'r') as csv_file:
+            csv_read = reader(csv_file)
+            next(csv_read, None)
+            names = [row[0] for row in csv_read if row and row[0]]
+    elif ext == '.xlsx':
+        wb = load_workbook(file, read_only=True, data_only=True)
+        try:
+            names = [row[0] for row in wb.active.iter_rows(min_row=2, max_col=1, values_only=True) if row and row[0]]
+        finally:
+            wb.close()
     else:
         raise ImportSheetError(file, [f'Not a valid sheet file with extension ({ext})', 'Need either .csv or .xlsx'])
+    return list(dict.fromkeys(str(name).upper() for name in names))
+
+
+def stream_from_sheet(file, stand_name, cruise_type, sorted_by_plot=False, height_model=None):
+    """Yields the plots of the stand within a CSV or Excel file as lists of tree data (the same as the values of get_plots),
+       each plot is yielded as soon as all of its rows have been read, without holding the whole file in memory.
+
+       The file is read twice, the first pass checks every row and finds the stand's average height-to-diameter ratio,
+       so errors are raised (all together, as with import_from_sheet) before any plots are yielded. If a HeightModel is
+       given, the first pass adds the measured trees to it and the missing total heights are predicted chunk by chunk.
+
+       If sorted_by_plot is True, the rows of each plot need to be together within the file and a plot is yielded when the
+       next plot starts. Otherwise the checked rows are spilled to a temporary on-disk SQLite database and grouped by plot there"""
+    ext = get_extension(file)
+    if ext not in ['.csv', '.xlsx']:
+        raise ImportSheetError(file, [f'Not a valid sheet file with extension ({ext})', 'Need either .csv or .xlsx'])
+    iter_rows = iter_csv if ext == '.csv' else iter_excel
+
+    # First pass, checks the rows and sums the height-to-diameter ratios
+    error_message_bucket = []
+    hdr_sum = Fraction(0)
+    hdr_count = 0
+    row_count = 0
+    missing_height = False
+    finished_plots = set()
+    unsorted_plots = set()
+    current_plot = None
+    sheet_model = HeightModel(height_model.form, height_model.min_trees) if height_model is not None else None
+    measured = []
+    # The ratios and measured trees are summed for the heights, the rows are parsed and validated as they are pulled
+    with phase('heights'):
+        for data in _iter_checked_rows(phase_iter('parse', iter_rows(file, stand_name)), cruise_type, error_message_bucket):
+            row_count += 1
+            if data is None:
+                continue
+            if data[5]:
+                hdr_sum += Fraction(data[5] / (data[4] / 12))
+                hdr_count += 1
+                if height_model is not None:
+                    measured.append(data)
+                    if len(measured) == CHECK_CHUNK_SIZE:
+                        add_model_trees(measured, sheet_model)
+                        measured = []
+            else:
+                missing_height = True
+            if sorted_by_plot and data[1] != current_plot:
+                if data[1] in finished_plots and data[1] not in unsorted_plots:
+                    unsorted_plots.add(data[1])
+                    error_message_bucket.append(f'Rows of Plot {data[1]} are not together, the file is not sorted by plot')
+                finished_plots.add(current_plot)
+                current_plot = data[1]
+
+    if height_model is not None:
+        add_model_trees(measured, sheet_model)
+    if not row_count:
+        raise ImportSheetError(file, [f'Could not find Stand ({stand_name}) within file'])
+    if missing_height and not hdr_count and (height_model is None or not height_model.fitted):
+        error_message_bucket.append('At least one tree needs a total height to calculate the missing total heights')
+    if error_message_bucket:
+        raise ImportSheetError(file, error_message_bucket)
+    # The measured trees are only added to the stand's model once the sheet has no errors
+    if height_model is not None:
+        height_model.update(sheet_model)
+    # Same as statistics.mean, the exact sum of the ratios over the count rounded once
+    hdr = float(hdr_sum / hdr_count) if hdr_count else 0
+
+    # Second pass, yields the plots
+    rows = _iter_checked_rows(phase_iter('parse', iter_rows(file, stand_name)), cruise_type, [])
+    if height_model is not None and height_model.fitted:
+        rows = _fill_model_chunks(rows, height_model)
+    else:
+        rows = (_fill_height(data, hdr) for data in rows)
+    if sorted_by_plot:
+        yield from phase_iter('heights', _group_sorted_rows(rows))
+    else:
+        yield from phase_iter('heights', _group_spilled_rows(rows))
+
+
+def _iter_checked_rows(rows, cruise_type, error_message_bucket):
+    """Yields the clean rows of the sheet rows, checked in chunks of CHECK_CHUNK_SIZE rows with check_columns. The error messages
+       are added to error_message_bucket and the rows of a chunk with errors are yielded as None, used internally"""
+    start = 0
+    chunk = list(islice(rows, CHECK_CHUNK_SIZE))
+    while chunk:
+        with phase('validate'):
+            clean_rows, messages = check_columns(chunk, cruise_type, start)
+        if messages:
+            error_message_bucket += messages
+            yield from [None] * len(chunk)
+        else:
+            yield from clean_rows
+        start += len(chunk)
+        chunk = list(islice(rows, CHECK_CHUNK_SIZE))
+
+
+def _fill_height(data, hdr):
+    """Fills the total height of a checked row without one from the stand's average height-to-diameter ratio, used internally"""
+    if not data[5]:
+        data[5] = round((data[4] / 12) * hdr, 1)
+    return data
+
+
+def _fill_model_chunks(rows, height_model):
+    """Yields the checked rows with their missing total heights predicted by the HeightModel, CHECK_CHUNK_SIZE rows at a time,
+       used internally"""
+    chunk = list(islice(rows, CHECK_CHUNK_SIZE))
+    while chunk:
+        fill_model_heights(chunk, height_model)
+        yield from chunk
+        chunk = list(islice(rows, CHECK_CHUNK_SIZE))
+
+
+def _group_sorted_rows(rows):
+    """Yields the tree data of each plot from checked rows that are sorted by plot, used internally"""
+    plot = None
+    trees = []
+    for row in rows:
+        if row[1] != plot and trees:
+            yield trees
+            trees = []
+        plot = row[1]
+        trees.append(row[3:])
+    if trees:
+        yield trees
+
+
+def _group_spilled_rows(rows, chunk_size=SPILL_CHUNK_SIZE):
+    """Yields the tree data of each plot from checked rows in any order, the rows are written to a temporary on-disk SQLite
+       database (removed when it is closed) in chunks and read back grouped by plot, in the order the plots were first found,
+       used internally"""
+    # An empty filename is a private temporary database on disk
+    con = sqcon('')
+    try:
+        con.execute('CREATE TABLE spill (plot_order INTEGER, tree_data TEXT)')
+        plot_order = {}
+        chunk = []
+        for row in rows:
+            chunk.append([plot_order.setdefault(row[1], len(plot_order)), json.dumps(row[3:])])
+            if len(chunk) == chunk_size:
+                con.executemany('INSERT INTO spill VALUES (?, ?)', chunk)
+                chunk = []
+        con.executemany('INSERT INTO spill VALUES (?, ?)', chunk)
+        con.execute('CREATE INDEX spill_plot_order ON spill (plot_order)')
 
+        plot = None
+        trees = []
+        for order, tree_data in con.execute('SELECT plot_order, tree_data FROM spill ORDER BY plot_order, rowid'):
+            if order != plot and trees:
+                yield trees
+                trees = []
+            plot = order
+            trees.append(json.loads(tree_data))
+        if trees:
+            yield trees
+    finally:
+        con.close()
@@ -0,0 +1,92 @@
+import numpy as np
+from treetopper.log import Log
+from treetopper._constants import (
+    TAPER_EQ,
+    TAPER_DIB,
+    TAPER_EQ_COEF,
+    SCRIBNER_DICT,
+    GRADE_NAMES
+)
+
+
+# DIBS WITHIN THIS DISTANCE OF A WHOLE NUMBER ARE RECALCULATED WITH THE SCALAR TAPER EQUATION, SO THE FLOORED
+# TOP DIBS ARE THE SAME AS THE Log CLASS NO MATTER HOW NUMPY ROUNDS THE LAST DIGIT OF log, exp AND pow
+DIB_RECHECK = 1e-6
+
+
+# SCRIBNER COEFFICIENTS BY TOP DIB (ROWS) AND LOG LENGTH CLASS (COLUMNS: < 16, 16 - 31, >= 32 FEET)
+SCRIBNER_TABLE = np.array([val if isinstance(val, list) else [val] * 3 for _, val in sorted(SCRIBNER_DICT.items())])
+
+
+def add_full_logs(trees, tree_logs):
+    """Adds the logs (lists of [stem height, length, grade, defect]) of each TimberFull tree within trees, the same as calling
+       add_log for each log but the top DIBs, Scribner coefficients, board feet and cubic feet of all of the logs are calculated
+       in numpy batches (by taper equation) and each tree's volumes are recalculated once.
+
+       The logs are identical to the ones add_log creates, top DIBs close to a whole number and logs the arrays cannot handle
+       (such as a stem height above the tree's height) are sent through the Log Class one at a time, in order, so they raise the
+       same errors as add_log"""
+    tree_idx = [i for i, logs in enumerate(tree_logs) for _ in logs]
+    if not tree_idx:
+        return
+    flat = [log for logs in tree_logs for log in logs]
+    stem_heights = [log[0] for log in flat]
+    lengths = [log[1] for log in flat]
+    grades = [log[2].upper() for log in flat]
+    defects = [log[3] for log in flat]
+    log_trees = [trees[i] for i in tree_idx]
+    starts = [max(tree.logs, default=0) + 1 for tree in trees]
+    nums = [num for start, logs in zip(starts, tree_logs) for num in range(start, start + len(logs))]
+
+    top_dibs, checked = _get_top_dibs(trees, tree_idx, stem_heights)
+    scrib, bf, cf = _get_volumes(top_dibs, np.array(lengths), np.array(defects), checked)
+    known_grade = [grade in GRADE_NAMES for grade in grades]
+    columns = zip(log_trees, nums, stem_heights, lengths, defects, grades, top_dibs.tolist(), scrib.tolist(), bf.tolist(), cf.tolist(),
+                  checked.tolist(), known_grade)
+
+    # The trees' volumes are recalculated even if a log raises an error, as add_log does for the logs before it
+    try:
+        for tree, num, stem_height, length, defect, grade, top_dib, log_scrib, log_bf, log_cf, ok, known in columns:
+            if ok and grade and known:
+                tree.logs[num] = Log(tree, stem_height, length, grade=grade, defect_pct=defect,
+                                     volumes=[top_dib, log_scrib, log_bf, log_cf])
+            else:
+                tree.logs[num] = Log(tree, stem_height, length, grade=grade, defect_pct=defect)
+    finally:
+        for tree in trees:
+            if tree.logs:
+                tree._calc_volume_and_logs()
+
+
+def _get_top_dibs(trees, tree_idx, stem_heights):
+    """Returns the floored top DIBs of the logs and a mask of the logs that the arrays could calculate, the DIBs are calculated
+       by species with the array form of the species' taper equation, used internally"""
+    species = np.array([tree.species for tree in trees])[tree_idx]
+    dbh = np.array([tree.dbh for tree in trees], dtype=float)[tree_idx]
+    height = np.array([tree.height for tree in trees])[tree_idx]
+    stem = np.array(stem_heights)
+
+    dib = np.empty(len(tree_idx), dtype=float)
+    with np.errstate(all='ignore'):
+        for spp in np.unique(species).tolist():
+            mask = species == spp
+            dib[mask] = TAPER_DIB[TAPER_EQ[spp]](dbh[mask], height[mask], stem[mask], *TAPER_EQ_COEF[spp], lib=np)
+        floor = np.floor(dib)
+        frac = dib - floor
+
+    recheck = ~np.isfinite(dib) | (frac < DIB_RECHECK) | (frac > 1 - DIB_RECHECK)
+    top_dibs = np.where(recheck, 0, floor).astype(np.int64)
+    checked = ~recheck & (top_dibs >= 0) & (top_dibs < len(SCRIBNER_TABLE))
+    return top_dibs, checked
+
+
+def _get_volumes(top_dibs, lengths, defects, checked):
+    """Returns the Scribner coefficients, board feet and cubic feet of the logs, the same formulas as the Log Class, used internally"""
+    length_class = np.where((0 < lengths) & (lengths < 16), 0, np.where((16 <= lengths) & (lengths < 32), 1, 2))
+    scrib = SCRIBNER_TABLE[np.where(checked, top_dibs, 0), length_class]
+    defect_ratio = 1 - (defects / 100)
+    bf = np.floor(lengths * scrib * defect_ratio).astype(np.int64)
+    x = np.where(lengths < 17, lengths * 0.67, lengths + 1)
+    cf = ((.005454 * x) * (((2 * ((top_dibs + 0.7) ** 2)) + (2 * (top_dibs + 0.7))) / 3)) * defect_ratio
+    return scrib, bf, cf
+
@@ -0,0 +1,47 @@
+from contextlib import contextmanager
+
+
+# THE PIPELINE PHASE CALLBACK (SET BY treetopper.profiler), CALLED WITH (phase, True) WHEN A PHASE STARTS AND (phase, False)
+# WHEN IT ENDS. PHASES CAN BE NESTED, SUCH AS THE PARSING OF ROWS THAT ARE PULLED WHILE THEY ARE VALIDATED
+_phase_callback = None
+
+
+def set_phase_callback(callback):
+    """Sets the pipeline phase callback (None removes it) and returns the callback it replaced"""
+    global _phase_callback
+    previous = _phase_callback
+    _phase_callback = callback
+    return previous
+
+
+@contextmanager
+def phase(name: str):
+    """Marks a phase of the pipeline for the phase callback, does nothing if no callback is set"""
+    callback = _phase_callback
+    if callback is None:
+        yield
+        return
+    callback(name, True)
+    try:
+        yield
+    finally:
+        callback(name, False)
+
+
+def phase_iter(name: str, iterable):
+    """Returns an iterator of the iterable with the time spent getting each item marked as the phase, for the pipeline's
+       row-by-row generators. If no callback is set the iterable is returned as is"""
+    if _phase_callback is None:
+        return iterable
+    return _phase_iter(name, iter(iterable))
+
+
+def _phase_iter(name: str, iterator):
+    """Yields the items of the iterator, marking each next() as the phase, used internally"""
+    while True:
+        with phase(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
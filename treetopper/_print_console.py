@@ -44,6 +44,24 @@ def print_stand_stats(summary_stats):
     return '\n'.join(formatted)
 
 
+def print_stand_stock(summary_table):
+    formatted = ['STAND AND STOCK TABLE']
+    for species in summary_table:
+        table_len = SPACE * len(summary_table[species][0])
+        first = '-' * SPACE * 4
+        spp_len = len(species)
+        formatted.append(first + species + ('-' * (table_len - len(first) - spp_len)))
+        for i, row in enumerate(summary_table[species]):
+            if i == len(summary_table[species]) - 1:
+                formatted.append('-' * (SPACE * len(row)))
+            formatted.append(''.join([j + (' ' * (SPACE - len(j))) for j in row]))
+            if i == 0:
+                formatted.append('-' * (SPACE * len(row)))
+        formatted.append('')
+    formatted.append('')
+    return '\n'.join(formatted)
+
+
 def print_thin(summary_thin):
     formatted = []
     for condition in summary_thin:
@@ -58,3 +76,27 @@ def print_thin(summary_thin):
     return '\n'.join(formatted)
 
 
+def print_thin_sweep(summary_sweep):
+    formatted = ['THINNING SWEEP']
+    for i, row in enumerate(summary_sweep):
+        formatted.append(''.join([j + (' ' * (SPACE - len(j))) for j in row]))
+        if i == 0:
+            formatted.append('-' * (SPACE * len(row)))
+    formatted.append('')
+    return '\n'.join(formatted)
+
+
+
+
+def print_strata(summary_strata):
+    formatted = ['STRATA']
+    for table in summary_strata:
+        table_len = SPACE * len(summary_strata[table][0])
+        first = '-' * SPACE * 2
+        formatted.append(first + table + ('-' * (table_len - len(first) - len(table))))
+        for i, row in enumerate(summary_strata[table]):
+            formatted.append(''.join([j + (' ' * (SPACE - len(j))) for j in row]))
+            if i == 0:
+                formatted.append('-' * (SPACE * len(row)))
+        formatted.append('')
+    return '\n'.join(formatted)
@@ -139,6 +139,70 @@ class PDF(FPDF):
                 self.ln(height)
             self.ln(height)
 
+    def compile_stand_stock_report(self, stand):
+        table_width = 190
+
+        font_family = 'Arial'
+        self.set_font(font_family, 'B', 10)
+        height = 8
+
+        self.cell(table_width, height, f'STAND AND STOCK TABLE FOR: {stand.name}', 0, 0, align='L')
+        self.ln(height * 2)
+
+        # Stand and Stock Tables by Species
+        summary_table = stand.diameter_table.summary_table
+        for species in summary_table:
+            col_len = len(summary_table[species][0])
+            col_width = int(table_width / col_len)
+            self.set_font(font_family, 'B', 8)
+
+            self.cell(col_width * col_len, height, species, 1, 0, align='C')
+            self.ln(height)
+            for i, row in enumerate(summary_table[species]):
+                if i == 0:
+                    self.set_font(font_family, 'B', 7)
+                elif i == len(summary_table[species]) - 1:
+                    self.set_font(font_family, 'B', 8)
+                else:
+                    self.set_font(font_family, '', 8)
+                for j, col in enumerate(row):
+                    if j == 0:
+                        self.cell(col_width, height, col, 1, 0, align='L')
+                    else:
+                        self.cell(col_width, height, col, 1, 0, align='C')
+                self.ln(height)
+            self.ln(height)
+
+    def compile_strata_report(self, strata):
+        table_width = 190
+
+        font_family = 'Arial'
+        self.set_font(font_family, 'B', 10)
+        height = 8
+
+        self.cell(table_width, height, f'STRATA REPORT FOR: {strata.name}', 0, 0, align='L')
+        self.ln(height * 2)
+
+        for table in strata.summary_strata:
+            col_len = len(strata.summary_strata[table][0])
+            col_width = int(table_width / col_len)
+            self.set_font(font_family, 'B', 8)
+
+            self.cell(col_width * col_len, height, table, 1, 0, align='C')
+            self.ln(height)
+            for i, row in enumerate(strata.summary_strata[table]):
+                if i == 0:
+                    self.set_font(font_family, 'B', 7)
+                else:
+                    self.set_font(font_family, '', 8)
+                for j, col in enumerate(row):
+                    if j == 0:
+                        self.cell(col_width, height, col, 1, 0, align='L')
+                    else:
+                        self.cell(col_width, height, col, 1, 0, align='C')
+                self.ln(height)
+            self.ln(height)
+
 
 
 
@@ -0,0 +1,121 @@
+import json
+import numpy as np
+from fractions import Fraction
+from os import makedirs
+from os.path import (
+    isfile,
+    join
+)
+from treetopper._columns import (
+    TREE_COLUMNS,
+    LOG_COLUMNS,
+    get_stand_columns
+)
+from treetopper.height_model import HeightModel
+from treetopper._constants import TREETOPPER_VERSION
+from treetopper._exceptions import SnapshotError
+
+
+SNAPSHOT_FORMAT_VERSION = 3
+HEADER_FILE = 'header.json'
+# THE KEY OF THE JSON OBJECTS HOLDING THE FRACTION TOTALS OF THE STAND AGGREGATE
+FRACTION_KEY = '__fraction__'
+
+# STAND ATTRIBUTES SAVED TO THE SNAPSHOT HEADER, SO REPORTS ARE AVAILABLE WITHOUT TOUCHING THE TREE AND LOG COLUMNS
+AGGREGATE_ATTRS = ['plot_count', 'tpa', 'ba_ac', 'qmd', 'rd_ac', 'bf_ac', 'cf_ac', 'avg_hgt', 'hdr', 'vbar',
+                   'tpa_stats', 'ba_ac_stats', 'rd_ac_stats', 'bf_ac_stats', 'cf_ac_stats',
+                   'species', 'species_stats', '_logs', 'summary_stand', 'summary_logs', 'summary_stats']
+
+
+def save_stand(stand, path):
+    """Saves the stand to the path directory as one raw .npy file per tree and log column and a small JSON header
+       holding the format version, the input hash, the stand's precomputed aggregates and its HeightModel sums"""
+    makedirs(path, exist_ok=True)
+    columns = get_stand_columns(stand)
+    for table, table_columns in [['trees', TREE_COLUMNS], ['logs', LOG_COLUMNS]]:
+        for col, _ in table_columns:
+            np.save(join(path, f'{table}.{col}.npy'), columns[table][col])
+
+    header = {
+        'format_version': SNAPSHOT_FORMAT_VERSION,
+        'treetopper_version': TREETOPPER_VERSION,
+        'input_hash': stand.input_hash,
+        'name': stand.name,
+        'plot_factor': stand.plot_factor,
+        'acres': stand.acres,
+        'inventory_date': stand.inv_date.strftime('%m/%d/%Y') if stand.inv_date else None,
+        'tree_count': len(columns['trees']['plot']),
+        'log_count': len(columns['logs']['tree']),
+        'aggregates': {attr: getattr(stand, attr) for attr in AGGREGATE_ATTRS},
+        'stand_aggregate': vars(stand.aggregate),
+        'height_model': stand.height_model.to_dict() if stand.height_model is not None else None
+    }
+    # The header is written last, a snapshot without a header is an incomplete save
+    with open(join(path, HEADER_FILE), 'w') as f:
+        json.dump(header, f, default=_encode_fraction)
+
+
+def load_stand(stand_class, path, input_hash=None):
+    """Returns a Stand Class loaded from the snapshot in the path directory. The precomputed aggregates are read from the header and
+       the tree and log columns are memory-mapped, the stand's plots are only rebuilt from the columns when they are first needed.
+
+       If input_hash is given and it does not match the snapshot's input hash, the snapshot is stale and a SnapshotError is raised"""
+    header = load_header(path)
+    if input_hash is not None and header['input_hash'] != input_hash:
+        raise SnapshotError(path, 'Snapshot is stale, the input hash does not match the input hash of the snapshot')
+
+    stand = stand_class(header['name'], header['plot_factor'], header['acres'], header['inventory_date'])
+    for attr in AGGREGATE_ATTRS:
+        setattr(stand, attr, header['aggregates'][attr])
+    stand.aggregate.__dict__.update(header['stand_aggregate'])
+    stand.input_hash = header['input_hash']
+    if header.get('height_model'):
+        stand.height_model = HeightModel.from_dict(header['height_model'])
+    stand._columns = {'trees': _load_columns(path, 'trees', TREE_COLUMNS, header['tree_count']),
+                      'logs': _load_columns(path, 'logs', LOG_COLUMNS, header['log_count'])}
+    stand._plots = None
+    stand._logs_gross = False
+    return stand
+
+
+def load_header(path):
+    """Returns the JSON header of the snapshot in the path directory, raises a SnapshotError if the snapshot is missing or
+       was created by a different snapshot format or treetopper version"""
+    header_file = join(path, HEADER_FILE)
+    if not isfile(header_file):
+        raise SnapshotError(path, f'Could not find snapshot header ({HEADER_FILE}) within directory')
+    with open(header_file, 'r') as f:
+        header = json.load(f, object_hook=_decode_fraction)
+
+    if header['format_version'] != SNAPSHOT_FORMAT_VERSION:
+        raise SnapshotError(path, f'Snapshot format version {header["format_version"]} is not supported, '
+                                  f'current format version is {SNAPSHOT_FORMAT_VERSION}')
+    if header['treetopper_version'] != TREETOPPER_VERSION:
+        raise SnapshotError(path, f'Snapshot was created with treetopper {header["treetopper_version"]}, '
+                                  f'current version is {TREETOPPER_VERSION}')
+    return header
+
+
+def _encode_fraction(val):
+    """Returns the StandAggregate's Fraction totals as {FRACTION_KEY: 'numerator/denominator'} for the JSON header, used internally"""
+    if isinstance(val, Fraction):
+        return {FRACTION_KEY: str(val)}
+    raise TypeError(f'Object of type {type(val).__name__} is not JSON serializable')
+
+
+def _decode_fraction(obj):
+    """Returns the Fraction of an encoded Fraction of the JSON header, other objects are returned as they are, used internally"""
+    if len(obj) == 1 and FRACTION_KEY in obj:
+        return Fraction(obj[FRACTION_KEY])
+    return obj
+
+
+def _load_columns(path, table, table_columns, length):
+    """Returns the memory-mapped columns of the table (trees or logs), used internally"""
+    columns = {}
+    for col, _ in table_columns:
+        if length:
+            columns[col] = np.load(join(path, f'{table}.{col}.npy'), mmap_mode='r')
+        else:
+            columns[col] = np.load(join(path, f'{table}.{col}.npy'))
+    return columns
@@ -1,5 +1,48 @@
+from copy import copy
 from datetime import date, datetime
+from hashlib import sha256
+from os import replace
 from os.path import join, expanduser
+from posixpath import (
+    basename,
+    dirname,
+    normpath
+)
+from zipfile import ZipFile
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.dimensions import (
+    ColumnDimension,
+    SheetFormatProperties
+)
+from openpyxl.worksheet.page import (
+    PageMargins,
+    PrintOptions,
+    PrintPageSetup
+)
+from openpyxl.worksheet.properties import WorksheetProperties
+from openpyxl.worksheet.views import SheetViewList
+from openpyxl.xml.constants import (
+    ARC_ROOT_RELS,
+    PKG_REL_NS,
+    REL_NS,
+    SHEET_MAIN_NS
+)
+from openpyxl.xml.functions import (
+    fromstring,
+    iterparse
+)
+
+
+# WORKSHEET SETTINGS COPIED BY copy_excel_sheet_settings, XML TAG: [WORKSHEET ATTRIBUTE, CLASS]
+EXCEL_SHEET_SETTINGS = {
+    'sheetPr': ['sheet_properties', WorksheetProperties],
+    'sheetViews': ['views', SheetViewList],
+    'sheetFormatPr': ['sheet_format', SheetFormatProperties],
+    'printOptions': ['print_options', PrintOptions],
+    'pageMargins': ['page_margins', PageMargins],
+    'pageSetup': ['page_setup', PrintPageSetup]
+}
 
 
 def get_desktop_path():
@@ -19,6 +62,14 @@ def format_comma(val: float):
         return ''.join(show)
 
 
+def mean_of_total(total, count: int):
+    """Returns the mean of values from their total and count, the same as statistics.mean of the values: an int if the values are
+       ints and their mean is a whole number, otherwise a float"""
+    if isinstance(total, int) and total % count == 0:
+        return total // count
+    return total / count
+
+
 def format_pct(val: float):
     if val <= 1:
         return f'{round(val * 100, 1)} %'
@@ -51,6 +102,107 @@ def get_filename_only(file_path):
             return ''.join(file_path[i+1:])
 
 
+def get_file_hash(file_path):
+    """Returns the sha256 hex digest of a file's contents, the file is read in chunks"""
+    file_hash = sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def get_input_hash(file_path, stand_name, cruise_type, plot_factor):
+    """Returns a hash of a cruise sheet's contents along with the stand name, cruise type and plot factor it is imported with"""
+    text = f'{get_file_hash(file_path)}|{stand_name.upper()}|{cruise_type}|{float(plot_factor)}'
+    return sha256(text.encode()).hexdigest()
+
+
+def copy_excel_rows(read_ws, write_ws, file_path, skip_row=None):
+    """Streams the rows of a read-only worksheet of the workbook at file_path into a write-only worksheet keeping the cell
+       values and styles and the sheet settings (see copy_excel_sheet_settings), rows after the header row where
+       skip_row(row values) is True are left out"""
+    copy_excel_sheet_settings(file_path, read_ws.title, write_ws)
+    for i, row in enumerate(read_ws.iter_rows()):
+        values = [cell.value for cell in row]
+        if i > 0 and skip_row is not None and skip_row(values):
+            continue
+        write_ws.append([_copy_excel_cell(write_ws, cell) if getattr(cell, 'has_style', False) else cell.value
+                         for cell in row])
+
+
+def copy_excel_sheet_settings(file_path, sheet_name, write_ws):
+    """Copies the column widths, merged cells, views (including freeze panes), sheet properties, page setup and state of a
+       sheet of the workbook at file_path to a write-only worksheet, they must be copied before any rows are appended.
+       Read-only workbooks do not load these settings so they are read from the worksheet's xml within the xlsx file.
+       Row heights, column styles, conditional formatting and data validations are not copied"""
+    settings = {f'{{{SHEET_MAIN_NS}}}{tag}': setting for tag, setting in EXCEL_SHEET_SETTINGS.items()}
+    col_tag = f'{{{SHEET_MAIN_NS}}}col'
+    merge_tag = f'{{{SHEET_MAIN_NS}}}mergeCell'
+    row_tag = f'{{{SHEET_MAIN_NS}}}row'
+
+    with ZipFile(file_path) as archive:
+        sheet_path, sheet_state = _get_excel_sheet_part(archive, sheet_name)
+        with archive.open(sheet_path) as source:
+            for _, element in iterparse(source):
+                if element.tag in settings:
+                    attribute, cls = settings[element.tag]
+                    setattr(write_ws, attribute, cls.from_tree(element))
+                elif element.tag == col_tag:
+                    dims = {key: val for key, val in element.attrib.items() if key != 'style'}
+                    column = get_column_letter(int(dims['min']))
+                    write_ws.column_dimensions[column] = ColumnDimension(write_ws, index=column, **dims)
+                elif element.tag == merge_tag:
+                    write_ws.merged_cells.add(element.get('ref'))
+                elif element.tag != row_tag:
+                    continue
+                element.clear()
+    if sheet_state:
+        write_ws.sheet_state = sheet_state
+
+
+def _get_excel_sheet_part(archive, sheet_name):
+    """Returns the path of a sheet's xml within an xlsx archive and the sheet's state (None if visible), the workbook and
+       the sheet are found through the package's relationships, used internally"""
+    workbook_path = list(_get_excel_rels(archive, ARC_ROOT_RELS, '', 'officeDocument').values())[0]
+    sheet_paths = _get_excel_rels(archive, f'{dirname(workbook_path)}/_rels/{basename(workbook_path)}.rels',
+                                  dirname(workbook_path), 'worksheet')
+    for sheet in fromstring(archive.read(workbook_path)).iter(f'{{{SHEET_MAIN_NS}}}sheet'):
+        if sheet.get('name') == sheet_name:
+            return sheet_paths[sheet.get(f'{{{REL_NS}}}id')], sheet.get('state')
+    raise KeyError(f'Worksheet {sheet_name} does not exist')
+
+
+def _get_excel_rels(archive, rels_path, part_dir, rel_type):
+    """Returns a dict of the ids and paths of the relationships of a type within a .rels file of an xlsx archive, the paths
+       are resolved from the directory of the part the relationships belong to, used internally"""
+    paths = {}
+    for rel in fromstring(archive.read(rels_path)).iter(f'{{{PKG_REL_NS}}}Relationship'):
+        if rel.get('Type').endswith(f'/{rel_type}'):
+            target = rel.get('Target')
+            paths[rel.get('Id')] = target[1:] if target.startswith('/') else normpath(f'{part_dir}/{target}').lstrip('/')
+    return paths
+
+
+def _copy_excel_cell(write_ws, cell):
+    """Returns a write-only cell with the value and styles of a read-only cell, used internally"""
+    new = WriteOnlyCell(write_ws, cell.value)
+    new.font = copy(cell.font)
+    new.fill = copy(cell.fill)
+    new.border = copy(cell.border)
+    new.alignment = copy(cell.alignment)
+    new.protection = copy(cell.protection)
+    new.number_format = cell.number_format
+    return new
+
+
+def save_excel_stream(workbook, file_path):
+    """Saves a write-only workbook next to the file path and then replaces the file with it, so the existing file can be
+       streamed from while the workbook is written"""
+    temp_path = file_path + '.tmp'
+    workbook.save(temp_path)
+    replace(temp_path, file_path)
+
+
 def reorder_dict(unordered):
     reorder = {}
     unordered_list = list(unordered)
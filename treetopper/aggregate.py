@@ -0,0 +1,258 @@
+from fractions import Fraction
+from treetopper._constants import (
+    math,
+    LOG_LENGTHS
+)
+from treetopper._utils import mean_of_total
+
+
+# THE RUNNING TOTALS ARE FRACTIONS, EVERY FLOAT IS EXACTLY A FRACTION SO THE TOTALS ARE SUMMED WITHOUT ANY ROUNDING. FLOAT (OR
+# math.fsum) TOTALS WOULD DRIFT AS PLOTS ARE REMOVED AND DEPEND ON THE ORDER OF MERGING, WITH FRACTIONS ADDING, REMOVING AND MERGING
+# PLOTS IN ANY ORDER GIVES THE SAME TOTALS, AND THE MEANS AND VARIANCES ARE THE SAME AS statistics.mean AND statistics.variance
+# (WHICH ALSO SUM WITH FRACTIONS)
+
+
+class StandAggregate(object):
+    """The StandAggregate Class holds the running totals that the Stand Class calculations and statistics are made from. It can be built
+       from any set of plots (Plot Classes) and two aggregates can be combined with the merge method, the order of merging does not
+       matter, so a very large stand can be split into batches of plots that are aggregated in separate processes and then reduced.
+
+       The finalize method returns the same species and species_stats dictionaries (and stand metrics) as the Stand Class, the logs
+       dictionary holds the per acre means (the Stand Class adds the per plot 'gross' lists from its plots).
+
+       For each species and metric the aggregate holds the count, sum and sum of squares of the plots that the species is found on.
+       Plots without the species count as zeros, they are folded in when the aggregate is finalized, this way adding or removing
+       a plot only updates the species and logs found on that plot. The sums are exact, so the means and statistics are the same
+       as statistics.mean and statistics.variance of the per plot values, no matter the order the plots were added, removed or merged.
+
+       A StandAggregate of a batch of plots could look like:
+       ::
+            from functools import reduce
+            from treetopper.aggregate import StandAggregate
+
+            # Within each worker process
+            batch_aggregate = StandAggregate(batch_of_plots)
+
+            # Reducing the batch aggregates
+            stand_aggregate = reduce(StandAggregate.merge, batch_aggregates)
+            stand_data = stand_aggregate.finalize()
+            stand_data['species_stats']['DF']['bf_ac']['stderr']"""
+
+    def __init__(self, plots: list = None):
+        self.plot_count = 0
+        self.metrics = ['tpa', 'ba_ac', 'rd_ac', 'bf_ac', 'cf_ac']
+
+        # {species: {metric: [count, sum, sum of squares]}}
+        self.species_moments = {}
+
+        # {species: {'count': int, 'height': sum, 'hdr': sum, 'float_heights': int}}, the totals_all entry sums the plot
+        # averages, float_heights counts the heights that are not ints (the average height is an int, as with statistics.mean, without them)
+        self.species_trees = {}
+
+        # {species: {grade: {length range: {sub: [plot count, sum]}}}}
+        self.log_sums = {}
+        self.log_plots = {}
+
+        if plots:
+            for plot in plots:
+                self.add_plot(plot)
+
+    def __getitem__(self, attribute: str):
+        return self.__dict__[attribute]
+
+    def add_plot(self, plot):
+        """Adds the plot's data to the running totals"""
+        self._update(plot, 1)
+
+    def remove_plot(self, plot):
+        """Subtracts the plot's data from the running totals, the plot needs to have been added to the aggregate"""
+        self._update(plot, -1)
+
+    def merge(self, other):
+        """Returns a new StandAggregate that combines this aggregate and the other aggregate"""
+        merged = StandAggregate()
+        merged.plot_count = self.plot_count + other.plot_count
+
+        for agg in [self, other]:
+            for species in agg.species_moments:
+                if species not in merged.species_moments:
+                    merged.species_moments[species] = {met: [0, 0, 0] for met in self.metrics}
+                    merged.species_trees[species] = self._format_trees_dict()
+                for met in self.metrics:
+                    for i, val in enumerate(agg.species_moments[species][met]):
+                        merged.species_moments[species][met][i] += val
+                for key in merged.species_trees[species]:
+                    merged.species_trees[species][key] += agg.species_trees[species][key]
+
+            for species in agg.log_sums:
+                if species not in merged.log_sums:
+                    merged.log_sums[species] = {}
+                    merged.log_plots[species] = 0
+                merged.log_plots[species] += agg.log_plots[species]
+                for grade in agg.log_sums[species]:
+                    if grade not in merged.log_sums[species]:
+                        merged.log_sums[species][grade] = self._format_logs_grade_dict()
+                    for rng in agg.log_sums[species][grade]:
+                        for sub in agg.log_sums[species][grade][rng]:
+                            cell = merged.log_sums[species][grade][rng][sub]
+                            cell[0] += agg.log_sums[species][grade][rng][sub][0]
+                            cell[1] += agg.log_sums[species][grade][rng][sub][1]
+        return merged
+
+    def finalize(self, species_order: list = None, log_order: list = None):
+        """Returns a dictionary of the stand calculations and statistics from the running totals, with the keys
+           plot_count, species, species_stats, logs, the stand metrics (tpa, ba_ac, qmd, rd_ac, bf_ac, cf_ac, vbar),
+           and the stand metric stats (tpa_stats, ba_ac_stats, rd_ac_stats, bf_ac_stats, cf_ac_stats).
+
+           species_order and log_order are the orders of the species keys of the species and logs dictionaries (the Stand Class
+           passes the order the species are first found within its plots), by default totals_all is first and the other species
+           are in the order they were first added to the aggregate"""
+        n = self.plot_count
+        final = {'plot_count': n, 'species': {}, 'species_stats': {}, 'logs': {}}
+        if n == 0:
+            for met in self.metrics + ['qmd', 'vbar']:
+                final[met] = 0
+            for met in self.metrics:
+                final[f'{met}_stats'] = {}
+            return final
+
+        # totals_all is kept as the first species, the stand summaries move it to the end of the tables
+        species_order = self._get_order(self.species_moments, species_order)
+        for species in species_order:
+            final['species'][species] = {}
+            final['species_stats'][species] = {}
+            for met in self.metrics:
+                stats = self._get_stats(*self.species_moments[species][met], n)
+                final['species'][species][met] = stats['mean']
+                final['species_stats'][species][met] = stats
+            spp = final['species'][species]
+            spp['qmd'] = math.sqrt((spp['ba_ac'] / spp['tpa']) / 0.005454)
+            spp['vbar'] = spp['bf_ac'] / spp['ba_ac']
+            trees = self.species_trees[species]
+            if trees['float_heights'] == 0:
+                spp['avg_hgt'] = mean_of_total(int(trees['height']), trees['count'])
+            else:
+                spp['avg_hgt'] = float(trees['height'] / trees['count'])
+            spp['hdr'] = float(trees['hdr'] / trees['count'])
+
+        for met in self.metrics:
+            final[met] = final['species']['totals_all'][met]
+            final[f'{met}_stats'] = final['species_stats']['totals_all'][met]
+        final['qmd'] = final['species']['totals_all']['qmd']
+        final['vbar'] = final['species']['totals_all']['vbar']
+
+        log_order = self._get_order(self.log_sums, log_order)
+        for species in log_order:
+            final['logs'][species] = {}
+            for grade in self.log_sums[species]:
+                final['logs'][species][grade] = {}
+                for rng in self.log_sums[species][grade]:
+                    final['logs'][species][grade][rng] = {}
+                    for sub in self.log_sums[species][grade][rng]:
+                        final['logs'][species][grade][rng][sub] = {'mean': float(self.log_sums[species][grade][rng][sub][1] / n)}
+        return final
+
+    def _update(self, plot, sign):
+        """Adds (sign=1) or subtracts (sign=-1) the plot's data to or from the running totals, used internally"""
+        self.plot_count += sign
+
+        for species in plot.species:
+            if species not in self.species_moments:
+                self.species_moments[species] = {met: [0, 0, 0] for met in self.metrics}
+                self.species_trees[species] = self._format_trees_dict()
+            for met in self.metrics:
+                moments = self.species_moments[species][met]
+                val = Fraction(plot.species[species][met])
+                moments[0] += sign
+                moments[1] += sign * val
+                moments[2] += sign * val * val
+
+        # The stand's average height and hdr are the mean of the plot averages, the species' are the mean of the species' trees
+        if plot.trees:
+            self._update_trees(self.species_trees['totals_all'], plot.avg_hgt, plot.hdr, sign)
+        for tree in plot.trees:
+            self._update_trees(self.species_trees[tree.species], tree.height, tree.hdr, sign)
+
+        for species in plot.logs:
+            if species not in self.log_sums:
+                self.log_sums[species] = {}
+                self.log_plots[species] = 0
+            self.log_plots[species] += sign
+            for grade in plot.logs[species]:
+                if grade not in self.log_sums[species]:
+                    self.log_sums[species][grade] = self._format_logs_grade_dict()
+                for rng in plot.logs[species][grade]:
+                    if rng != 'display':
+                        for sub in self.log_sums[species][grade][rng]:
+                            val = plot.logs[species][grade][rng][sub]
+                            if val:
+                                cell = self.log_sums[species][grade][rng][sub]
+                                cell[0] += sign
+                                cell[1] += sign * Fraction(val)
+
+        if self.plot_count == 0:
+            self.species_moments.clear()
+            self.species_trees.clear()
+            self.log_sums.clear()
+            self.log_plots.clear()
+        else:
+            for species in [spp for spp in self.species_trees if self.species_trees[spp]['count'] == 0]:
+                del self.species_moments[species]
+                del self.species_trees[species]
+            for species in [spp for spp in self.log_plots if self.log_plots[spp] == 0]:
+                del self.log_sums[species]
+                del self.log_plots[species]
+
+    @staticmethod
+    def _get_order(species_dict, order):
+        """Returns the species of the species_dict in the order of the order arg, or totals_all first and then the order of the
+           species_dict if order is None, used internally"""
+        if order is None:
+            return ['totals_all'] + [spp for spp in species_dict if spp != 'totals_all']
+        return [spp for spp in order if spp in species_dict]
+
+    def _update_trees(self, trees, height, hdr, sign):
+        """Adds (sign=1) or subtracts (sign=-1) a tree's (or a plot's average) height and hdr to or from the species' tree totals,
+           used internally"""
+        trees['count'] += sign
+        trees['height'] += sign * Fraction(height)
+        trees['hdr'] += sign * Fraction(hdr)
+        if not isinstance(height, int):
+            trees['float_heights'] += sign
+
+    @staticmethod
+    def _get_stats(count, total, squares, plot_count):
+        """Runs the statistical calculations on the exact sums of a stand metric, folding in the plots without the metric as zeros,
+           returns the stats sub dict, used internally"""
+        mean = float(total / plot_count)
+        if plot_count >= 2:
+            var = float(((plot_count * squares) - (total * total)) / (plot_count * (plot_count - 1)))
+            std = math.sqrt(var)
+            ste = std / math.sqrt(plot_count)
+            low_avg_high = [max(round(mean - ste, 1), 0), mean, mean + ste]
+            d = {'mean': mean,
+                 'variance': var,
+                 'stdev': std,
+                 'stderr': ste,
+                 'stderr_pct': (ste / mean) * 100,
+                 'low_avg_high': low_avg_high}
+        else:
+            d = {'mean': mean,
+                 'variance': 'Not enough data',
+                 'stdev': 'Not enough data',
+                 'stderr': 'Not enough data',
+                 'stderr_pct': 'Not enough data',
+                 'low_avg_high': 'Not enough data'}
+        return d
+
+    @staticmethod
+    def _format_trees_dict():
+        """Returns a sub-dictionary for a species key of the species_trees dictionary"""
+        return {'count': 0, 'height': 0, 'hdr': 0, 'float_heights': 0}
+
+    @staticmethod
+    def _format_logs_grade_dict():
+        """Returns a sub-dictionary for a grade key of the log_sums dictionary"""
+        master = {rng: {sub: [0, 0] for sub in ['lpa', 'bf_ac', 'cf_ac']} for rng in LOG_LENGTHS}
+        master['totals_by_grade'] = {sub: [0, 0] for sub in ['lpa', 'bf_ac', 'cf_ac']}
+        return master
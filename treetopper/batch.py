@@ -0,0 +1,281 @@
+import json
+import sys
+import time
+from os import (
+    fsync,
+    listdir,
+    makedirs,
+    remove
+)
+from os.path import (
+    abspath,
+    basename,
+    isdir,
+    isfile,
+    join
+)
+from glob import glob
+from hashlib import sha256
+from concurrent.futures import (
+    ProcessPoolExecutor,
+    as_completed
+)
+from treetopper.stand import Stand
+from treetopper.fvs import FVS
+from treetopper._constants import TREETOPPER_VERSION
+from treetopper._exceptions import BatchConfigError
+from treetopper._import_from_sheets import get_sheet_stands
+from treetopper._snapshot import HEADER_FILE
+from treetopper._utils import get_file_hash
+
+
+CHECKPOINT_FILE = 'checkpoint.jsonl'
+STANDS_DIR = 'stands'
+SNAPSHOT_DIR = 'snapshot'
+
+# OUTPUTS WRITTEN FOR EACH STAND UNLESS THE CONFIG SETS THEM
+DEFAULT_OUTPUTS = {'pdf': True, 'console': False, 'table_csv': True, 'table_excel': False, 'log_table': None}
+
+# FVS ARGUMENTS NEEDED FOR EACH STAND (SEE FVS.set_stand) WHEN THE CONFIG HAS AN fvs SECTION
+FVS_REQUIRED = ['variant', 'forest_code', 'region', 'stand_age', 'site_species', 'site_index']
+
+
+def load_config(config_file: str):
+    """Returns the batch config from a JSON file, raises a BatchConfigError if the config is not valid.
+
+       The config holds the defaults for every stand (cruise_type, plot_factor and the optional acres and inventory_date), a
+       stands section with the settings of individual stands (which override the defaults), the outputs written for each stand
+       and an optional fvs section for the FVS databases (the fvs arguments of a stand can be overridden within its settings):
+       ::
+            {
+                "cruise_type": "q",
+                "plot_factor": -20,
+                "stands": {"EX1": {"plot_factor": 40, "acres": 45.9, "inventory_date": "10/22/2019"},
+                           "OK2": {"cruise_type": "f", "fvs": {"stand_age": 45}}},
+                "outputs": {"pdf": true, "console": false, "table_csv": true, "table_excel": false, "log_table": "csv"},
+                "fvs": {"sqlite": "treetopper_fvs", "excel": null, "variant": "PN", "forest_code": 612, "region": 6,
+                        "stand_age": 60, "site_species": "DF", "site_index": 120}
+            }"""
+    try:
+        with open(config_file, 'r') as f:
+            config = json.load(f)
+    except (OSError, ValueError) as e:
+        raise BatchConfigError(config_file, [f'Could not read config ({e})'])
+
+    messages = []
+    if not isinstance(config, dict):
+        raise BatchConfigError(config_file, ['Config needs to be a JSON object'])
+    config.setdefault('stands', {})
+    config['stands'] = {name.upper(): settings for name, settings in config['stands'].items()}
+    config['outputs'] = {**DEFAULT_OUTPUTS, **config.get('outputs', {})}
+
+    for name, settings in [['Default', config]] + [[f'Stand {name}', settings] for name, settings in config['stands'].items()]:
+        cruise_type = settings.get('cruise_type')
+        if cruise_type is not None and cruise_type not in ['q', 'f']:
+            messages.append(f'{name} cruise_type ({cruise_type}) needs to be "q" or "f"')
+    if config['outputs']['log_table'] not in [None, 'csv', 'parquet']:
+        messages.append(f'outputs log_table ({config["outputs"]["log_table"]}) needs to be null, "csv" or "parquet"')
+
+    fvs_config = config.get('fvs')
+    if fvs_config:
+        if not fvs_config.get('sqlite') and not fvs_config.get('excel'):
+            messages.append('fvs needs a filename for "sqlite" and/or "excel"')
+        missing = [arg for arg in FVS_REQUIRED if arg not in fvs_config]
+        if missing:
+            messages.append(f'fvs is missing the arguments {missing}')
+    if messages:
+        raise BatchConfigError(config_file, messages)
+    return config
+
+
+def find_sheets(sheets: str):
+    """Returns the sorted CSV and Excel files within a directory, or matching a glob pattern"""
+    if isdir(sheets):
+        files = [join(sheets, file) for file in listdir(sheets)]
+    else:
+        files = glob(sheets)
+    return sorted(file for file in files if file.lower().endswith(('.csv', '.xlsx')) and not basename(file).startswith('~$'))
+
+
+def get_batch_jobs(files: list, config: dict):
+    """Returns a list of the batch's stand jobs, one per stand found within the files. Each job holds the stand's settings,
+       the files holding the stand and a key made from the settings, the files' contents and the treetopper version, so a
+       stand is only skipped on resume if nothing it was made from has changed"""
+    file_hashes = {file: get_file_hash(file) for file in files}
+    stand_files = {}
+    for file in files:
+        for name in get_sheet_stands(file):
+            stand_files.setdefault(name, []).append(file)
+
+    jobs = []
+    for name, stand_file_list in stand_files.items():
+        settings = config['stands'].get(name, {})
+        job = {'stand': name,
+               'files': [abspath(file) for file in stand_file_list],
+               'cruise_type': settings.get('cruise_type', config.get('cruise_type', 'q')),
+               'plot_factor': settings.get('plot_factor', config.get('plot_factor')),
+               'acres': settings.get('acres', config.get('acres')),
+               'inventory_date': settings.get('inventory_date', config.get('inventory_date')),
+               'outputs': config['outputs']}
+        key_text = json.dumps([job, [file_hashes[file] for file in stand_file_list], TREETOPPER_VERSION], sort_keys=True)
+        job['key'] = sha256(key_text.encode()).hexdigest()
+        jobs.append(job)
+    return jobs
+
+
+def run_stand(job: dict, output_dir: str):
+    """Imports the stand of a batch job from its files and writes its outputs and snapshot to [output_dir]/stands/[stand],
+       returns the job's checkpoint record. Errors are caught and recorded so one bad stand does not stop the batch"""
+    start = time.perf_counter()
+    record = {'stand': job['stand'], 'key': job['key'], 'status': 'done', 'error': None}
+    try:
+        if job['plot_factor'] is None:
+            raise ValueError(f'Stand {job["stand"]} does not have a plot_factor within the config')
+        stand_dir = join(output_dir, STANDS_DIR, job['stand'])
+        makedirs(stand_dir, exist_ok=True)
+
+        stand = Stand(job['stand'], job['plot_factor'], job['acres'], job['inventory_date'])
+        for file in job['files']:
+            if job['cruise_type'] == 'q':
+                stand.import_sheet_quick(file)
+            else:
+                stand.import_sheet_full(file)
+        _write_outputs(stand, job['outputs'], stand_dir)
+        stand.save(join(stand_dir, SNAPSHOT_DIR))
+    except Exception as e:
+        record['status'] = 'failed'
+        record['error'] = f'{type(e).__name__}: {str(e).strip()}'
+    record['seconds'] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def read_checkpoint(checkpoint_file: str):
+    """Returns the last checkpoint record of each stand within the checkpoint file, a partly written last line (from a crash)
+       is ignored"""
+    records = {}
+    if not isfile(checkpoint_file):
+        return records
+    with open(checkpoint_file, 'r') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            records[record['stand']] = record
+    return records
+
+
+def run_batch(sheets: str, config_file: str, output_dir: str = None, processes: int = None, resume: bool = True,
+              progress: bool = True):
+    """Runs a batch of stands from the cruise sheets within a directory (or matching a glob pattern) with the settings of the
+       JSON config file (see load_config). The stands are imported and their outputs are written in worker processes
+       (processes=0 runs them within this process), and the FVS databases are written once all of the stands are finished.
+
+       Each finished stand is recorded in [output_dir]/checkpoint.jsonl. If resume is True, the stands already done (with the
+       same settings and unchanged files) are skipped, so a batch that stopped part way through restarts where it stopped.
+       The FVS databases are written with sync, so only the stands that are new or have changed are rewritten.
+
+       Returns a dictionary of the stands that were done, failed or skipped"""
+    config = load_config(config_file)
+    output_dir = abspath(output_dir or config.get('output_dir') or 'treetopper_batch')
+    makedirs(output_dir, exist_ok=True)
+    checkpoint_file = join(output_dir, CHECKPOINT_FILE)
+    if not resume and isfile(checkpoint_file):
+        remove(checkpoint_file)
+
+    jobs = get_batch_jobs(find_sheets(sheets), config)
+    checkpoint = read_checkpoint(checkpoint_file)
+    summary = {'done': [], 'failed': [], 'skipped': []}
+    pending = []
+    for job in jobs:
+        record = checkpoint.get(job['stand'])
+        snapshot = join(output_dir, STANDS_DIR, job['stand'], SNAPSHOT_DIR, HEADER_FILE)
+        if record and record['status'] == 'done' and record['key'] == job['key'] and isfile(snapshot):
+            summary['skipped'].append(job['stand'])
+        else:
+            pending.append(job)
+
+    start = time.perf_counter()
+    with open(checkpoint_file, 'a') as checkpoint_out:
+        # A crash can leave the last record without its line ending
+        if checkpoint_out.tell() and not _ends_with_newline(checkpoint_file):
+            checkpoint_out.write('\n')
+        for i, record in enumerate(_run_jobs(pending, output_dir, processes)):
+            checkpoint_out.write(json.dumps(record) + '\n')
+            checkpoint_out.flush()
+            fsync(checkpoint_out.fileno())
+            summary[record['status']].append(record['stand'])
+            if progress:
+                _print_progress(i + 1, len(pending), record, start)
+
+    if config.get('fvs'):
+        done = [job for job in jobs if job['stand'] in summary['done'] or job['stand'] in summary['skipped']]
+        _write_fvs(done, config, output_dir)
+    if progress:
+        print(f'treetopper batch: {len(summary["done"])} done, {len(summary["failed"])} failed, '
+              f'{len(summary["skipped"])} skipped (already done) -> {output_dir}', file=sys.stderr)
+    return summary
+
+
+def _run_jobs(jobs: list, output_dir: str, processes: int):
+    """Yields the checkpoint records of the jobs as they finish, used internally"""
+    if processes == 0:
+        for job in jobs:
+            yield run_stand(job, output_dir)
+        return
+    with ProcessPoolExecutor(processes) as pool:
+        futures = [pool.submit(run_stand, job, output_dir) for job in jobs]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def _write_outputs(stand, outputs: dict, stand_dir: str):
+    """Writes the stand's reports and tables to its directory, existing files are replaced, used internally"""
+    name = stand.name
+    if outputs['pdf']:
+        stand.pdf_report(f'{name}_report.pdf', stand_dir)
+    if outputs['console']:
+        with open(join(stand_dir, f'{name}_report.txt'), 'w') as f:
+            f.write(stand.get_console_report_text())
+    # The table exports append to existing files, a stand that is run again starts from new files
+    for output, ext, export in [['table_csv', '.csv', stand.table_to_csv], ['table_excel', '.xlsx', stand.table_to_excel]]:
+        if outputs[output]:
+            file = join(stand_dir, f'{name}_table{ext}')
+            if isfile(file):
+                remove(file)
+            export(file)
+    if outputs['log_table'] == 'csv':
+        stand.log_table_to_csv(f'{name}_logs.csv', stand_dir)
+    elif outputs['log_table'] == 'parquet':
+        stand.log_table_to_parquet(f'{name}_logs.parquet', stand_dir)
+
+
+def _write_fvs(jobs: list, config: dict, output_dir: str):
+    """Writes the finished stands (loaded from their snapshots) to the FVS databases of the config with sync, used internally"""
+    fvs_config = config['fvs']
+    fvs = FVS()
+    for job in jobs:
+        stand = Stand.load(join(output_dir, STANDS_DIR, job['stand'], SNAPSHOT_DIR))
+        args = {**fvs_config, **config['stands'].get(job['stand'], {}).get('fvs', {})}
+        kwargs = {key: val for key, val in args.items() if key not in FVS_REQUIRED + ['sqlite', 'excel']}
+        fvs.add_stand(stand, *[args[arg] for arg in FVS_REQUIRED], **kwargs)
+    if fvs_config.get('sqlite'):
+        fvs.sqlite_db(fvs_config['sqlite'], output_dir, sync=True)
+    if fvs_config.get('excel'):
+        fvs.excel_db(fvs_config['excel'], output_dir, sync=True)
+
+
+def _ends_with_newline(file: str):
+    """Returns True if the last byte of the file is a newline, used internally"""
+    with open(file, 'rb') as f:
+        f.seek(-1, 2)
+        return f.read(1) == b'\n'
+
+
+def _print_progress(count: int, total: int, record: dict, start: float):
+    """Prints the batch's progress and estimated time remaining to stderr, used internally"""
+    elapsed = time.perf_counter() - start
+    remaining = int((elapsed / count) * (total - count))
+    eta = f'{remaining // 3600:02d}:{(remaining % 3600) // 60:02d}:{remaining % 60:02d}'
+    status = record['status'] if record['status'] == 'done' else f'FAILED {" ".join(record["error"].split())}'
+    print(f'[{count}/{total}] {record["stand"]} {status} ({record["seconds"]}s) -- ETA {eta}', file=sys.stderr)
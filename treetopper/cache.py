@@ -0,0 +1,199 @@
+from os import (
+    environ,
+    listdir,
+    makedirs,
+    remove,
+    replace,
+    utime,
+    getpid
+)
+from os.path import (
+    expanduser,
+    getmtime,
+    getsize,
+    isdir,
+    join
+)
+from hashlib import sha256
+from shutil import rmtree
+from string import hexdigits
+from weakref import WeakSet
+import numpy as np
+from treetopper._constants import TREETOPPER_VERSION
+from treetopper._exceptions import SnapshotError
+from treetopper._phases import phase
+from treetopper._snapshot import (
+    HEADER_FILE,
+    save_stand,
+    load_stand
+)
+from treetopper._utils import get_input_hash
+
+
+# DEFAULT CACHE DIRECTORY AND MAX SIZE (BYTES), BOTH CAN BE SET WITH THESE ENVIRONMENT VARIABLES
+CACHE_DIR_ENV = 'TREETOPPER_CACHE_DIR'
+CACHE_MAX_SIZE_ENV = 'TREETOPPER_CACHE_MAX_SIZE'
+DEFAULT_CACHE_DIR = join(expanduser('~'), '.treetopper_cache')
+DEFAULT_CACHE_MAX_SIZE = 1 << 30
+
+
+class ImportCache(object):
+    """The ImportCache Class is an on-disk cache of imported stands, so importing an unchanged cruise sheet again loads the stand
+       instead of parsing, checking and cruising the sheet. Each stand is kept as a binary snapshot (see Stand.save) within
+       the cache directory, keyed by the hash of the sheet's contents, the stand name, the cruise type, the plot factor and
+       the treetopper version.
+
+       When the cache grows past max_size (bytes) the least recently used stands are removed. The directory and max size
+       default to the TREETOPPER_CACHE_DIR and TREETOPPER_CACHE_MAX_SIZE environment variables, or ~/.treetopper_cache and 1 GB.
+
+       The hits, misses and evictions of the ImportCache are counted, using the cache could look like:
+       ::
+            from treetopper import Stand, ImportCache
+
+            cache = ImportCache('cruise_cache', max_size=500 * 1024 ** 2)
+            stand = Stand('EX1', -20)
+            stand.import_sheet_quick('example_quick_cruise_sheet.xlsx', cache=cache)
+            print(cache.hits, cache.misses, cache.evictions)"""
+
+    def __init__(self, directory: str = None, max_size: int = None):
+        self.directory = directory or environ.get(CACHE_DIR_ENV) or DEFAULT_CACHE_DIR
+        if max_size is None:
+            max_size = int(environ.get(CACHE_MAX_SIZE_ENV, DEFAULT_CACHE_MAX_SIZE))
+        self.max_size = max_size
+        makedirs(self.directory, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # The stands loaded from each key, their columns are memory-mapped from the key's directory
+        self._mapped = {}
+
+    def __getitem__(self, attribute: str):
+        return self.__dict__[attribute]
+
+    @property
+    def stats(self):
+        """A dictionary of the hits, misses and evictions of the cache and the count and total size (bytes) of its stands"""
+        entries = self._get_entries()
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(entries),
+                'size': sum(size for _, _, size in entries)}
+
+    def import_sheet(self, stand, file_path: str, cruise_type: str, stream: bool = False, sorted_by_plot: bool = False):
+        """Imports the cruise sheet into the stand, from the cache if the sheet has been imported before with the same stand name,
+           cruise type and plot factor, otherwise the sheet is imported and the stand is added to the cache. Only stands without
+           plots or a height_model are cached, otherwise the sheet is imported as usual"""
+        if stand.plot_count or stand.height_model is not None:
+            stand._import_sheet(file_path, cruise_type, stream, sorted_by_plot)
+            return
+
+        with phase('cache'):
+            input_hash = get_input_hash(file_path, stand.name, cruise_type, stand.plot_factor)
+            key = self.get_key(input_hash)
+            path = join(self.directory, key)
+
+            try:
+                cached = load_stand(type(stand), path, input_hash)
+            except SnapshotError:
+                cached = None
+
+        if cached is not None:
+            self.hits += 1
+            # The stand keeps its own acres and inventory date, they are not part of the cache key
+            for attr, val in vars(cached).items():
+                if attr not in ['name', 'plot_factor', 'acres', 'inv_date']:
+                    setattr(stand, attr, val)
+            utime(join(path, HEADER_FILE))
+            self._mapped.setdefault(key, WeakSet()).add(stand)
+        else:
+            self.misses += 1
+            stand._import_sheet(file_path, cruise_type, stream, sorted_by_plot)
+            with phase('cache'):
+                self._save(stand, path)
+                self._evict(keep=key)
+
+    def clear(self):
+        """Removes all of the stands from the cache"""
+        for key, _, _ in self._get_entries(complete_only=False):
+            self._remove(key)
+
+    @staticmethod
+    def get_key(input_hash: str):
+        """Returns the cache key of a stand from its input hash, the key changes with the treetopper version"""
+        return sha256(f'{input_hash}|{TREETOPPER_VERSION}'.encode()).hexdigest()
+
+    def _save(self, stand, path: str):
+        """Saves the stand's snapshot to a temporary directory within the cache and then moves it to the stand's key, so an
+           interrupted save is never loaded, used internally"""
+        temp_path = f'{path}.{getpid()}.tmp'
+        rmtree(temp_path, ignore_errors=True)
+        save_stand(stand, temp_path)
+        rmtree(path, ignore_errors=True)
+        try:
+            replace(temp_path, path)
+        except OSError:
+            # Another process saved the same stand first
+            rmtree(temp_path, ignore_errors=True)
+
+    def _evict(self, keep: str = None):
+        """Removes the least recently used stands until the cache is within max_size, the keep key is not removed, used internally"""
+        entries = self._get_entries()
+        total = sum(size for _, _, size in entries)
+        for key, _, size in sorted(entries, key=lambda x: x[1]):
+            if total <= self.max_size:
+                break
+            if key == keep:
+                continue
+            self._remove(key)
+            total -= size
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        """Removes a stand from the cache. The stands loaded from it are first given in-memory copies of their memory-mapped
+           columns, as files that are memory-mapped can not be removed on Windows. The header is removed before the rest of the
+           directory, so if any files are still in use (such as by another process) the stand is no longer loaded and its
+           directory is removed by a later scan of the cache (see self._get_entries), used internally"""
+        for stand in self._mapped.pop(key, []):
+            if stand._columns is not None:
+                stand._columns = {table: {col: np.array(vals) for col, vals in columns.items()}
+                                  for table, columns in stand._columns.items()}
+        path = join(self.directory, key)
+        try:
+            remove(join(path, HEADER_FILE))
+        except OSError:
+            pass
+        rmtree(path, ignore_errors=True)
+
+    def _get_entries(self, complete_only: bool = True):
+        """Returns a list of [key, last used time, size] of the stands within the cache directory. If complete_only is True,
+           directories without a header are left out, and those of a key (the leftovers of a removal that could not finish)
+           are removed, used internally"""
+        entries = []
+        for key in listdir(self.directory):
+            path = join(self.directory, key)
+            if not isdir(path):
+                continue
+            try:
+                used = getmtime(join(path, HEADER_FILE))
+            except OSError:
+                if complete_only:
+                    if self._is_key(key):
+                        rmtree(path, ignore_errors=True)
+                    continue
+                used = 0
+            size = 0
+            for file in listdir(path):
+                try:
+                    size += getsize(join(path, file))
+                except OSError:
+                    pass
+            entries.append([key, used, size])
+        return entries
+
+    @staticmethod
+    def _is_key(name: str):
+        """Returns True if the name of a directory within the cache is a cache key, rather than a snapshot that is still
+           being saved, used internally"""
+        return len(name) == 64 and all(char in hexdigits for char in name)
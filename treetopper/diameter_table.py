@@ -0,0 +1,103 @@
+import numpy as np
+from treetopper._columns import get_stand_columns
+from treetopper._constants import ALL_SPECIES_NAMES
+from treetopper._utils import (
+    format_comma,
+    mean_of_total
+)
+
+
+class DiameterTable(object):
+    """The DiameterTable Class is the stand and stock table of a stand, the stand's trees are grouped by species and whole-number
+       diameter (the floor of the DBH) and the per acre metrics of each species and diameter (a cell) are summed.
+
+       The table is built with one vectorized group-by over the stand's tree-level columns, the cells are held as numpy arrays
+       in the same order: species (in the order they were first found in the stand) and then diameter from smallest to largest.
+
+       For each cell the table holds tpa, ba_ac, rd_ac, bf_ac and cf_ac per acre, the count of cruised trees and the sums of
+       the cruised trees' heights and hdrs, so average heights and hdrs can be calculated from any set of cells.
+
+       The Stand Class caches its DiameterTable as stand.diameter_table until the stand's plots change and the Thinning Classes
+       start from it, the table could be used like:
+       ::
+            table = stand.diameter_table
+            for i in table.get_species_cells('DF'):
+                print(table.dbh[i], table.tpa[i], table.bf_ac[i])"""
+
+    def __init__(self, stand):
+        self.plot_count = stand.plot_count
+        self.metrics = ['tpa', 'ba_ac', 'rd_ac', 'bf_ac', 'cf_ac']
+
+        trees = get_stand_columns(stand, ['trees'])['trees']
+        # Same as int(tree.dbh), diameters are truncated to whole numbers
+        tree_dbh = trees['dbh'].astype(np.int64)
+
+        if len(tree_dbh) == 0:
+            self.species_list = []
+            self.species = np.array([], dtype='U2')
+            self.dbh = np.array([], dtype=np.int64)
+            for key in self.metrics + ['height', 'hdr']:
+                setattr(self, key, np.array([], dtype=float))
+            self.trees = np.array([], dtype=np.int64)
+            self.summary_table = {}
+            return
+
+        species, first_idx, tree_spp = np.unique(trees['species'], return_index=True, return_inverse=True)
+        order = np.argsort(first_idx)
+        species_rank = np.empty_like(order)
+        species_rank[order] = np.arange(len(order))
+
+        width = int(tree_dbh.max()) + 1
+        keys, tree_cell = np.unique(species_rank[tree_spp] * width + tree_dbh, return_inverse=True)
+        cell_count = len(keys)
+
+        self.species_list = species[order].tolist()
+        self.species = species[order][keys // width]
+        self.dbh = keys % width
+
+        for key in self.metrics:
+            setattr(self, key, np.bincount(tree_cell, weights=trees[key], minlength=cell_count) / self.plot_count)
+        self.trees = np.bincount(tree_cell, minlength=cell_count)
+        # The heights are whole numbers (the Timber Classes truncate them), their sums are kept as ints
+        self.height = np.rint(np.bincount(tree_cell, weights=trees['height'], minlength=cell_count)).astype(np.int64)
+        self.hdr = np.bincount(tree_cell, weights=trees['hdr'], minlength=cell_count)
+
+        self.summary_table = self._update_summary_table()
+
+    def __getitem__(self, attribute: str):
+        return self.__dict__[attribute]
+
+    def get_species_cells(self, species: str):
+        """Returns an array of the cell indexes of the species, ordered from the smallest diameter to the largest"""
+        return np.flatnonzero(self.species == species)
+
+    def _update_summary_table(self):
+        """Returns the stand and stock table dict, data-tables are broken down by species with the totals of all species
+        last, used internally. Example: self.summary_table['DOUGLAS-FIR'] --> data table"""
+        tables = {}
+        for spp in self.species_list:
+            cells = self.get_species_cells(spp)
+            tables[ALL_SPECIES_NAMES[spp]] = self._get_table(self.dbh[cells], {key: self[key][cells] for key in self.metrics},
+                                                              self.trees[cells], self.height[cells], self.hdr[cells])
+
+        # All species are combined by diameter for the totals table
+        dbh, cell_dbh = np.unique(self.dbh, return_inverse=True)
+        totals = {key: np.bincount(cell_dbh, weights=self[key]) for key in self.metrics}
+        tables['TOTALS'] = self._get_table(dbh, totals, np.bincount(cell_dbh, weights=self.trees).astype(np.int64),
+                                           np.rint(np.bincount(cell_dbh, weights=self.height)).astype(np.int64),
+                                           np.bincount(cell_dbh, weights=self.hdr))
+        return tables
+
+    def _get_table(self, dbh, values, trees, height, hdr):
+        """Returns a data-table of the diameter rows and a totals row from the arrays of one species' cells, the arrays are
+           converted to Python numbers so the values are formatted the same as the other reports, used internally"""
+        table = [['DBH', 'TPA', 'BASAL AREA', 'RD', 'BOARD FEET', 'CUBIC FEET', 'TREES', 'AVG HEIGHT', 'HDR']]
+        columns = {key: values[key].tolist() for key in self.metrics}
+        dbh, trees, height, hdr = dbh.tolist(), trees.tolist(), height.tolist(), hdr.tolist()
+        for i in range(len(dbh)):
+            table.append([str(dbh[i])] + [format_comma(columns[key][i]) for key in self.metrics] +
+                         [str(trees[i]), format_comma(mean_of_total(height[i], trees[i])), format_comma(hdr[i] / trees[i])])
+        count = sum(trees)
+        table.append(['TOTALS'] + [format_comma(float(values[key].sum())) for key in self.metrics] +
+                     [str(count), format_comma(mean_of_total(sum(height), count)), format_comma(sum(hdr) / count)])
+        return table
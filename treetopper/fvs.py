@@ -3,9 +3,14 @@ from os.path import (
     isfile,
     join
 )
-from copy import deepcopy
+from hashlib import sha256
+from itertools import (
+    chain,
+    islice
+)
 from datetime import date
 from openpyxl import load_workbook, Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Alignment
 from win32com.client import Dispatch
 import pythoncom
@@ -18,10 +23,26 @@ from treetopper._constants import (
     SQL_GROUPS_COLS,
     SQL_STAND_COLS,
     SQL_TREE_COLS,
+    SQL_INDEXES,
+    DIGEST_COLS,
     SQL_DEFAULTS,
     EXCEL_DEFAULTS
 )
-from treetopper._utils import extension_check
+from treetopper._utils import (
+    extension_check,
+    copy_excel_rows,
+    save_excel_stream
+)
+
+
+# THE FVS_TreeInit COLUMNS FILLED FROM THE STAND, IN THE ORDER OF THE TREE ROW TUPLES
+TREE_FVS_COLS = ['Stand_ID', 'StandPlot_ID', 'Plot_ID', 'Tree_ID', 'Tree_Count', 'History', 'Species', 'DBH', 'Ht']
+
+# NUMBER OF TREE ROWS SENT TO THE DATABASE AT A TIME
+INSERT_CHUNK_SIZE = 1000
+
+# A PLAIN SQLITE LOAD DROPS AND REBUILDS THE INDEXES IF IT HAS MORE TREE ROWS THAN THIS SHARE OF THE ROWS ALREADY IN FVS_TreeInit
+INDEX_REBUILD_SHARE = 0.5
 
 
 class FVS(object):
@@ -50,13 +71,29 @@ class FVS(object):
        for example fvs.set_stand(... fvs.stand_args[4]=22)
 
        After setting the stand in the FVS class, you can then create or append your databases by calling the database-specific methods
-       listed above"""
+       listed above.
+
+       To export several stands into one database, add each stand with the fvs.add_stand method (it takes the same arguments as
+       fvs.set_stand), the database methods will then write all of the added stands at once. The SQLite database is written in a
+       single connection and transaction with WAL journaling, and the Stand_ID indexes that FVS uses to look up each stand are
+       built after the rows are loaded.
+
+       If sync is True for the SQLite or Excel database methods, the stands already in the database are updated rather than
+       appended again. The exported rows of each stand are hashed and compared with the digests stored in the database's
+       treetopper_Digests table, only the stands that are new or have changed are deleted and re-inserted (all in one transaction
+       for SQLite), the Stand_IDs that were written are kept in fvs.synced_stands. Writing a stand to a synced database without
+       sync appends its rows and drops its stored digest, so the next sync replaces all of the stand's rows.
+
+       The FVS class holds a reference to the stand rather than a copy, the tree rows are generated from the stand's trees as they
+       are written to the database, so the export does not hold the tree rows in memory"""
 
     def __init__(self):
         self.stand_args = [i[0] for i in ACCESS_STAND_COLS[1]]
         self.stand = None
         self.stand_fvs = None
-        self.tree_fvs = None
+        self.stands = []
+        self.synced_stands = []
+        self.tree_cols = TREE_FVS_COLS
 
     def show_stand_args(self):
         """Shows the optional stand data and their indices within self.stand_args"""
@@ -65,11 +102,16 @@ class FVS(object):
             print(f'{arg + (" " * (format_space - len(arg)))}\t Index: {i}')
 
     def set_stand(self, stand, variant: str, forest_code: int, region: int, stand_age: int, site_species: str, site_index: int, **kwargs):
-        """Extracts the stand and tree data from the Stand class and updates the stand_fvs and tree_fvs dictionaries which will be used
-           to create or update the databases"""
-        self.stand = deepcopy(stand)
+        """Extracts the stand data from the Stand class and updates the stand_fvs dictionary which will be used to create or
+           update the databases, the tree rows are generated from the stand when the databases are created or updated.
+           Any stands previously set or added are replaced by this stand"""
+        self.stands = []
+        self.add_stand(stand, variant, forest_code, region, stand_age, site_species, site_index, **kwargs)
+
+    def add_stand(self, stand, variant: str, forest_code: int, region: int, stand_age: int, site_species: str, site_index: int, **kwargs):
+        """Adds a stand to the stands that will be written to the databases, the arguments are the same as set_stand"""
+        self.stand = stand
         self.stand_fvs = {i[0]: None for i in ACCESS_STAND_COLS[1]}
-        self.tree_fvs = {}
 
         if self.stand.inv_date:
             inv_year = self.stand.inv_date.year
@@ -89,26 +131,22 @@ class FVS(object):
         self.stand_fvs['Site_Species'] = site_species
         self.stand_fvs['Site_Index'] = site_index
 
-        row = 1
-        for i, plot in enumerate(self.stand.plots):
-            pnum = i + 1
-            std_plt = f'{self.stand.name}_{pnum}'
-            for j, tree in enumerate(plot.trees):
-                self.tree_fvs[row] = {i[0]: None for i in ACCESS_TREE_COLS[1]}
-                self.tree_fvs[row]['Stand_ID'] = self.stand.name
-                self.tree_fvs[row]['StandPlot_ID'] = std_plt
-                self.tree_fvs[row]['Plot_ID'] = pnum
-                self.tree_fvs[row]['Tree_ID'] = j + 1
-                self.tree_fvs[row]['Tree_Count'] = 1
-                self.tree_fvs[row]['History'] = 1
-                self.tree_fvs[row]['Species'] = tree.species
-                self.tree_fvs[row]['DBH'] = tree.dbh
-                self.tree_fvs[row]['Ht'] = tree.height
-                row += 1
-
         for key in kwargs:
             if key in self.stand_fvs:
                 self.stand_fvs[key] = kwargs[key]
+        self.stands.append([self.stand, self.stand_fvs])
+
+    def get_tree_rows(self, stand=None):
+        """Generates the FVS_TreeInit rows of the stand's trees as tuples in the column order of self.tree_cols,
+           if stand is None, the rows of the last set or added stand are generated"""
+        if stand is None:
+            stand = self.stand
+        name = stand.name
+        for i, plot in enumerate(stand.plots):
+            pnum = i + 1
+            std_plt = f'{name}_{pnum}'
+            for j, tree in enumerate(plot.trees):
+                yield name, std_plt, pnum, j + 1, self._get_tree_count(tree), 1, tree.species, tree.dbh, tree.height
 
     def access_db(self, filename: str, directory: str = None, blank_db: bool = False):
         """Creates or updates an FVS-formatted Microsoft Access Database (.accdb)"""
@@ -138,13 +176,15 @@ class FVS(object):
             con.commit()
 
         if not blank_db:
-            self._insert_sql(con, cur)
+            self._insert_sql(cur, self.stands)
+            con.commit()
         con.close()
 
         self._create_loc_file(db_save, dir_)
 
-    def sqlite_db(self, filename: str, directory: str = None, blank_db: bool = False):
-        """Creates or updates an FVS-formatted SQLite Database (.db)"""
+    def sqlite_db(self, filename: str, directory: str = None, blank_db: bool = False, sync: bool = False):
+        """Creates or updates an FVS-formatted SQLite Database (.db), if sync is True only the stands that are new or have changed
+           since they were last synced are written, replacing their old rows"""
         db_save = extension_check(filename, '.db')
 
         if directory:
@@ -157,14 +197,27 @@ class FVS(object):
         else:
             con = sqcon(db_path)
             cur = con.cursor()
-
-        if not blank_db:
-            self._insert_sql(con, cur)
-
+        cur.execute('PRAGMA journal_mode=WAL')
+        cur.execute('PRAGMA synchronous=NORMAL')
+
+        if sync and not blank_db:
+            self._sync_sql(cur)
+        elif not blank_db:
+            # A load that is large next to the table is faster with the indexes rebuilt once all of the rows are inserted,
+            # smaller appends are inserted with the indexes in place
+            if self._is_large_sql_load(cur):
+                for index in SQL_INDEXES:
+                    cur.execute(f'DROP INDEX IF EXISTS {index[0]}')
+            self._insert_sql(cur, self.stands)
+            self._drop_sql_digests(cur)
+        for index in SQL_INDEXES:
+            cur.execute(f'CREATE INDEX IF NOT EXISTS {index[0]} ON {index[1]} ({index[2]})')
+        con.commit()
         con.close()
 
-    def excel_db(self, filename: str, directory: str = None, blank_db: bool = False):
-        """Creates or updates an FVS-formatted Microsoft Excel Database (.xlsx)"""
+    def excel_db(self, filename: str, directory: str = None, blank_db: bool = False, sync: bool = False):
+        """Creates or updates an FVS-formatted Microsoft Excel Database (.xlsx), if sync is True only the stands that are new or
+           have changed since they were last synced are written, replacing their old rows"""
         db_save = extension_check(filename, '.xlsx')
 
         if directory:
@@ -172,53 +225,147 @@ class FVS(object):
         else:
             db_path = join(getcwd(), db_save)
 
-        if not isfile(db_path):
-            wb = self._create_excel_db(db_save)
+        # The workbook is streamed, an existing database's rows are read from a read-only workbook and written through
+        old_wb = load_workbook(db_path, read_only=True) if isfile(db_path) else None
+        if blank_db:
+            stands, digests = [], []
+        elif sync:
+            stands, digests = self._get_changed_stands(self._get_excel_digests(old_wb))
         else:
-            wb = load_workbook(db_path)
+            stands, digests = self.stands, []
+
+        new_rows = {ACCESS_STAND_COLS[0]: self._get_excel_stand_rows(stands),
+                    ACCESS_TREE_COLS[0]: self._get_excel_tree_rows(stands)}
+        if sync:
+            new_rows[DIGEST_COLS[0]] = digests
+        stand_ids = set(stand.name for stand, _ in stands) if sync else set()
+        # A plain append to a synced database drops the digests of the appended stands, see self._drop_sql_digests()
+        dropped_ids = set(stand.name for stand, _ in stands) if not sync else set()
+
+        wb = Workbook(write_only=True)
+        old_sheets = old_wb.sheetnames if old_wb else []
+        for sheet in old_sheets:
+            ws = wb.create_sheet(sheet)
+            if sheet in new_rows and stand_ids:
+                copy_excel_rows(old_wb[sheet], ws, db_path, lambda row: row[0] in stand_ids)
+            elif sheet == DIGEST_COLS[0] and dropped_ids:
+                copy_excel_rows(old_wb[sheet], ws, db_path, lambda row: row[0] in dropped_ids)
+            else:
+                copy_excel_rows(old_wb[sheet], ws, db_path)
+            for row in new_rows.get(sheet, []):
+                ws.append(row)
+        if old_wb:
+            old_wb.close()
+
+        tables = [ACCESS_GROUPS_COLS, ACCESS_STAND_COLS, ACCESS_TREE_COLS] + ([DIGEST_COLS] if sync else [])
+        for table in tables:
+            if table[0] in old_sheets:
+                continue
+            ws = self._create_excel_sheet(wb, table, db_save)
+            for row in new_rows.get(table[0], []):
+                ws.append(row)
+
+        save_excel_stream(wb, db_path)
+
+    def _sync_sql(self, cursor):
+        """Deletes and re-inserts the stands whose digests do not match the digests stored in the SQLite database, used internally"""
+        cursor.execute(f"""CREATE TABLE IF NOT EXISTS {DIGEST_COLS[0]} ({', '.join([f'{i[0]} {i[1]}' for i in DIGEST_COLS[1]])})""")
+        for index in SQL_INDEXES:
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {index[0]} ON {index[1]} ({index[2]})')
+        stored = dict(cursor.execute(f'SELECT Stand_ID, Digest FROM {DIGEST_COLS[0]}').fetchall())
+
+        changed, digests = self._get_changed_stands(stored)
+        for stand, _ in changed:
+            for table in [SQL_STAND_COLS[0], SQL_TREE_COLS[0]]:
+                cursor.execute(f'DELETE FROM {table} WHERE Stand_ID = ?', [stand.name])
+        self._insert_sql(cursor, changed)
+        cursor.executemany(f'INSERT OR REPLACE INTO {DIGEST_COLS[0]} (Stand_ID, Digest) VALUES (?, ?)', digests)
+
+    def _is_large_sql_load(self, cursor):
+        """Returns True if the stands have more tree rows than INDEX_REBUILD_SHARE of the rows in the SQLite database's
+           FVS_TreeInit table (the largest rowid, which SQLite finds without counting the rows), used internally"""
+        table_rows = cursor.execute(f'SELECT MAX(rowid) FROM {SQL_TREE_COLS[0]}').fetchone()[0] or 0
+        load_rows = sum(len(plot.trees) for stand, _ in self.stands for plot in stand.plots)
+        return load_rows > table_rows * INDEX_REBUILD_SHARE
+
+    def _drop_sql_digests(self, cursor):
+        """Deletes the stored digests of the stands appended without sync, if the SQLite database has been synced before.
+           The appended stands' rows are then not what their digests describe, so the next sync sees them as new and replaces
+           all of their rows, used internally"""
+        if cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?", [DIGEST_COLS[0]]).fetchone() is None:
+            return
+        cursor.executemany(f'DELETE FROM {DIGEST_COLS[0]} WHERE Stand_ID = ?', [[stand.name] for stand, _ in self.stands])
 
-        if not blank_db:
-            self._insert_excel(wb)
-
-        wb.save(db_path)
-
-    def _insert_sql(self, connection, cursor):
-        """Inserts the stand and tree FVS data into the Access or SQLite database"""
-        stand_cols = [col for col in self.stand_fvs if self.stand_fvs[col] is not None]
-        stand_vals = [self.stand_fvs[col] for col in self.stand_fvs if self.stand_fvs[col] is not None]
-        stand_sql = f"""INSERT INTO FVS_StandInit ({', '.join(stand_cols)}) VALUES ({', '.join(['?' for _ in stand_cols])})"""
-        cursor.execute(stand_sql, stand_vals)
-
-        for row in self.tree_fvs:
-            tree_cols = [col for col in self.tree_fvs[row] if self.tree_fvs[row][col] is not None]
-            tree_vals = [self.tree_fvs[row][col] for col in self.tree_fvs[row] if self.tree_fvs[row][col] is not None]
-            tree_sql = f"""INSERT INTO FVS_TreeInit ({', '.join(tree_cols)}) VALUES ({', '.join(['?' for _ in tree_cols])})"""
-
-            cursor.execute(tree_sql, tree_vals)
-        connection.commit()
-
-    def _insert_excel(self, workbook):
-        """Inserts the stand and tree FVS data into the Excel database"""
-        stand_keys = list(self.stand_fvs)
-        stand_cols = [col for col in self.stand_fvs if self.stand_fvs[col] is not None]
-        stand_idxs = [stand_keys.index(col) + 1 for col in stand_cols]
-        stand_vals = [self.stand_fvs[col] for col in self.stand_fvs if self.stand_fvs[col] is not None]
-
-        ws = workbook['FVS_StandInit']
-        next_row = ws.max_row + 1
-        for idx, val in zip(stand_idxs, stand_vals):
-            ws.cell(next_row, idx).value = val
-
-        ws = workbook['FVS_TreeInit']
-        next_row = ws.max_row + 1
-        tree_keys = list(self.tree_fvs[1])
-        for row in self.tree_fvs:
-            tree_cols = [col for col in self.tree_fvs[row] if self.tree_fvs[row][col] is not None]
-            tree_idxs = [tree_keys.index(col) + 1 for col in tree_cols]
-            tree_vals = [self.tree_fvs[row][col] for col in self.tree_fvs[row] if self.tree_fvs[row][col] is not None]
-            for idx, val in zip(tree_idxs, tree_vals):
-                ws.cell(next_row, idx).value = val
-            next_row += 1
+    @staticmethod
+    def _get_excel_digests(workbook):
+        """Returns a dict of the Stand_IDs and digests stored in a read-only Excel database, used internally"""
+        if workbook is None or DIGEST_COLS[0] not in workbook.sheetnames:
+            return {}
+        return {row[0]: row[1] for row in workbook[DIGEST_COLS[0]].iter_rows(min_row=2, values_only=True) if row[0] is not None}
+
+    def _get_changed_stands(self, stored_digests: dict):
+        """Returns the list of stands (and their stand_fvs) that are new or have changed and a list of their [Stand_ID, digest],
+           the changed Stand_IDs are kept in self.synced_stands, used internally"""
+        changed = []
+        digests = []
+        for stand, stand_fvs in self.stands:
+            digest = self._get_stand_digest(stand, stand_fvs)
+            if stored_digests.get(stand.name) != digest:
+                changed.append([stand, stand_fvs])
+                digests.append([stand.name, digest])
+        self.synced_stands = [stand.name for stand, _ in changed]
+        return changed, digests
+
+    def _get_stand_digest(self, stand, stand_fvs: dict):
+        """Returns the sha256 hex digest of the stand's exported stand and tree rows, used internally"""
+        digest = sha256(repr(sorted((col, val) for col, val in stand_fvs.items() if val is not None)).encode())
+        for row in self.get_tree_rows(stand):
+            digest.update(repr(row).encode())
+        return digest.hexdigest()
+
+    def _insert_sql(self, cursor, stands: list):
+        """Inserts the stand and tree FVS data of the stands into the Access or SQLite database, the tree rows are inserted in chunks"""
+        for _, stand_fvs in stands:
+            stand_cols = [col for col in stand_fvs if stand_fvs[col] is not None]
+            stand_vals = [stand_fvs[col] for col in stand_fvs if stand_fvs[col] is not None]
+            stand_sql = f"""INSERT INTO FVS_StandInit ({', '.join(stand_cols)}) VALUES ({', '.join(['?' for _ in stand_cols])})"""
+            cursor.execute(stand_sql, stand_vals)
+
+        tree_sql = f"""INSERT INTO FVS_TreeInit ({', '.join(self.tree_cols)}) VALUES ({', '.join(['?' for _ in self.tree_cols])})"""
+        rows = chain.from_iterable(self.get_tree_rows(stand) for stand, _ in stands)
+        chunk = list(islice(rows, INSERT_CHUNK_SIZE))
+        while chunk:
+            cursor.executemany(tree_sql, chunk)
+            chunk = list(islice(rows, INSERT_CHUNK_SIZE))
+
+    @staticmethod
+    def _get_excel_stand_rows(stands: list):
+        """Yields the FVS_StandInit rows of the stands for the Excel database, used internally"""
+        for _, stand_fvs in stands:
+            yield list(stand_fvs.values())
+
+    def _get_excel_tree_rows(self, stands: list):
+        """Yields the FVS_TreeInit rows of the stands for the Excel database, the columns not exported are left blank, used internally"""
+        tree_keys = [i[0] for i in ACCESS_TREE_COLS[1]]
+        tree_idxs = [tree_keys.index(col) for col in self.tree_cols]
+        for stand, _ in stands:
+            for row in self.get_tree_rows(stand):
+                excel_row = [None] * len(tree_keys)
+                for idx, val in zip(tree_idxs, row):
+                    excel_row[idx] = val
+                yield excel_row
+
+    @staticmethod
+    def _get_tree_count(tree):
+        """Returns the number of trees the tree record represents, the tree's trees per acre over the trees per acre of its
+           plot factor. This is 1 for cruised trees, trees of a residual stand (Thin.residual_stand) represent fewer trees"""
+        if tree.plot_factor > 0:
+            expansion = tree.plot_factor / tree.ba
+        else:
+            expansion = abs(tree.plot_factor)
+        if not expansion or tree.tpa == expansion:
+            return 1
+        return tree.tpa / expansion
 
     @staticmethod
     def _create_access_db(db_path: str):
@@ -248,22 +395,16 @@ class FVS(object):
         return con, cur
 
     @staticmethod
-    def _create_excel_db(db_save: str):
-        """If the file does not exist, this method is called to construct the Excel database, used internally"""
-        wb = Workbook()
-        for i, table in enumerate([ACCESS_GROUPS_COLS, ACCESS_STAND_COLS, ACCESS_TREE_COLS]):
-            ws = wb.create_sheet(table[0])
-            for j, col in enumerate(table[1]):
-                ws.cell(1, j + 1).value = col[0]
-            if i == 0:
-                ws.cell(2, 1).value = EXCEL_DEFAULTS[0]
-                ws.cell(2, 3).value = EXCEL_DEFAULTS[1].format(DB_NAME=db_save)
-                ws.cell(2, 3).alignment = Alignment(wrapText=True)
-
-        for sheet in wb.sheetnames:
-            if sheet not in [ACCESS_GROUPS_COLS[0], ACCESS_STAND_COLS[0], ACCESS_TREE_COLS[0]]:
-                wb.remove(wb[sheet])
-        return wb
+    def _create_excel_sheet(workbook, table: list, db_save: str):
+        """If the sheet is not in the Excel database, this method is called to create it within the write-only workbook
+           with its header row (and the default group row of the FVS_GroupAddFilesAndKeywords sheet), used internally"""
+        ws = workbook.create_sheet(table[0])
+        ws.append([col[0] for col in table[1]])
+        if table is ACCESS_GROUPS_COLS:
+            keywords = WriteOnlyCell(ws, EXCEL_DEFAULTS[1].format(DB_NAME=db_save))
+            keywords.alignment = Alignment(wrapText=True)
+            ws.append([EXCEL_DEFAULTS[0], None, keywords])
+        return ws
 
     @staticmethod
     def _create_loc_file(db_save, directory):
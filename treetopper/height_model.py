@@ -0,0 +1,139 @@
+import numpy as np
+
+
+# LINEARIZED HEIGHT-DIAMETER FORMS, ln(Height - 4.5) = b0 + b1 * x, WHERE x IS A FUNCTION OF DBH
+HEIGHT_FORMS = {
+    'wykoff': lambda dbh: 1 / (dbh + 1),
+    'curtis': lambda dbh: 1 / dbh
+}
+
+# SPECIES WITH FEWER MEASURED TREES THAN THIS USE THE POOLED (ALL SPECIES) FIT
+MIN_SPECIES_TREES = 5
+
+
+class HeightModel(object):
+    """The HeightModel Class fits height-diameter curves to the measured trees of a stand, by species, and predicts the total
+       heights of trees that were not measured. The curves are the Wykoff (form='wykoff') or Curtis (form='curtis') forms,
+       fit by least squares on their linearized forms:
+
+       wykoff: ln(Height - 4.5) = b0 + b1 / (DBH + 1)
+       curtis: ln(Height - 4.5) = b0 + b1 / DBH
+
+       The model keeps the least squares sums (count, x, y, x^2, xy) of each species, so measured trees can be added at any
+       time and the fits are only re-solved when they are next needed. Species with fewer than min_trees measured trees
+       (or without a spread of diameters) use the pooled fit of all species.
+
+       If a stand's height_model is set, the cruise sheet imports fill the missing total heights from the model instead of
+       the stand's average height-to-diameter ratio, and the model keeps the measured trees of every sheet imported:
+       ::
+            from treetopper import Stand, HeightModel
+
+            stand = Stand('EX1', -20)
+            stand.height_model = HeightModel('wykoff')
+            stand.import_sheet_quick('example_quick_cruise_sheet.xlsx')
+            stand.height_model.fits['DF']"""
+
+    def __init__(self, form: str = 'wykoff', min_trees: int = MIN_SPECIES_TREES):
+        if form not in HEIGHT_FORMS:
+            raise ValueError(f'form must be one of {list(HEIGHT_FORMS)}, not "{form}"')
+        self.form = form
+        self.min_trees = min_trees
+
+        # {species: [count, sum x, sum y, sum x^2, sum xy]}
+        self.species_sums = {}
+        self._fits = None
+
+    def __getitem__(self, attribute: str):
+        return self.__dict__[attribute]
+
+    @property
+    def fits(self):
+        """A dictionary of the [b0, b1] coefficients of each species with enough measured trees and of the 'pooled' fit of all
+           species (None if there are not enough measured trees), the fits are cached until more trees are added"""
+        if self._fits is None:
+            self._fits = {}
+            for species, sums in self.species_sums.items():
+                if sums[0] >= self.min_trees:
+                    coef = self._solve(*sums)
+                    if coef is not None:
+                        self._fits[species] = coef
+            pooled = np.sum(list(self.species_sums.values()), axis=0) if self.species_sums else [0, 0, 0, 0, 0]
+            self._fits['pooled'] = self._solve(*pooled) if pooled[0] >= 2 else None
+        return self._fits
+
+    @property
+    def fitted(self):
+        """True if the model has a pooled fit and can predict heights"""
+        return self.fits['pooled'] is not None
+
+    def add_trees(self, species, dbh, height):
+        """Adds measured trees (sequences of species, DBH and total height) to the model's sums. Trees without a DBH or with a
+           total height of 4.5 feet or less are skipped"""
+        species = np.asarray(species, dtype=str)
+        dbh = np.asarray(dbh, dtype=float)
+        height = np.asarray(height, dtype=float)
+        keep = (dbh > 0) & (height > 4.5)
+        if not keep.any():
+            return
+
+        species, dbh, height = species[keep], dbh[keep], height[keep]
+        x = HEIGHT_FORMS[self.form](dbh)
+        y = np.log(height - 4.5)
+        spp, idx = np.unique(species, return_inverse=True)
+        count = len(spp)
+        sums = np.column_stack([np.bincount(idx, minlength=count),
+                                np.bincount(idx, weights=x, minlength=count),
+                                np.bincount(idx, weights=y, minlength=count),
+                                np.bincount(idx, weights=x * x, minlength=count),
+                                np.bincount(idx, weights=x * y, minlength=count)])
+        for i, sp in enumerate(spp.tolist()):
+            current = self.species_sums.setdefault(sp, [0, 0.0, 0.0, 0.0, 0.0])
+            for k in range(5):
+                current[k] += sums[i, k].item()
+        self._fits = None
+
+    def update(self, other):
+        """Adds the measured trees of another HeightModel of the same form to the model"""
+        if other.form != self.form:
+            raise ValueError(f'Cannot update a "{self.form}" HeightModel with a "{other.form}" HeightModel')
+        for sp, sums in other.species_sums.items():
+            current = self.species_sums.setdefault(sp, [0, 0.0, 0.0, 0.0, 0.0])
+            for k in range(5):
+                current[k] += sums[k]
+        self._fits = None
+
+    def predict(self, species, dbh):
+        """Returns a numpy array of the predicted total heights (rounded to one decimal) of the trees (sequences of species and
+           DBH), species without their own fit use the pooled fit. Raises a ValueError if the model is not fitted"""
+        if not self.fitted:
+            raise ValueError('HeightModel does not have enough measured trees to predict heights')
+        species = np.asarray(species, dtype=str)
+        dbh = np.asarray(dbh, dtype=float)
+        if not len(species):
+            return np.array([], dtype=float)
+
+        fits = self.fits
+        spp, idx = np.unique(species, return_inverse=True)
+        coef = np.array([fits.get(sp, fits['pooled']) for sp in spp.tolist()])[idx.reshape(-1)]
+        return np.round(4.5 + np.exp(coef[:, 0] + (coef[:, 1] * HEIGHT_FORMS[self.form](dbh))), 1)
+
+    def to_dict(self):
+        """Returns a JSON-serializable dictionary of the model, used by the stand snapshots"""
+        return {'form': self.form, 'min_trees': self.min_trees, 'species_sums': self.species_sums}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """Returns a HeightModel Class from a dictionary created by HeightModel.to_dict"""
+        model = cls(data['form'], data['min_trees'])
+        model.species_sums = {sp: list(sums) for sp, sums in data['species_sums'].items()}
+        return model
+
+    @staticmethod
+    def _solve(count, sx, sy, sxx, sxy):
+        """Returns the [b0, b1] least squares coefficients from the sums, or None if the diameters have no spread, used internally"""
+        sxx_centered = sxx - ((sx * sx) / count)
+        if sxx_centered <= 1e-12 * max(sxx, 1e-300):
+            return None
+        b1 = (sxy - ((sx * sy) / count)) / sxx_centered
+        b0 = (sy - (b1 * sx)) / count
+        return [b0, b1]
@@ -9,9 +9,12 @@ from treetopper._constants import (
 
 class Log(object):
     """Log Class calculates the volume of an individual log from the Timber Classes. If coming from
-       the TimberQuick class, it will also calculate the grade of the log"""
+       the TimberQuick class, it will also calculate the grade of the log.
 
-    def __init__(self, timber, stem_height: int, length: int, defect_pct: int = 0, grade: str = None):
+       The volumes argument is for logs whose [top DIB, Scribner coefficient, board feet, cubic feet] have already been
+       calculated with the same equations (such as the batches of TimberFull.add_logs), the grade is then required"""
+
+    def __init__(self, timber, stem_height: int, length: int, defect_pct: int = 0, grade: str = None, volumes: list = None):
         self.tree = timber
         self.stem_height = stem_height
         self.length = length
@@ -20,14 +23,19 @@ class Log(object):
         self.species = self.tree.species
         self.lpa = self.tree.tpa
 
-        self.top_dib = self._calc_top_dib()
-        if grade:
+        if volumes is not None:
+            self.top_dib = volumes[0]
             self.grade = grade
+            self.scrib, self.bf, self.cf = volumes[1:]
         else:
-            self.grade = self._calc_log_grade()
-        self.scrib = self._calc_scribner()
-        self.bf = self._calc_board_feet()
-        self.cf = self._calc_cubic_feet()
+            self.top_dib = self._calc_top_dib()
+            if grade:
+                self.grade = grade
+            else:
+                self.grade = self._calc_log_grade()
+            self.scrib = self._calc_scribner()
+            self.bf = self._calc_board_feet()
+            self.cf = self._calc_cubic_feet()
 
         self.bf_ac = self.bf * self.lpa
         self.cf_ac = self.cf * self.lpa
@@ -22,6 +22,7 @@ class Plot(object):
         self.bf_ac = 0
         self.cf_ac = 0
         self.avg_hgt = 0
+        self.hdr = 0
         self.vbar = 0
         self.metrics = ['tpa', 'ba_ac', 'rd_ac', 'bf_ac', 'cf_ac']
 
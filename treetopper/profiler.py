@@ -0,0 +1,221 @@
+import sys
+import time
+import threading
+import tracemalloc
+from cProfile import Profile
+from os.path import basename
+from tempfile import TemporaryDirectory
+from treetopper.stand import Stand
+from treetopper.fvs import FVS
+from treetopper.height_model import HeightModel
+from treetopper._phases import (
+    phase,
+    set_phase_callback
+)
+
+
+# THE PHASES OF THE PIPELINE, IN THE ORDER THEY ARE RUN. TIME OUTSIDE OF THE MARKED PHASES IS RECORDED AS other
+PHASES = ['parse', 'validate', 'heights', 'taper/bucking', 'aggregation', 'summaries', 'cache', 'pdf layout', 'fvs export']
+
+# FVS STAND ARGUMENTS USED ONLY TO TIME THE FVS EXPORT, THE DATABASE IS WRITTEN TO A TEMPORARY DIRECTORY
+PROFILE_FVS_ARGS = ['PN', 612, 6, 50, 'DF', 120]
+
+# SECONDS BETWEEN THE SAMPLES OF THE COLLAPSED STACKS
+SAMPLE_INTERVAL = 0.001
+
+
+class PipelineProfile(object):
+    """The PipelineProfile Class imports one stand of a cruise sheet through the same path as Stand.import_sheet_quick and
+       Stand.import_sheet_full (with the same stream, sorted_by_plot, HeightModel and ImportCache options), then builds its
+       reports and FVS export, and records the time and peak memory of each phase of the pipeline:
+
+       parse -- reading the sheet's rows (and hashing the sheet)
+       validate -- checking the rows (check_columns)
+       heights -- filling missing heights and grouping the rows into plots
+       taper/bucking -- cruising the trees (TimberQuick) or adding their logs (TimberFull), the taper equations and log volumes
+       aggregation -- adding the plots to the stand's aggregate and calculating the stand's metrics and statistics
+       summaries -- building the stand's summaries and the console report text
+       cache -- loading the stand from or saving it to the ImportCache
+       pdf layout -- building the PDF report in memory
+       fvs export -- writing the stand to an FVS SQLite database in a temporary directory
+
+       The phases are marked within the import path itself (see treetopper._phases), so a phase that runs many times (such as
+       the batches of a streamed import) is summed. Phases can be nested, streamed rows are parsed and validated as the
+       heights phase pulls them, the time and memory of a nested phase are only counted towards the nested phase. Time
+       outside of the marked phases is recorded as other.
+
+       The peak memory of a phase is the most memory (traced by tracemalloc) held above what was held when the phase, or its
+       part between nested phases, started. Tracing memory slows the pipeline down, memory=False times the phases without it.
+
+       If prof_file is given, the whole pipeline is run under cProfile and the stats are saved to prof_file (for pstats,
+       snakeviz and similar tools). If collapsed_file is given, the pipeline's call stacks are sampled every sample_interval
+       seconds and saved as collapsed stacks (one "phase;frame;frame count" line per stack) for flamegraph.pl or speedscope"""
+
+    def __init__(self, file: str, stand_name: str, cruise_type: str, plot_factor: float = -20, memory: bool = True,
+                 prof_file: str = None, collapsed_file: str = None, sample_interval: float = SAMPLE_INTERVAL,
+                 stream: bool = False, sorted_by_plot: bool = False, height_model: str = None, cache=None):
+        if cruise_type not in ['q', 'f']:
+            raise ValueError(f'cruise_type must be "q" or "f", not "{cruise_type}"')
+        self.file = file
+        self.stand_name = stand_name.upper()
+        self.cruise_type = cruise_type
+        self.plot_factor = plot_factor
+        self.memory = memory
+        self.prof_file = prof_file
+        self.collapsed_file = collapsed_file
+        self.sample_interval = sample_interval
+        self.stream = stream
+        self.sorted_by_plot = sorted_by_plot
+        self.height_model = height_model
+        self.cache = cache
+
+        self.phases = []
+        self.stand = None
+        self._phase = None
+        self._stack = []
+        self._totals = {}
+        self._thread = None
+        self._mark = [0, 0]
+        self._stacks = {}
+        self._sampling = False
+
+    def __getitem__(self, attribute: str):
+        return self.__dict__[attribute]
+
+    def run(self):
+        """Runs the pipeline and returns the list of [phase, seconds, peak memory bytes] of each phase"""
+        self.phases = []
+        self._stack = []
+        self._totals = {}
+        self._stacks = {}
+        self._thread = threading.get_ident()
+        profile = Profile() if self.prof_file else None
+        sampler = None
+        if self.collapsed_file:
+            sampler = threading.Thread(target=self._sample, args=(self._thread,), daemon=True)
+            self._sampling = True
+            sampler.start()
+        if self.memory:
+            tracemalloc.start()
+        previous = set_phase_callback(self._on_phase)
+        self._start_segment()
+        if profile is not None:
+            profile.enable()
+
+        try:
+            self._run_pipeline()
+        finally:
+            if profile is not None:
+                profile.disable()
+            self._end_segment()
+            set_phase_callback(previous)
+            if self.memory:
+                tracemalloc.stop()
+            if sampler is not None:
+                self._sampling = False
+                sampler.join()
+            self._phase = None
+
+        self.phases = [[name] + self._totals[name] for name in PHASES + ['other'] if name in self._totals]
+        if profile is not None:
+            profile.dump_stats(self.prof_file)
+        if sampler is not None:
+            with open(self.collapsed_file, 'w') as f:
+                for stack, count in sorted(self._stacks.items()):
+                    f.write(f'{stack} {count}\n')
+        return self.phases
+
+    def get_report_text(self):
+        """Returns the table of the time and peak memory of each phase"""
+        total = sum(seconds for _, seconds, _ in self.phases)
+        width = max(len(phase) for phase in PHASES + ['TOTAL']) + 2
+        options = [option for option, used in [['stream', self.stream], ['sorted by plot', self.sorted_by_plot],
+                                               [f'{self.height_model} height model', self.height_model],
+                                               ['cache', self.cache is not None]] if used]
+        lines = [f'treetopper profile -- {basename(self.file)} -- Stand {self.stand_name} ({self.cruise_type})' +
+                 (f' -- {", ".join(options)}' if options else ''),
+                 f'{"PHASE":<{width}}{"TIME (S)":>12}{"% TIME":>10}{"PEAK MEMORY (MB)":>20}',
+                 '-' * (width + 42)]
+        for phase, seconds, peak in self.phases:
+            pct = (seconds / total) * 100 if total else 0
+            memory = f'{peak / 1024 ** 2:.2f}' if self.memory else '-'
+            lines.append(f'{phase:<{width}}{seconds:>12.4f}{pct:>10.1f}{memory:>20}')
+        lines.append('-' * (width + 42))
+        peak = max((peak for _, _, peak in self.phases), default=0)
+        lines.append(f'{"TOTAL":<{width}}{total:>12.4f}{100:>10.1f}{f"{peak / 1024 ** 2:.2f}" if self.memory else "-":>20}')
+        return '\n'.join(lines)
+
+    def _run_pipeline(self):
+        """Imports the stand and builds its reports and FVS export, the phases are marked along the way, used internally"""
+        self.stand = stand = Stand(self.stand_name, self.plot_factor)
+        if self.height_model is not None:
+            stand.height_model = HeightModel(self.height_model)
+        if self.cruise_type == 'q':
+            stand.import_sheet_quick(self.file, self.stream, self.sorted_by_plot, self.cache)
+        else:
+            stand.import_sheet_full(self.file, self.stream, self.sorted_by_plot, self.cache)
+
+        with phase('summaries'):
+            stand.get_console_report_text()
+        with phase('pdf layout'):
+            stand.get_pdf_report_bytes_io()
+        with phase('fvs export'):
+            self._export_fvs(stand)
+
+    def _on_phase(self, name: str, starting: bool):
+        """The phase callback, ends the current phase's segment and starts the next, phases marked by other threads (such as
+           the sheet readers of Stand.import_sheets) are ignored, used internally"""
+        if threading.get_ident() != self._thread:
+            return
+        self._end_segment()
+        if starting:
+            self._stack.append(name)
+        else:
+            self._stack.pop()
+        self._phase = self._stack[-1] if self._stack else None
+        self._start_segment()
+
+    def _start_segment(self):
+        """Marks the start time and memory of the current phase's segment, used internally"""
+        if self.memory:
+            tracemalloc.reset_peak()
+            self._mark[1] = tracemalloc.get_traced_memory()[0]
+        self._mark[0] = time.perf_counter()
+
+    def _end_segment(self):
+        """Adds the time and peak memory of the current phase's segment to the phase's totals, used internally"""
+        seconds = time.perf_counter() - self._mark[0]
+        peak = tracemalloc.get_traced_memory()[1] - self._mark[1] if self.memory else 0
+        totals = self._totals.setdefault(self._stack[-1] if self._stack else 'other', [0, 0])
+        totals[0] += seconds
+        totals[1] = max(totals[1], peak)
+
+    @staticmethod
+    def _export_fvs(stand):
+        """Writes the stand to an FVS SQLite database within a temporary directory, used internally"""
+        with TemporaryDirectory() as temp_dir:
+            fvs = FVS()
+            fvs.set_stand(stand, *PROFILE_FVS_ARGS)
+            fvs.sqlite_db('treetopper_profile', temp_dir)
+
+    def _sample(self, thread_id: int):
+        """Samples the call stack of the profiled thread until the run finishes, used internally"""
+        while self._sampling:
+            frame = sys._current_frames().get(thread_id)
+            phase_name = self._phase or 'other'
+            if frame is not None:
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    # The frames above the pipeline (the profiler's own) are left out
+                    if code is self._run_pipeline.__func__.__code__:
+                        break
+                    stack.append(f'{basename(code.co_filename)}:{code.co_name}'.replace(' ', '_'))
+                    frame = frame.f_back
+                else:
+                    # The profiler is not within the pipeline
+                    stack = None
+                if stack is not None:
+                    key = ';'.join([phase_name] + stack[::-1])
+                    self._stacks[key] = self._stacks.get(key, 0) + 1
+            time.sleep(self.sample_interval)
@@ -1,10 +1,22 @@
+import json
 from os import (
     startfile,
-    getcwd
+    getcwd,
+    replace
+)
+from os.path import (
+    join,
+    isfile
 )
-from os.path import join
 from io import BytesIO
+from itertools import repeat
+from concurrent.futures import (
+    ThreadPoolExecutor,
+    ProcessPoolExecutor
+)
+from hashlib import sha256
 from csv import (
+    reader,
     writer,
     excel
 )
@@ -12,12 +24,9 @@ from openpyxl import (
     Workbook,
     load_workbook
 )
-from statistics import (
-    mean,
-    variance,
-    stdev
-)
 from treetopper.plot import Plot
+from treetopper.aggregate import StandAggregate
+from treetopper.diameter_table import DiameterTable
 from treetopper.timber import (
     TimberQuick,
     TimberFull
@@ -26,12 +35,16 @@ from treetopper.log import Log
 from treetopper.thin import (
     ThinTPA,
     ThinBA,
-    ThinRD
+    ThinRD,
+    ThinFromBelow,
+    ThinFromAbove,
+    ThinByScore,
+    ThinSweep,
+    ThinOptimizer
 )
 from treetopper._exceptions import TargetDensityError
 from treetopper.fvs import FVS
 from treetopper._constants import (
-    math,
     ALL_SPECIES_NAMES,
     GRADE_SORT,
     LOG_LENGTHS,
@@ -43,13 +56,38 @@ from treetopper._utils import (
     extension_check,
     reorder_dict,
     check_date,
-    add_logs_to_table_heads
+    add_logs_to_table_heads,
+    get_input_hash,
+    copy_excel_rows,
+    save_excel_stream
+)
+from treetopper._import_from_sheets import (
+    import_from_sheet,
+    read_from_sheet,
+    add_model_trees,
+    get_plots,
+    stream_from_sheet,
+    get_sheet_plots,
+    get_sheet_columns,
+    STREAM_PLOT_BATCH
+)
+from treetopper._columns import restore_plots
+from treetopper._phases import phase
+from treetopper._snapshot import (
+    save_stand,
+    load_stand
+)
+from treetopper._export import (
+    log_table_to_csv,
+    log_table_to_arrow,
+    to_frame,
+    get_frame_plots
 )
-from treetopper._import_from_sheets import import_from_sheet
 from treetopper._print_console import (
     print_stand_species,
     print_stand_logs,
-    print_stand_stats
+    print_stand_stats,
+    print_stand_stock
 )
 from treetopper._print_pdf import PDF
 
@@ -67,7 +105,7 @@ class Stand(object):
     def __init__(self, name: str, plot_factor: float, acres: float = None, inventory_date: str = None):
         self.name = name.upper()
         self.plot_factor = plot_factor
-        self.plots = []
+        self._plots = []
         self.plot_count = 0
 
         self.tpa = 0
@@ -87,19 +125,24 @@ class Stand(object):
         self.cf_ac_stats = {}
 
         self.species = {}
-        self.species_gross = {}
         self.species_stats = {}
+        self._species_gross = None
 
-        self.logs = {}
+        self._logs = {}
+        self._logs_gross = True
 
-        self.table_data = []
+        self.aggregate = StandAggregate()
+        self._table_data = None
+        self._columns = None
+        self._diameter_table = None
+        self.input_hash = None
+        self.height_model = None
 
         self.summary_stand = []
         self.summary_logs = {}
         self.summary_stats = []
 
         self.metrics = ['tpa', 'ba_ac', 'rd_ac', 'bf_ac', 'cf_ac']
-        self.attrs = ['_gross', '_stats', '']
 
         self.acres = acres
         if inventory_date:
@@ -108,7 +151,57 @@ class Stand(object):
             self.inv_date = inventory_date
 
     def __getitem__(self, attribute: str):
-        return self.__dict__[attribute]
+        return getattr(self, attribute)
+
+    @property
+    def plots(self):
+        """The list of Plot Classes within the stand. For stands loaded from a snapshot, the plots are rebuilt from the
+           snapshot's tree and log columns the first time they are needed"""
+        if self._plots is None:
+            self._plots = restore_plots(self._columns['trees'], self._columns['logs'], self.plot_count)
+        return self._plots
+
+    @property
+    def species_gross(self):
+        """A dictionary of the per plot values of the stand metrics (tpa, ba_ac, rd_ac, bf_ac, cf_ac) of each species, the lists are
+           in the order of the stand's plots and plots without the species are zeros. The lists are built from the stand's plots
+           when they are first needed after the stand's plots have changed"""
+        if self._species_gross is None:
+            self._species_gross = {species: {met: [plot.species[species][met] if species in plot.species else 0 for plot in self.plots]
+                                             for met in self.metrics} for species in self.species}
+        return self._species_gross
+
+    @property
+    def logs(self):
+        """A dictionary of the stand's logs broken down by species --> grade --> log length range --> metric (lpa, bf_ac, cf_ac),
+           each metric holds the 'mean' per acre and the 'gross' list of the per plot values (in the order of the stand's plots).
+           The gross lists are filled from the stand's plots when they are first needed after the stand's plots have changed"""
+        if not self._logs_gross:
+            plots = self.plots
+            for species in self._logs:
+                for grade in self._logs[species]:
+                    for rng in self._logs[species][grade]:
+                        for sub in self._logs[species][grade][rng]:
+                            self._logs[species][grade][rng][sub]['gross'] = [plot.logs[species][grade][rng][sub] if species in plot.logs
+                                                                             else 0 for plot in plots]
+            self._logs_gross = True
+        return self._logs
+
+    @property
+    def table_data(self):
+        """A list of the tree-level data for trees within the stand, the first row being the table headers. The table is
+           built when it is first needed after the stand's plots have changed"""
+        if self._table_data is None:
+            self._table_data = self._update_table_data()
+        return self._table_data
+
+    @property
+    def diameter_table(self):
+        """The stand and stock table of the stand (DiameterTable Class), the trees grouped by species and whole-number diameter.
+           The table is built when it is first needed after the stand's plots have changed"""
+        if self._diameter_table is None:
+            self._diameter_table = DiameterTable(self)
+        return self._diameter_table
 
     def get_stand_table_text(self):
         """Returns a console-formatted string of current stand conditions"""
@@ -122,6 +215,33 @@ class Stand(object):
         """Returns and console-formatted string of stand stand statistics"""
         return print_stand_stats(self.summary_stats)
 
+    def get_stand_stock_table_text(self):
+        """Returns a console-formatted string of the stand and stock table, broken down by species and diameter"""
+        return print_stand_stock(self.diameter_table.summary_table)
+
+    def stand_stock_report(self):
+        """Prints a console-formatted string of the stand and stock table, broken down by species and diameter"""
+        print(print_stand_stock(self.diameter_table.summary_table))
+
+    def get_stand_stock_pdf_report_bytes_io(self):
+        """Returns a BytesIO object of the pdf of the stand and stock table"""
+        pdf = self._compile_stand_stock_pdf_report()
+        return BytesIO(pdf.output(dest='S').encode('latin-1'))
+
+    def stand_stock_pdf_report(self, filename: str, directory: str = None, start_file_upon_creation: bool = False):
+        """Exports a pdf of the stand and stock table to a user specified directory or if directory is None,
+        to the current working directory. Will open the created pdf report if start_file_upon_creation is True"""
+        check = extension_check(filename, '.pdf')
+        if directory:
+            file = join(directory, check)
+        else:
+            file = join(getcwd(), check)
+
+        pdf = self._compile_stand_stock_pdf_report()
+        pdf.output(file, 'F')
+        if start_file_upon_creation:
+            startfile(file)
+
     def get_console_report_text(self):
         """Returns a console-formatted string of the complete stand report"""
         return self._compile_report_text()
@@ -152,52 +272,188 @@ class Stand(object):
         """Adds a plot to the stand's plots list and re-runs the calculations and statistics of the stand.
            plot argument needs to be the a Plot Class"""
         self.plots.append(plot)
-        self.plot_count += 1
+        with phase('aggregation'):
+            self.aggregate.add_plot(plot)
+        self._update_stand()
+
+    def add_plots(self, plots: list):
+        """Adds a list of plots to the stand's plots list and re-runs the calculations and statistics of the stand once
+           all of the plots have been added. plots argument needs to be a list of Plot Classes"""
+        with phase('aggregation'):
+            for plot in plots:
+                self.plots.append(plot)
+                self.aggregate.add_plot(plot)
+        self._update_stand()
+
+    def remove_plot(self, index: int):
+        """Removes the plot at the index of the stand's plots list and re-runs the calculations and statistics of the stand.
+           Only the removed plot's data is subtracted from the stand's running totals, so the other plots are not re-calculated.
+           Returns the removed Plot Class"""
+        plot = self.plots.pop(index)
+        self.aggregate.remove_plot(plot)
+        self._update_stand()
+        return plot
+
+    def replace_plot(self, index: int, plot: Plot):
+        """Replaces the plot at the index of the stand's plots list with the plot argument and re-runs the calculations and
+           statistics of the stand. The old plot's data is subtracted from the stand's running totals and the new plot's data
+           is added, so the other plots are not re-calculated. Returns the replaced Plot Class"""
+        old_plot = self.plots[index]
+        self.plots[index] = plot
+        self.aggregate.remove_plot(old_plot)
+        self.aggregate.add_plot(plot)
+        self._update_stand()
+        return old_plot
+
+    def save(self, path: str):
+        """Saves the stand to a binary snapshot in the path directory. The snapshot holds the tree and log data as raw columns
+           and the stand's calculations and statistics, so loading it does not re-import or re-cruise any trees"""
+        save_stand(self, path)
+
+    @classmethod
+    def load(cls, path: str, input_hash: str = None):
+        """Returns a Stand Class loaded from the binary snapshot in the path directory (created by Stand.save).
+           The tree and log columns are memory-mapped and the stand's plots are only rebuilt when they are first needed.
+
+           Snapshots from a different snapshot format or treetopper version raise a SnapshotError, as do stale snapshots if
+           input_hash is given and does not match the snapshot's input hash. The input hash of a cruise sheet can be found with
+           treetopper._utils.get_input_hash(file_path, stand_name, cruise_type, plot_factor)"""
+        return load_stand(cls, path, input_hash)
+
+    @classmethod
+    def from_frame(cls, trees, cruise_type: str, name: str, plot_factor: float, acres: float = None, inventory_date: str = None,
+                   logs=None, height_model=None):
+        """Returns a Stand Class built from a pandas DataFrame of trees with the columns plot, species, dbh and height (and the
+           optional pref_log and min_log columns for quick cruises, cruise_type='q'). For full cruises (cruise_type='f') the logs
+           are a DataFrame with the columns tree, stem_height, length, grade and defect, where tree is the row position of the
+           log's tree within the trees DataFrame. The columns are read as arrays, the trees are not written to a sheet and
+           re-imported, so a stand's to_frame('trees') and to_frame('logs') DataFrames can be passed straight back in.
+           The species and grade codes are checked as they are for the cruise sheets, wrong codes raise an ImportSheetError.
+           If height_model is a HeightModel Class it becomes the stand's height_model and fills the missing heights"""
+        stand = cls(name, plot_factor, acres, inventory_date)
+        stand.height_model = height_model
+        stand.add_plots(get_frame_plots(trees, cruise_type, stand.plot_factor, logs, height_model))
+        return stand
+
+    def to_frame(self, level: str = 'trees'):
+        """Returns a pandas DataFrame of the stand's tree-level (level='trees') or log-level (level='logs') data, the same
+           columns as the stand's snapshot. The DataFrame shares the numeric columns' memory with the stand's cached columns,
+           so it should be copied before it is modified. Requires pandas"""
+        return to_frame(self, level)
+
+    def import_sheet_quick(self, file_path: str, stream: bool = False, sorted_by_plot: bool = False, cache=None):
+        """Imports tree and plot data from a CSV or XLSX file for a quick cruise and adds that data to the stand,
+           see Stand.import_sheet_full for the stream, sorted_by_plot and cache options"""
+        if cache is not None:
+            cache.import_sheet(self, file_path, 'q', stream, sorted_by_plot)
+        else:
+            self._import_sheet(file_path, 'q', stream, sorted_by_plot)
 
-        for met in self.metrics:
-            self._update_metrics(met)
-        self.qmd = math.sqrt((self.ba_ac / self.tpa) / .005454)
-        self.vbar = self.bf_ac / self.ba_ac
+    def import_sheet_full(self, file_path: str, stream: bool = False, sorted_by_plot: bool = False, cache=None):
+        """Imports tree and plot data from a CSV or XLSX file for a full cruise and adds that data to the stand.
 
-        self._update_species(plot)
-        self._update_logs(plot)
-        self.table_data = self._update_table_data()
+           If stream is True, the file is read row by row and the plots are added to the stand in batches as they are completed,
+           so the file's rows are not all held in memory at once. If sorted_by_plot is True (the rows of each plot are together within the
+           file) the plots are completed as the file is read, otherwise the rows are grouped by plot within a temporary file
+           on disk. sorted_by_plot implies stream.
 
-        self.summary_stand = self._update_summary_stand()
-        self.summary_logs = self._update_summary_logs()
-        self.summary_stats = self._update_summary_stats()
+           If cache is an ImportCache Class and the stand does not have any plots yet, a sheet that has been imported before
+           (unchanged, with the same stand name, cruise type and plot factor) is loaded from the cache instead.
 
-    def import_sheet_quick(self, file_path: str):
-        """Imports tree and plot data from a CSV or XLSX file for a quick cruise and adds that data to the stand"""
-        plots = import_from_sheet(file_path, self.name, 'q')
-        for plot_num in plots:
-            plot = Plot()
-            for tree in plots[plot_num]:
-                plot.add_tree(TimberQuick(self.plot_factor, *tree))
-            self.add_plot(plot)
-
-    def import_sheet_full(self, file_path: str):
-        """Imports tree and plot data from a CSV or XLSX file for a full cruise and adds that data to the stand"""
-        plots = import_from_sheet(file_path, self.name, 'f')
-        for plot_num in plots:
-            plot = Plot()
-            for tree_data in plots[plot_num]:
-                args = tree_data[: -1]
-                logs = tree_data[-1]
-                tree = TimberFull(self.plot_factor, *args)
-                for log in logs:
-                    tree.add_log(*log)
-                plot.add_tree(tree)
-            self.add_plot(plot)
+           Missing total heights are filled from the stand's average height-to-diameter ratio of the sheet, or if the stand's
+           height_model is a HeightModel Class, the sheet's measured trees are added to the model and the missing heights are
+           predicted from its species fits. The model keeps its fits, so later imports into the stand reuse them"""
+        if cache is not None:
+            cache.import_sheet(self, file_path, 'f', stream, sorted_by_plot)
+        else:
+            self._import_sheet(file_path, 'f', stream, sorted_by_plot)
+
+    def import_sheets(self, file_paths: list, cruise_type: str, threads: int = None, processes: int = None):
+        """Imports tree and plot data from many CSV or XLSX files of the same cruise type ('q' or 'f') and adds that data to the
+           stand. The files are read and checked concurrently in a thread pool and their trees are cruised in a process pool
+           (processes=0 cruises them within this process), the cruised plots are sent back as columns, not as Plot Classes.
+
+           The plots are added in the order of file_paths and then the order of each file, no matter which file finishes first,
+           the stand is updated once all of the files are imported. If any file has errors, the ImportSheetError of the
+           first of those files (in the order of file_paths) is raised and no plots are added.
+
+           If the stand has a height_model, the measured trees of all of the files are added to it before any missing heights are
+           predicted"""
+        # The files are hashed as they are before they are read, the stand's input hash is only updated once the plots are added
+        sheet_hashes = [get_input_hash(file_path, self.name, cruise_type, self.plot_factor) for file_path in file_paths]
+        with ThreadPoolExecutor(threads) as pool:
+            if self.height_model is None:
+                futures = [pool.submit(import_from_sheet, file_path, self.name, cruise_type) for file_path in file_paths]
+            else:
+                futures = [pool.submit(read_from_sheet, file_path, self.name, cruise_type) for file_path in file_paths]
+            sheets = [future.result() for future in futures]
 
-    def table_to_csv(self, filename: str, directory: str = None):
-        """Creates or appends a CSV file with tree data from self.table_data"""
+        if self.height_model is not None:
+            for clean in sheets:
+                add_model_trees(clean, self.height_model)
+            sheets = [get_plots(clean, self.height_model) for clean in sheets]
+
+        if processes == 0:
+            columns = [get_sheet_columns(plots, cruise_type, self.plot_factor) for plots in sheets]
+        else:
+            with ProcessPoolExecutor(processes) as pool:
+                columns = list(pool.map(get_sheet_columns, sheets, repeat(cruise_type), repeat(self.plot_factor)))
+
+        plots = []
+        for plot_count, tree_columns, log_columns in columns:
+            plots += restore_plots(tree_columns, log_columns, plot_count)
+        self.add_plots(plots)
+        for sheet_hash in sheet_hashes:
+            self._update_input_hash(sheet_hash)
+
+    def _import_sheet(self, file_path: str, cruise_type: str, stream: bool, sorted_by_plot: bool):
+        """Imports the stand's plots from a cruise sheet, all at once or streamed in batches, used internally"""
+        # The sheet is hashed as it is before it is read, the stand's input hash is only updated once the plots are added, so
+        # a sheet with errors does not change it
+        with phase('parse'):
+            sheet_hash = get_input_hash(file_path, self.name, cruise_type, self.plot_factor)
+        if not stream and not sorted_by_plot:
+            plots = import_from_sheet(file_path, self.name, cruise_type, self.height_model)
+            with phase('taper/bucking'):
+                sheet_plots = get_sheet_plots(list(plots.values()), cruise_type, self.plot_factor)
+            for plot in sheet_plots:
+                self.add_plot(plot)
+            self._update_input_hash(sheet_hash)
+            return
+
+        batch = []
+        for trees in stream_from_sheet(file_path, self.name, cruise_type, sorted_by_plot, self.height_model):
+            batch.append(trees)
+            if len(batch) == STREAM_PLOT_BATCH:
+                self._add_sheet_plots(batch, cruise_type)
+                batch = []
+        if batch:
+            self._add_sheet_plots(batch, cruise_type)
+        self._update_input_hash(sheet_hash)
+
+    def _add_sheet_plots(self, plots_trees: list, cruise_type: str):
+        """Cruises the tree data of a batch of a streamed sheet's plots and adds the plots to the stand, used internally"""
+        with phase('taper/bucking'):
+            plots = get_sheet_plots(plots_trees, cruise_type, self.plot_factor)
+        self.add_plots(plots)
+
+    def table_to_csv(self, filename: str, directory: str = None, incremental: bool = False):
+        """Creates or appends a CSV file with tree data from self.table_data.
+
+           If incremental is True, the plots and trees of each stand that have been written to the file are recorded in a
+           sidecar watermark file ([filename].watermark.json) and only the trees that have not been written yet are appended,
+           so the stand can be exported again after more plots are added without writing its earlier trees twice. If plots were
+           removed or replaced since the last export, the stand's rows are written again in place of its old rows"""
         check = extension_check(filename, '.csv')
         if directory:
             file = join(directory, check)
         else:
             file = join(getcwd(), check)
 
+        if incremental:
+            self._table_to_csv_incremental(file)
+            return
+
         if isfile(file):
             allow = 'a'
             start = 1
@@ -211,125 +467,210 @@ class Stand(object):
                 csv_write.writerow(i)
 
     def table_to_excel(self, filename: str, directory: str = None):
-        """Creates or appends an Excel file with tree data from self.table_data"""
+        """Creates or appends an Excel file with tree data from self.table_data, the workbook is written with openpyxl's write-only
+           streaming and when appending the existing rows are streamed through from a read-only workbook along with each sheet's
+           column widths, merged cells, freeze panes and sheet properties"""
         check = extension_check(filename, '.xlsx')
         if directory:
             file = join(directory, check)
         else:
             file = join(getcwd(), check)
 
+        wb = Workbook(write_only=True)
         if isfile(file):
-            wb = load_workbook(file)
-            ws = wb.active
-            for i in self.table_data[1:]:
-                ws.append(i)
-            wb.save(file)
+            old_wb = load_workbook(file, read_only=True)
+            for sheet in old_wb.sheetnames:
+                ws = wb.create_sheet(sheet)
+                copy_excel_rows(old_wb[sheet], ws, file)
+                if sheet == old_wb.active.title:
+                    for i in self.table_data[1:]:
+                        ws.append(i)
+            old_wb.close()
         else:
-            wb = Workbook()
-            ws = wb.active
+            ws = wb.create_sheet()
             for i in self.table_data:
                 ws.append(i)
-            wb.save(file)
-
-    def _update_metrics(self, metric: str):
-        """Updates stand metrics based on the metric entered in the argument, used internally"""
-        metric_list = [plot[metric] for plot in self.plots]
-        stats = self._get_stats(metric_list)
-        setattr(self, metric, stats['mean'])
-        setattr(self, f'{metric}_stats', stats)
-
-    def _update_species(self, plot):
-        """Re-runs stand conditions calculations and statistics, used internally"""
-        update_after = ['qmd', 'vbar', 'avg_hgt', 'hdr']
-        if self.plot_count == 0:
-            return
+        save_excel_stream(wb, file)
+
+    def log_table_to_csv(self, filename: str, directory: str = None):
+        """Creates a CSV file of the stand's logs in long format, one row per log with the columns stand, plot, tree, log,
+           stem_height, length, grade, defect, top_dib, bf and cf. The rows are written in chunks from the stand's columns"""
+        check = extension_check(filename, '.csv')
+        if directory:
+            file = join(directory, check)
         else:
-            for species in plot.species:
-                if species not in self.species_gross:
-                    for attr in self.attrs:
-                        if attr == '_gross':
-                            getattr(self, f'species{attr}')[species] = {met: [] for met in self.metrics}
-                        else:
-                            getattr(self, f'species{attr}')[species] = {met: 0 for met in self.metrics}
-                for key in plot.species[species]:
-                    if key not in update_after:
-                        self.species_gross[species][key].append(plot.species[species][key])
-            for species in self.species_gross:
-                for key in self.species_gross[species]:
-                    if key not in update_after:
-                        data = self.species_gross[species][key]
-                        if len(data) < self.plot_count:
-                            data += ([0] * (self.plot_count - len(data)))
-                        stats = self._get_stats(data)
-                        self.species[species][key] = stats['mean']
-                        self.species_stats[species][key] = stats
-                self.species[species]['qmd'] = math.sqrt((self.species[species]['ba_ac'] / self.species[species]['tpa']) / 0.005454)
-                self.species[species]['vbar'] = self.species[species]['bf_ac'] / self.species[species]['ba_ac']
-                if species == 'totals_all':
-                    self.species[species]['avg_hgt'] = mean([p.avg_hgt for p in self.plots])
-                    self.species[species]['hdr'] = mean([p.hdr for p in self.plots])
-                else:
-                    trees = []
-                    for p in self.plots:
-                        for t in p.trees:
-                            trees.append(t)
-                    self.species[species]['avg_hgt'] = mean([t.height for t in trees if t.species == species])
-                    self.species[species]['hdr'] = mean([t.hdr for t in trees if t.species == species])
-
-    def _update_logs(self, plot):
-        """Re-runs stand logs calculations, used internally"""
+            file = join(getcwd(), check)
+        log_table_to_csv(self, file)
+
+    def log_table_to_parquet(self, filename: str, directory: str = None, file_format: str = 'parquet'):
+        """Creates a Parquet file (or an Arrow IPC file if file_format is 'arrow') of the stand's logs in long format with
+           typed columns, see Stand.log_table_to_csv for the columns. Requires pyarrow"""
+        check = extension_check(filename, '.parquet' if file_format == 'parquet' else '.arrow')
+        if directory:
+            file = join(directory, check)
+        else:
+            file = join(getcwd(), check)
+        log_table_to_arrow(self, file, file_format)
+
+    def _update_input_hash(self, sheet_hash):
+        """Combines the input hash of an imported cruise sheet (see treetopper._utils.get_input_hash) with the stand's input hash,
+           used internally"""
+        if self.input_hash is None:
+            self.input_hash = sheet_hash
+        else:
+            self.input_hash = sha256(f'{self.input_hash}|{sheet_hash}'.encode()).hexdigest()
+
+    def _update_stand(self):
+        """Re-runs the stand calculations, statistics and summaries from the stand's aggregate, used internally"""
+        with phase('aggregation'):
+            self._update_calculations()
+        with phase('summaries'):
+            self._update_summaries()
+
+    def _update_calculations(self):
+        """Re-runs the stand calculations and statistics from the stand's aggregate, used internally"""
+        self._table_data = None
+        self._columns = None
+        self._diameter_table = None
+        self._species_gross = None
+
+        final = self.aggregate.finalize(*self._get_species_order())
+        self._logs = final.pop('logs')
+        self._logs_gross = False
+        for key in final:
+            setattr(self, key, final[key])
+
+    def _get_species_order(self):
+        """Returns the species of the stand's species and logs dictionaries in the order they are first found within the stand's
+           plots, the same order as adding the plots one by one, used internally"""
+        species_order = {}
+        log_order = {}
+        for plot in self.plots:
+            species_order.update(dict.fromkeys(plot.species))
+            log_order.update(dict.fromkeys(plot.logs))
+        return list(species_order), list(log_order)
+
+    def _update_summaries(self):
+        """Re-builds the stand, log and statistics summaries from the stand calculations, used internally"""
         if self.plot_count == 0:
-            return
+            self.summary_stand = []
+            self.summary_logs = {}
+            self.summary_stats = []
+        else:
+            self.summary_stand = self._update_summary_stand()
+            self.summary_logs = self._update_summary_logs()
+            self.summary_stats = self._update_summary_stats()
+
+    def _table_to_csv_incremental(self, file: str):
+        """Appends the trees of the stand that are not in the CSV file's watermark and updates the watermark, if the file
+           exists without a watermark the written trees are read from the file's stand, plot and tree columns, used internally.
+
+           The watermark keeps the tree count and a digest of the written trees of each of the stand's plots in order. If the
+           written plots no longer match the stand's plots (a plot was removed or replaced) the stand's rows are dropped from the
+           file and written again, and if the new rows have more logs than the header the header is widened"""
+        watermark_file = f'{file}.watermark.json'
+        if not isfile(file):
+            watermark = {'columns': 0, 'stands': {}}
+        elif isfile(watermark_file):
+            with open(watermark_file, 'r') as f:
+                watermark = json.load(f)
+        else:
+            watermark = self._get_csv_watermark(file)
+
+        written = watermark['stands'].get(self.name, [])
+        digests = []
+        stale = len(written) > len(self.plots)
+        for i, plot in enumerate(self.plots):
+            digests.append(self._get_csv_plot_digest([[tree.species, tree.dbh, tree.height] for tree in plot.trees]))
+            if i < len(written) and not stale:
+                count, digest = written[i]
+                trees = [[tree.species, tree.dbh, tree.height] for tree in plot.trees[:count]]
+                stale = len(trees) < count or self._get_csv_plot_digest(trees) != digest
+        if stale:
+            written = []
+
+        rows = []
+        max_logs = 0
+        for i, plot in enumerate(self.plots):
+            start = written[i][0] if i < len(written) else 0
+            for j, tree in enumerate(plot.trees[start:], start):
+                rows.append(self._get_table_row(i + 1, j + 1, tree))
+                max_logs = max(max_logs, len(tree.logs))
+        watermark['stands'][self.name] = [[len(plot.trees), digest] for plot, digest in zip(self.plots, digests)]
+
+        if not isfile(file):
+            heads = self._get_table_heads(max_logs)
+            watermark['columns'] = len(heads)
+            rows.insert(0, heads)
         else:
-            subs = ['lpa', 'bf_ac', 'cf_ac']
-            for species in plot.logs:
-                if species not in self.logs:
-                    self.logs[species] = {}
-                for grade in plot.logs[species]:
-                    if grade not in self.logs[species]:
-                        self.logs[species][grade] = {rng: {sub: {'gross': [], 'mean': 0} for sub in subs} for rng in LOG_LENGTHS}
-                        self.logs[species][grade]['totals_by_grade'] = {sub: {'gross': [], 'mean': 0} for sub in subs}
-                    for rng in plot.logs[species][grade]:
-                        if rng != 'display':
-                            for sub in subs:
-                                self.logs[species][grade][rng][sub]['gross'].append(plot.logs[species][grade][rng][sub])
-            for species in self.logs:
-                for grade in self.logs[species]:
-                    for rng in self.logs[species][grade]:
-                        for sub in subs:
-                            gross = self.logs[species][grade][rng][sub]['gross']
-                            if len(gross) < self.plot_count:
-                                gross += ([0] * (self.plot_count - len(gross)))
-                            self.logs[species][grade][rng][sub]['mean'] = mean(gross)
+            # The header has four columns for each log after the first, so the file's log count is read from its width
+            heads = self._get_table_heads(max(max_logs, (watermark['columns'] - 6) // 4))
+            if stale or len(heads) > watermark['columns']:
+                watermark['columns'] = len(heads)
+                self._rewrite_csv(file, heads, stale)
+        for row in rows:
+            if len(row) < watermark['columns']:
+                row += ['' for _ in range(watermark['columns'] - len(row))]
+
+        with open(file, 'a', newline='', buffering=1 << 20) as csv_file:
+            writer(csv_file, dialect=excel).writerows(rows)
+
+        # The watermark is replaced once the rows are written, an interrupted write is not recorded
+        with open(f'{watermark_file}.tmp', 'w') as f:
+            json.dump(watermark, f)
+        replace(f'{watermark_file}.tmp', watermark_file)
+
+    def _rewrite_csv(self, file: str, heads: list, drop_stand: bool):
+        """Streams the CSV file through a temporary file with the new header, padding the rows to the header's width and
+           leaving out the stand's rows if drop_stand is True, used internally"""
+        with open(file, 'r', newline='') as csv_file, open(f'{file}.tmp', 'w', newline='', buffering=1 << 20) as temp_file:
+            rows = reader(csv_file, dialect=excel)
+            csv_write = writer(temp_file, dialect=excel)
+            next(rows, None)
+            csv_write.writerow(heads)
+            for row in rows:
+                if drop_stand and row and row[0] == self.name:
+                    continue
+                csv_write.writerow(row + ['' for _ in range(len(heads) - len(row))])
+        replace(f'{file}.tmp', file)
+
+    @staticmethod
+    def _get_csv_plot_digest(trees: list):
+        """Returns the sha256 hex digest of the species, dbh and height of a plot's written trees, the values are compared as
+           they are written to the CSV file, used internally"""
+        return sha256('\n'.join('|'.join(str(val) for val in tree) for tree in trees).encode()).hexdigest()
+
+    @classmethod
+    def _get_csv_watermark(cls, file: str):
+        """Returns the watermark of a CSV file that was written without one, from the file's stand, plot and tree columns,
+           used internally"""
+        watermark = {'columns': 0, 'stands': {}}
+        plots = {}
+        with open(file, 'r', newline='') as csv_file:
+            rows = reader(csv_file, dialect=excel)
+            watermark['columns'] = len(next(rows, []))
+            for row in rows:
+                if len(row) < 6:
+                    continue
+                plots.setdefault(row[0], {}).setdefault(int(row[1]), []).append(row[3:6])
+        for stand, stand_plots in plots.items():
+            # Plots without trees are not in the file, they are recorded as written with no trees
+            watermark['stands'][stand] = [[len(stand_plots.get(i, [])), cls._get_csv_plot_digest(stand_plots.get(i, []))]
+                                          for i in range(1, max(stand_plots) + 1)]
+        return watermark
 
     def _update_table_data(self):
         """Converts stand data to plot/tree inventory data table layout, used internally"""
-        heads = ['Stand', 'Plot Number', 'Tree Number', 'Species', 'DBH', 'Height',
-                 'Stump Height', 'Log 1 Length', 'Log 1 Grade', 'Log 1 Defect', 'Between Logs Feet']
+        if not self.plots:
+            return []
         master = []
         max_logs = []
         for i, plot in enumerate(self.plots):
             for j, tree in enumerate(plot.trees):
-                temp = [self.name, i + 1, j + 1]
-                for key in ['species', 'dbh', 'height']:
-                    temp.append(tree[key])
-                len_logs = len(tree.logs)
-                max_logs.append(len_logs)
-                for k, lnum in enumerate(tree.logs):
-                    log = tree.logs[lnum]
-                    if lnum == 1:
-                        temp.append(log.stem_height - log.length - 1)
-                    for lkey in ['length', 'grade', 'defect']:
-                        temp.append(log[lkey])
-                    if k < len(tree.logs) - 1:
-                        between = tree.logs[lnum+1].stem_height - log.stem_height - tree.logs[lnum+1].length - 1
-                        if between < 0:
-                            temp.append(0)
-                        else:
-                            temp.append(between)
-                master.append(temp)
+                master.append(self._get_table_row(i + 1, j + 1, tree))
+                max_logs.append(len(tree.logs))
 
-        heads += add_logs_to_table_heads(max(max_logs))
+        heads = self._get_table_heads(max(max_logs))
         len_heads = len(heads)
         for i in master:
             len_i = len(i)
@@ -338,6 +679,32 @@ class Stand(object):
         master.insert(0, heads)
         return master
 
+    def _get_table_row(self, plot_number: int, tree_number: int, tree):
+        """Returns the plot/tree inventory data table row of a tree, used internally"""
+        temp = [self.name, plot_number, tree_number]
+        for key in ['species', 'dbh', 'height']:
+            temp.append(tree[key])
+        for k, lnum in enumerate(tree.logs):
+            log = tree.logs[lnum]
+            if lnum == 1:
+                temp.append(log.stem_height - log.length - 1)
+            for lkey in ['length', 'grade', 'defect']:
+                temp.append(log[lkey])
+            if k < len(tree.logs) - 1:
+                between = tree.logs[lnum+1].stem_height - log.stem_height - tree.logs[lnum+1].length - 1
+                if between < 0:
+                    temp.append(0)
+                else:
+                    temp.append(between)
+        return temp
+
+    @staticmethod
+    def _get_table_heads(max_logs: int):
+        """Returns the plot/tree inventory data table headers for the max number of logs of the trees, used internally"""
+        heads = ['Stand', 'Plot Number', 'Tree Number', 'Species', 'DBH', 'Height',
+                 'Stump Height', 'Log 1 Length', 'Log 1 Grade', 'Log 1 Defect', 'Between Logs Feet']
+        return heads + add_logs_to_table_heads(max_logs)
+
     def _update_summary_stand(self):
         """Updates the current stand conditions list of stand.summary_stand, used internally"""
         heads = ['SPECIES'] + [head[1] for head in SORTED_HEADS]
@@ -362,7 +729,7 @@ class Stand(object):
             metric_key = table[0]
             key = table[1]
             table_data[key] = {}
-            for species in self.logs:
+            for species in self._logs:
                 if species == 'totals_all':
                     show = 'TOTALS'
                 else:
@@ -371,8 +738,8 @@ class Stand(object):
                 table_data[key][show] = [['LOG GRADES'] + [rng.upper() for rng in LOG_LENGTHS] + ['TOTALS']]
 
                 grade_sort = []
-                for grade in self.logs[species]:
-                    values = [self.logs[species][grade][rng][metric_key]['mean'] for rng in self.logs[species][grade]]
+                for grade in self._logs[species]:
+                    values = [self._logs[species][grade][rng][metric_key]['mean'] for rng in self._logs[species][grade]]
                     if sum(values) > 0:
                         if grade == 'totals_by_length':
                             col_text = 'TOTALS'
@@ -426,28 +793,6 @@ class Stand(object):
                 tables[show].append(temp)
         return reorder_dict(tables)
 
-    def _get_stats(self, data):
-        """Runs the statistical calculations on a set of the stand conditions data, returns an updated sub dict, used internally"""
-        m = mean(data)
-        if len(data) >= 2:
-            std = stdev(data)
-            ste = std / math.sqrt(self.plot_count)
-            low_avg_high = [max(round(m - ste, 1), 0), m, m + ste]
-            d = {'mean': m,
-                 'variance': variance(data),
-                 'stdev': std,
-                 'stderr': ste,
-                 'stderr_pct': (ste / m) * 100,
-                 'low_avg_high': low_avg_high}
-        else:
-            d = {'mean': m,
-                 'variance': 'Not enough data',
-                 'stdev': 'Not enough data',
-                 'stderr': 'Not enough data',
-                 'stderr_pct': 'Not enough data',
-                 'low_avg_high': 'Not enough data'}
-        return d
-
     def _compile_report_text(self):
         """Compiles the console-formatted report of all stand data and stats, used internally"""
         n = '\n' * 4
@@ -463,6 +808,13 @@ class Stand(object):
         pdf.compile_stand_report(self)
         return pdf
 
+    def _compile_stand_stock_pdf_report(self):
+        pdf = PDF()
+        pdf.alias_nb_pages()
+        pdf.add_page()
+        pdf.compile_stand_stock_report(self)
+        return pdf
+
 
 
 if __name__ == '__main__':
@@ -578,8 +930,7 @@ if __name__ == '__main__':
         for trees in tree_data:
             plot = Plot()
             for tree, logs in trees:
-                for log in logs:
-                    tree.add_log(*log)
+                tree.add_logs(logs)
                 plot.add_tree(tree)
             stand.add_plot(plot)
 
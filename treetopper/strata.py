@@ -0,0 +1,197 @@
+import numpy as np
+from os import (
+    startfile,
+    getcwd
+)
+from os.path import join
+from io import BytesIO
+from treetopper._exceptions import StrataError
+from treetopper._print_console import print_strata
+from treetopper._print_pdf import PDF
+from treetopper._utils import (
+    format_comma,
+    format_pct,
+    extension_check
+)
+
+
+class Strata(object):
+    """The Strata Class combines several Stand Classes (the strata) into one stratified estimate, such as a timber sale made up of
+       stands with different acreages. Every stand added to the Strata needs to have its acres set.
+
+       The Strata Class does not copy or re-cruise the member stands, it reads the per-plot metrics of each stand into arrays and
+       computes the acreage-weighted stratified means, the totals over all acres, and the stratified variance in one pass:
+
+       mean = sum(W * plot mean) where W is the stand's acres divided by the total acres
+       variance of the mean = sum(W^2 * plot variance / plot count)
+
+       Standard errors and standard error percents are calculated from the stratified variance, and the totals and their standard
+       errors are the per acre values multiplied by the total acres. The stratified variance needs the plot variance of every stand,
+       so if any stand has only one plot the standard errors of the whole strata are "Not enough data", like a one plot Stand.
+
+       The stands are reported by name, so each stand within the Strata needs a different name"""
+
+    def __init__(self, name: str, stands: list = None):
+        self.name = name.upper()
+        self.stands = []
+        self.stand_count = 0
+        self.acres = 0
+
+        self.tpa = 0
+        self.ba_ac = 0
+        self.rd_ac = 0
+        self.bf_ac = 0
+        self.cf_ac = 0
+
+        self.tpa_stats = {}
+        self.ba_ac_stats = {}
+        self.rd_ac_stats = {}
+        self.bf_ac_stats = {}
+        self.cf_ac_stats = {}
+
+        self.stand_data = {}
+        self.summary_strata = {}
+
+        self.metrics = ['tpa', 'ba_ac', 'rd_ac', 'bf_ac', 'cf_ac']
+
+        if stands:
+            for stand in stands:
+                self._check_stand(stand)
+                self.stands.append(stand)
+                self.stand_count += 1
+            self._update_strata()
+
+    def __getitem__(self, attribute: str):
+        return self.__dict__[attribute]
+
+    def add_stand(self, stand):
+        """Adds a stand to the strata's stands list and re-runs the stratified calculations and statistics.
+           stand argument needs to be a Stand Class with its acres set"""
+        self._check_stand(stand)
+        self.stands.append(stand)
+        self.stand_count += 1
+        self._update_strata()
+
+    def get_console_report_text(self):
+        """Returns a console-formatted string of the strata report"""
+        return print_strata(self.summary_strata)
+
+    def console_report(self):
+        """Prints a console-formatted string of the strata report"""
+        print(print_strata(self.summary_strata))
+
+    def get_pdf_report_bytes_io(self):
+        pdf = self._compile_pdf_report()
+        return BytesIO(pdf.output(dest='S').encode('latin-1'))
+
+    def pdf_report(self, filename: str, directory: str = None, start_file_upon_creation: bool = False):
+        """Exports a pdf of the strata report to a user specified directory or if directory is None, to the current working directory"""
+        check = extension_check(filename, '.pdf')
+        if directory:
+            file = join(directory, check)
+        else:
+            file = join(getcwd(), check)
+        pdf = self._compile_pdf_report()
+        pdf.output(file, 'F')
+
+        if start_file_upon_creation:
+            startfile(file)
+
+    def _update_strata(self):
+        """Runs the stratified calculations over the plot arrays of all stands in one pass, used internally"""
+        plot_counts = np.array([stand.plot_count for stand in self.stands])
+        acres = np.array([stand.acres for stand in self.stands], dtype=float)
+        stratum = np.repeat(np.arange(self.stand_count), plot_counts)
+        values = np.array([[plot[met] for met in self.metrics] for stand in self.stands for plot in stand.plots], dtype=float)
+
+        self.acres = acres.sum()
+        weights = acres / self.acres
+
+        sums = np.stack([np.bincount(stratum, weights=values[:, i], minlength=self.stand_count) for i in range(len(self.metrics))], axis=1)
+        means = sums / plot_counts[:, None]
+        deviations = (values - means[stratum]) ** 2
+        ss = np.stack([np.bincount(stratum, weights=deviations[:, i], minlength=self.stand_count) for i in range(len(self.metrics))], axis=1)
+
+        strata_means = weights @ means
+        enough_data = bool((plot_counts >= 2).all())
+        if enough_data:
+            variances = ss / (plot_counts[:, None] - 1)
+            strata_variances = (weights ** 2) @ (variances / plot_counts[:, None])
+        else:
+            strata_variances = None
+
+        for i, met in enumerate(self.metrics):
+            m = strata_means[i]
+            setattr(self, met, m)
+            if enough_data:
+                stats = self._get_stats(m, strata_variances[i])
+            else:
+                stats = self._get_stats(m, None)
+            setattr(self, f'{met}_stats', stats)
+
+        self.stand_data = {}
+        for i, stand in enumerate(self.stands):
+            self.stand_data[stand.name] = {'acres': acres[i], 'plots': int(plot_counts[i]), 'weight': weights[i]}
+            self.stand_data[stand.name].update({met: means[i, j] for j, met in enumerate(self.metrics)})
+
+        self.summary_strata = self._update_summary_strata()
+
+    def _get_stats(self, m, var):
+        """Returns the stratified statistics sub dict for a metric, used internally"""
+        if var is None:
+            return {'mean': m,
+                    'total': m * self.acres,
+                    'variance': 'Not enough data',
+                    'stderr': 'Not enough data',
+                    'stderr_pct': 'Not enough data',
+                    'total_stderr': 'Not enough data',
+                    'low_avg_high': 'Not enough data'}
+        else:
+            ste = float(np.sqrt(var))
+            return {'mean': m,
+                    'total': m * self.acres,
+                    'variance': var,
+                    'stderr': ste,
+                    'stderr_pct': (ste / m) * 100 if m else 0,
+                    'total_stderr': ste * self.acres,
+                    'low_avg_high': [max(round(m - ste, 1), 0), m, m + ste]}
+
+    def _update_summary_strata(self):
+        """Updates the strata summary dict, which holds a data-table of the member stands and a data-table of the
+           stratified statistics, used internally"""
+        heads = {'tpa': 'TPA', 'ba_ac': 'BASAL AREA', 'rd_ac': 'RD', 'bf_ac': 'BOARD FEET', 'cf_ac': 'CUBIC FEET'}
+        stands = [['STAND', 'ACRES', 'PLOTS', 'WEIGHT'] + [heads[met] for met in self.metrics]]
+        for name in self.stand_data:
+            data = self.stand_data[name]
+            stands.append([name, format_comma(data['acres']), str(data['plots']), format_pct(data['weight'])] +
+                          [format_comma(data[met]) for met in self.metrics])
+
+        stats = [['METRIC', 'MEAN', 'TOTAL', 'STDERR', 'STDERR %', 'TOTAL STDERR', 'LOW', 'AVERAGE', 'HIGH']]
+        for met in self.metrics:
+            s = self[f'{met}_stats']
+            temp = [heads[met], format_comma(s['mean']), format_comma(s['total'])]
+            if s['stderr'] == 'Not enough data':
+                temp += ['Not enough data'] + ['-' for _ in range(5)]
+            else:
+                temp += [format_comma(s['stderr']), format_pct(s['stderr_pct']), format_comma(s['total_stderr'])]
+                temp += [format_comma(i) for i in s['low_avg_high']]
+            stats.append(temp)
+
+        return {f'STANDS ({format_comma(self.acres)} ACRES)': stands, 'STRATIFIED STATISTICS': stats}
+
+    def _compile_pdf_report(self):
+        pdf = PDF()
+        pdf.alias_nb_pages()
+        pdf.add_page()
+        pdf.compile_strata_report(self)
+        return pdf
+
+    def _check_stand(self, stand):
+        """Checks that the stand can be stratified, a stand needs positive acres, at least one plot and a name that is not
+           already within the strata, used internally"""
+        if not stand.acres or stand.acres <= 0:
+            raise StrataError(stand.name, f'Stand acres must be greater than 0, current acres: {stand.acres}')
+        if stand.plot_count == 0:
+            raise StrataError(stand.name, 'Stand has no plots')
+        if stand.name in [member.name for member in self.stands]:
+            raise StrataError(stand.name, 'A stand with the same name is already within the Strata')
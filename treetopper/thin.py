@@ -1,17 +1,23 @@
 import math
+import numpy as np
+from copy import copy
+from itertools import product
 from os import startfile, getcwd
 from os.path import join
-from copy import deepcopy
-from statistics import mean
 from io import BytesIO
 
 from treetopper._exceptions import TargetDensityError
 from treetopper._constants import SORTED_HEADS
-from treetopper._print_console import print_thin
+from treetopper._print_console import (
+    print_thin,
+    print_thin_sweep
+)
 from treetopper._print_pdf import PDF
 from treetopper._utils import (
     extension_check,
-    format_comma
+    format_comma,
+    format_pct,
+    mean_of_total
 )
 
 NOT_FULL_THIN_MESSAGE = """
@@ -23,6 +29,10 @@ NOT_FULL_THIN_MESSAGE = """
    \tMAX DBH: {max_dbh}
 """
 
+# HARVEST RATIOS THIS CLOSE BELOW ZERO ARE THE FLOAT ROUNDING OF A TARGET THAT REMOVES ALL OF THE CELLS THAT CAN BE CUT (SUCH AS
+# THE RESIDUAL TARGET OF ThinOptimizer.to_thin), THEY ARE A FULL THIN WITH A RATIO OF ZERO
+RATIO_TOLERANCE = 1e-9
+
 SUCCESS_MESSAGE = """
 TARGET DENSITY OF {target} {thin_param} ACHIEVED
 THINNING PARAMETERS:
@@ -35,19 +45,23 @@ THINNING PARAMETERS:
 class Thin(object):
     """The Thin Class is the parent class of the three thinning child classes: ThinTPA, ThinBA, and ThinRD.
 
-       The thinning classes create a deepcopy of the stand class so as not to disrupt any of the tree information.
+       The thinning classes do not modify the stand or its trees, they start from the stand's cached stand and stock table
+       (stand.diameter_table), which is shared by every thinning of the stand until the stand's plots change.
 
-       The thinning classes start to thin the stand by getting a dictionary of whole-number diameters based on species,
-       these contain per-diameter metrics such as tpa, ba_ac, rd_ac, bf_ac..., and these metrics, other than tpa,
-       also have a corresponding metric per tree value, by dividing the per-diameter metric by the per-diameter tpa.
+       The cells of the stand and stock table (one per species and whole-number diameter) are held as arrays of the per-diameter
+       metrics: tpa, ba_ac, rd_ac, bf_ac, cf_ac, and these metrics, other than tpa, also have a corresponding metric per tree value,
+       by dividing the per-diameter metric by the per-diameter tpa.
 
        The thinnings then calculate a harvest-ratio to lower the stand's density to the target density, in accordance to the
        species and diameter limitations (if any). The harvest ratio is used to calculate the removal and residual per-diameter TPAs,
        which are then used to calculate the other removal and residual per-diameter metrics by multiplying the respective TPAs by the
-       per-diameter metric per tree values"""
+       per-diameter metric per tree values.
+
+       The conditions (current, residual and removal) are totaled by species with weighted array sums over the cells, so the
+       thinning reports are linear in the number of cells rather than re-walking the trees for each condition"""
 
     def __init__(self, stand, target_density: int, species_to_cut: list, min_dbh_to_cut: int, max_dbh_to_cut: int):
-        self.stand = deepcopy(stand)
+        self.stand = stand
         self.target = target_density
         self.min_dbh = min_dbh_to_cut
         self.max_dbh = max_dbh_to_cut
@@ -61,13 +75,17 @@ class Thin(object):
         self.full_thin = [True, None, None]
 
         self.keys = ['tpa', 'ba_ac', 'rd_ac', 'bf_ac', 'cf_ac']
-        self.adds = [['ba_ac', 'ba_tree'], ['rd_ac', 'rd_tree'], ['bf_ac', 'bf_tree'], ['cf_ac', 'cf_tree']]
         self.conditions = ['current_', 'residual_', 'removal_']
 
-        for key in self.keys:
-            setattr(self, f'{self.conditions[0]}{key}', 0)
+        # Per-cell condition arrays, rows are the cells of the stand and stock table and columns are self.keys
+        self.table = stand.diameter_table
+        self.current = np.stack([self.table[key] for key in self.keys], axis=1)
+        self.residual = self.current.copy()
+        self.removal = np.zeros_like(self.current)
+        self.residual_ratio = np.ones(len(self.current))
 
-        self.trees = self._aggregate_trees()
+        for i, key in enumerate(self.keys):
+            setattr(self, f'{self.conditions[0]}{key}', float(self.current[:, i].sum()))
 
     def __getitem__(self, attribute: str):
         return self.__dict__[attribute]
@@ -97,113 +115,119 @@ class Thin(object):
         if start_file_upon_creation:
             startfile(file)
 
-    def _aggregate_trees(self):
-        """Returns the compiled whole-number diameters dictionary separated by species"""
-        cur = self.conditions[0]
-        tree_dbh_data = {}
-        for plot in self.stand.plots:
-            for tree in plot.trees:
-                d = int(tree.dbh)
-                if tree.species not in tree_dbh_data:
-                    tree_dbh_data[tree.species] = {}
-                if d not in tree_dbh_data[tree.species]:
-                    tree_dbh_data[tree.species][d] = {}
-                    for condition in self.conditions:
-                        tree_dbh_data[tree.species][d][condition] = {key: 0 for key in self.keys}
-                    tree_dbh_data[tree.species][d].update({'trees': []})
-                for key in self.keys:
-                    tree_dbh_data[tree.species][d][cur][key] += tree[key] / self.stand.plot_count
-                    setattr(self, f'{cur}{key}', getattr(self, f'{cur}{key}') + (tree[key] / self.stand.plot_count))
-                tree_dbh_data[tree.species][d]['trees'].append(tree)
-
-        for spp in tree_dbh_data:
-            for d in tree_dbh_data[spp]:
-                for add in self.adds:
-                    tree_dbh_data[spp][d][cur][add[1]] = tree_dbh_data[spp][d][cur][add[0]] / tree_dbh_data[spp][d][cur]['tpa']
-        return tree_dbh_data
+    def residual_stand(self, name: str = None):
+        """Returns a new Stand Class of the residual trees, the stand can be thinned again or linked to FVS.
 
-    def _thin_to_target(self, target_metric):
-        """Calculates the harvest ratio to produce the target density and then modifies the dictionary
-           self.trees (which was created by self.aggregate_trees()) to the correct removal and residual values"""
-        cur, res, rem = self.conditions
+           The trees are not re-cruised, each thinned tree is a copy of the stand's tree (and its logs) with the trees per acre and
+           the per acre metrics of the tree and its logs scaled by the residual ratio of the tree's species and diameter, trees that
+           are not thinned are shared with the stand. Trees that are completely removed are left out, the plots are all kept (even
+           if every tree was removed) so the per acre values of the residual stand match the residual conditions. If name is None,
+           the residual stand has the same name as the stand"""
+        cells = {(spp, dbh): i for i, (spp, dbh) in enumerate(zip(self.table.species.tolist(), self.table.dbh.tolist()))}
+        ratios = self.residual_ratio.tolist()
 
+        residual = type(self.stand)(name if name else self.stand.name, self.stand.plot_factor, acres=self.stand.acres)
+        residual.inv_date = self.stand.inv_date
+        plots = []
+        for plot in self.stand.plots:
+            residual_plot = type(plot)()
+            for tree in plot.trees:
+                ratio = ratios[cells[(tree.species, int(tree.dbh))]]
+                if ratio > 0:
+                    residual_plot.add_tree(self._scale_tree(tree, ratio))
+            plots.append(residual_plot)
+        residual.add_plots(plots)
+        return residual
+
+    def _get_cut_cells(self):
+        """Returns a boolean array of the cells that are allowed to be cut by the species and diameter limitations"""
         if self.species == 'all':
-            species = [spp for spp in self.trees]
+            species_cut = np.full(len(self.table.species), True)
         else:
-            species = self.species
-        sums = []
-        for spp in self.trees:
-            if spp in species:
-                for d in self.trees[spp]:
-                    if self.min_dbh <= d <= self.max_dbh:
-                        sums.append(self.trees[spp][d][cur][target_metric])
-        s = sum(sums)
-        target_ratio = 1 - ((self[f'{cur}{target_metric}'] - self.target) / s)
-        if target_ratio < 0:
+            species_cut = np.isin(self.table.species, self.species)
+        return species_cut & (self.table.dbh >= self.min_dbh) & (self.table.dbh <= self.max_dbh)
+
+    def _thin_to_target(self, target_metric):
+        """Calculates the harvest ratio to produce the target density and then sets the per-cell residual and
+           removal arrays (self.residual and self.removal) to the correct values"""
+        cut = self._get_cut_cells()
+        s = float(self.current[cut, self.keys.index(target_metric)].sum())
+        target_ratio = 1 - ((self[f'current_{target_metric}'] - self.target) / s)
+        if target_ratio < -RATIO_TOLERANCE:
             ratio = 0
             self.full_thin = [False, s, target_metric]
         else:
-            ratio = target_ratio
+            ratio = max(target_ratio, 0)
             self.full_thin = [True, s, target_metric]
 
-        for spp in self.trees:
-            if spp in species:
-                for d in self.trees[spp]:
-                    if self.min_dbh <= d <= self.max_dbh:
-                        self.trees[spp][d][res]['tpa'] = ratio * self.trees[spp][d][cur]['tpa']
-                        self.trees[spp][d][rem]['tpa'] = (1 - ratio) * self.trees[spp][d][cur]['tpa']
-                        for condition in self.conditions[1:]:
-                            for add in self.adds:
-                                self.trees[spp][d][condition][add[0]] = self.trees[spp][d][cur][add[1]] * self.trees[spp][d][condition]['tpa']
-                    else:
-                        for add in self.adds:
-                            self.trees[spp][d][res][add[0]] = self.trees[spp][d][cur][add[0]]
-                        self.trees[spp][d][res]['tpa'] = self.trees[spp][d][cur]['tpa']
-            else:
-                for d in self.trees[spp]:
-                    for add in self.adds:
-                        self.trees[spp][d][res][add[0]] = self.trees[spp][d][cur][add[0]]
-                    self.trees[spp][d][res]['tpa'] = self.trees[spp][d][cur]['tpa']
+        self._set_conditions(np.where(cut, ratio, 1.0))
+
+    def _set_conditions(self, residual_ratio):
+        """Sets the per-cell residual and removal arrays from the per-cell ratio of the current tpa that is left standing,
+           cells with a ratio of 1 keep their current values, used internally"""
+        current_tpa = self.current[:, 0]
+        per_tree = self.current / current_tpa[:, None]
+        for condition, tpa in [['residual', residual_ratio * current_tpa], ['removal', (1 - residual_ratio) * current_tpa]]:
+            values = per_tree * tpa[:, None]
+            values[:, 0] = tpa
+            setattr(self, condition, values)
+        uncut = residual_ratio == 1
+        self.residual[uncut] = self.current[uncut]
+        self.removal[uncut] = 0
+        self.residual_ratio = residual_ratio
+
+    def _get_species_index(self):
+        """Returns an array of the index of each cell's species within the table's species list, used internally"""
+        counts = [np.count_nonzero(self.table.species == spp) for spp in self.table.species_list]
+        return np.repeat(np.arange(len(self.table.species_list)), counts)
+
+    def _get_condition_cells(self):
+        """Returns a dictionary of the condition to a boolean array of the cells whose trees are counted in the condition's
+           average height and hdr, used internally"""
+        table = self.table
+        spp_idx = self._get_species_index()
+
+        # The diameter bounds of each species, a species keeps all of its trees in the residual when the diameter limits cover it
+        spp_min = np.full(len(table.species_list), np.iinfo(np.int64).max)
+        spp_max = np.full(len(table.species_list), np.iinfo(np.int64).min)
+        np.minimum.at(spp_min, spp_idx, table.dbh)
+        np.maximum.at(spp_max, spp_idx, table.dbh)
+        covered = ((self.min_dbh <= spp_min) & (self.max_dbh >= spp_max))[spp_idx]
+
+        in_range = (table.dbh >= self.min_dbh) & (table.dbh <= self.max_dbh)
+        return {'current_': np.full(len(table.dbh), True), 'residual_': covered | ~in_range, 'removal_': in_range}
 
     def _get_species_conditions(self):
         """Returns an dictionary composed of the aggregate of the species totaled from the per-diameter values of the
-           resultant self.trees (modified from self.thin_to_target())"""
+           resultant condition arrays (set from self.thin_to_target())"""
+        table = self.table
+        spp_count = len(table.species_list)
+        spp_idx = self._get_species_index()
+        condition_cells = self._get_condition_cells()
+
         master = {}
-        for condition in self.conditions:
-            total_trees = []
-            master[condition] = {'totals_all': {key: 0 for key in self.keys}}
-            for spp in self.trees:
-                trees = []
-                master[condition][spp] = {key: 0 for key in self.keys}
-                for d in self.trees[spp]:
-                    for tree in self.trees[spp][d]['trees']:
-                        if condition == 'current_':
-                            trees.append(tree)
-                            total_trees.append(tree)
-                        elif condition == 'residual_':
-                            d_rng = [d for d in self.trees[spp]]
-                            min_ = min(d_rng)
-                            max_ = max(d_rng)
-                            if self.min_dbh <= min_ and self.max_dbh >= max_:
-                                trees.append(tree)
-                                total_trees.append(tree)
-                            else:
-                                if d < self.min_dbh or d > self.max_dbh:
-                                    trees.append(tree)
-                                    total_trees.append(tree)
-                        else:
-                            if self.min_dbh <= d <= self.max_dbh:
-                                trees.append(tree)
-                                total_trees.append(tree)
-                    for key in self.keys:
-                        master[condition][spp][key] += self.trees[spp][d][condition][key]
-                        master[condition]['totals_all'][key] += self.trees[spp][d][condition][key]
-
-                if master[condition][spp]['tpa'] > 0:
-                    self._update_species_conditions_dict(master[condition][spp], trees)
-                else:
-                    del master[condition][spp]
-            self._update_species_conditions_dict(master[condition]['totals_all'], total_trees)
+        for condition, values in zip(self.conditions, [self.current, self.residual, self.removal]):
+            sums = {}
+            totals = {}
+            for i, key in enumerate(self.keys):
+                sums[key] = np.bincount(spp_idx, weights=values[:, i], minlength=spp_count)
+                totals[key] = float(values[:, i].sum())
+            cells = condition_cells[condition]
+            # The tree counts and height sums are whole numbers, they are cast to Python numbers so the averages are the same
+            # as statistics.mean of the trees
+            trees = {sub: np.rint(np.bincount(spp_idx, weights=table[sub] * cells, minlength=spp_count)).astype(np.int64).tolist()
+                     for sub in ['trees', 'height']}
+            trees['hdr'] = np.bincount(spp_idx, weights=table['hdr'] * cells, minlength=spp_count).tolist()
+
+            master[condition] = {'totals_all': totals}
+            for j, spp in enumerate(table.species_list):
+                if sums['tpa'][j] > 0:
+                    master[condition][spp] = {key: float(sums[key][j]) for key in self.keys}
+                    self._update_species_conditions_dict(master[condition][spp], {'count': trees['trees'][j], 'height': trees['height'][j],
+                                                                                  'hdr': trees['hdr'][j]})
+            self._update_species_conditions_dict(master[condition]['totals_all'], {'count': sum(trees['trees']),
+                                                                                   'height': sum(trees['height']),
+                                                                                   'hdr': math.fsum(trees['hdr'])})
         return master
 
     def _get_summary_tables(self):
@@ -229,7 +253,7 @@ class Thin(object):
     def _get_message_params_report(self):
         """Returns the thinning parameters, formatted to be displayed in the console report or print report"""
         if self.species == 'all':
-            species = [spp for spp in self.trees]
+            species = self.table.species_list
         else:
             species = self.species
 
@@ -280,13 +304,35 @@ class Thin(object):
                                                     min_dbh=min_dbh, max_dbh=max_dbh)
         return report_message
 
+    @staticmethod
+    def _scale_tree(tree, ratio):
+        """Returns a copy of the tree and its logs with the per acre metrics scaled by the ratio, used internally"""
+        if ratio == 1:
+            return tree
+        scaled = copy(tree)
+        for key in ['tpa', 'ba_ac', 'rd_ac', 'bf_ac', 'cf_ac']:
+            scaled.__dict__[key] = tree[key] * ratio
+        scaled.logs = {}
+        for lnum in tree.logs:
+            log = copy(tree.logs[lnum])
+            log.tree = scaled
+            for key in ['lpa', 'bf_ac', 'cf_ac']:
+                log.__dict__[key] = log[key] * ratio
+            scaled.logs[lnum] = log
+        return scaled
+
     @staticmethod
     def _update_species_conditions_dict(master_condition_species, trees):
-        """Updates the species data dictionary being compiled in self._get_species_conditions(), used internally"""
+        """Updates the species data dictionary being compiled in self._get_species_conditions(), trees is a dictionary of the
+           tree count and the sums of the tree heights and hdrs, used internally"""
+        if master_condition_species['tpa'] == 0:
+            # Every tree of the condition has been removed
+            master_condition_species.update({'qmd': 0, 'vbar': 0, 'avg_hgt': 0, 'hdr': 0})
+            return
         master_condition_species.update({'qmd': math.sqrt((master_condition_species['ba_ac'] / master_condition_species['tpa']) / 0.005454)})
         master_condition_species.update({'vbar': master_condition_species['bf_ac'] / master_condition_species['ba_ac']})
-        master_condition_species.update({'avg_hgt': mean([tree.height for tree in trees])})
-        master_condition_species.update({'hdr': mean([tree.hdr for tree in trees])})
+        master_condition_species.update({'avg_hgt': mean_of_total(trees['height'], trees['count'])})
+        master_condition_species.update({'hdr': trees['hdr'] / trees['count']})
 
 
 class ThinTPA(Thin):
@@ -328,6 +374,387 @@ class ThinRD(Thin):
         self.report_message = self._get_report_message()
 
 
+class ThinPriority(Thin):
+    """The ThinPriority Class is the parent class of the priority thinning child classes: ThinFromBelow, ThinFromAbove and
+       ThinByScore. Rather than applying one harvest ratio to every cell (species and whole-number diameter) that can be cut,
+       the priority thinnings remove whole cells in priority order until the target density is reached, the last cell is
+       partially removed.
+
+       The cells that can be cut are sorted by their priority and the removal needed is found within the cumulative sum
+       of the target metric with a binary search, so a thinning is O(n log n) in the number of cells.
+
+       The target_metric argument is the thinning metric of the target density: 'tpa', 'ba_ac' or 'rd_ac'"""
+
+    def __init__(self, stand, target_density: int, target_metric: str, species_to_cut: list, min_dbh_to_cut: int, max_dbh_to_cut: int):
+        super(ThinPriority, self).__init__(stand, target_density, species_to_cut, min_dbh_to_cut, max_dbh_to_cut)
+        if target_metric not in ['tpa', 'ba_ac', 'rd_ac']:
+            raise ValueError(f"target_metric must be 'tpa', 'ba_ac' or 'rd_ac', not '{target_metric}'")
+        self.target_metric = target_metric
+
+    def _thin_by_priority(self, priority):
+        """Removes the cells that can be cut from the lowest priority value to the highest until the target density is reached,
+           and then sets the per-cell residual and removal arrays, used internally"""
+        cut = np.flatnonzero(self._get_cut_cells())
+        order = cut[np.argsort(priority[cut], kind='stable')]
+        values = self.current[order, self.keys.index(self.target_metric)]
+        cumulative = np.cumsum(values)
+
+        needed = self[f'current_{self.target_metric}'] - self.target
+        s = float(cumulative[-1]) if len(cumulative) else 0
+        residual_ratio = np.ones(len(self.current))
+        if needed > s:
+            residual_ratio[order] = 0
+            self.full_thin = [False, s, self.target_metric]
+        else:
+            # Cells before the one that reaches the needed removal are removed, that cell is partially removed
+            i = int(np.searchsorted(cumulative, needed))
+            residual_ratio[order[:i]] = 0
+            if i < len(order) and needed > 0:
+                removed = cumulative[i - 1] if i > 0 else 0
+                residual_ratio[order[i]] = 1 - ((needed - removed) / values[i])
+            self.full_thin = [True, s, self.target_metric]
+
+        self._set_conditions(residual_ratio)
+
+    def _get_condition_cells(self):
+        """Returns a dictionary of the condition to a boolean array of the cells whose trees are counted in the condition's
+           average height and hdr, the cells that have trees left in the condition, used internally"""
+        return {'current_': np.full(len(self.table.dbh), True), 'residual_': self.residual[:, 0] > 0, 'removal_': self.removal[:, 0] > 0}
+
+    def _run_thin(self, priority):
+        """Runs the thinning and the thinning reports from the per-cell priority, used internally"""
+        self._check_density()
+        self._thin_by_priority(priority)
+        self.species_data = self._get_species_conditions()
+        self.summary_thin = self._get_summary_tables()
+        self.report_message = self._get_report_message()
+
+
+class ThinFromBelow(ThinPriority):
+    """Thin from Below, the smallest diameters are removed first"""
+
+    def __init__(self, stand, target_density: int, target_metric: str = 'ba_ac', species_to_cut: list = 'all', min_dbh_to_cut: int = 0,
+                 max_dbh_to_cut: int = 999):
+        super(ThinFromBelow, self).__init__(stand, target_density, target_metric, species_to_cut, min_dbh_to_cut, max_dbh_to_cut)
+        self._run_thin(self.table.dbh)
+
+
+class ThinFromAbove(ThinPriority):
+    """Thin from Above, the largest diameters are removed first"""
+
+    def __init__(self, stand, target_density: int, target_metric: str = 'ba_ac', species_to_cut: list = 'all', min_dbh_to_cut: int = 0,
+                 max_dbh_to_cut: int = 999):
+        super(ThinFromAbove, self).__init__(stand, target_density, target_metric, species_to_cut, min_dbh_to_cut, max_dbh_to_cut)
+        self._run_thin(-self.table.dbh)
+
+
+class ThinByScore(ThinPriority):
+    """Thin by a user score, the score argument is a function of the species and whole-number diameter of the trees that returns
+       a number, the trees with the highest scores are removed first. For example, removing Red Alder before the other species
+       and then the smallest trees first:
+       ::
+            thin = ThinByScore(stand, 120, lambda species, dbh: (100 if species == 'RA' else 0) - dbh)"""
+
+    def __init__(self, stand, target_density: int, score, target_metric: str = 'ba_ac', species_to_cut: list = 'all',
+                 min_dbh_to_cut: int = 0, max_dbh_to_cut: int = 999):
+        super(ThinByScore, self).__init__(stand, target_density, target_metric, species_to_cut, min_dbh_to_cut, max_dbh_to_cut)
+        self.score = score
+        scores = np.array([score(str(spp), int(dbh)) for spp, dbh in zip(self.table.species, self.table.dbh)], dtype=float)
+        self._run_thin(-scores)
+
+
+class ThinSweep(object):
+    """The ThinSweep Class runs a grid of thinning prescriptions on a stand at once, every combination of the targets (by
+       thinning metric), species to cut and minimum and maximum diameters to cut is one scenario.
+
+       Each scenario is thinned the same way as the Thinning Classes (ThinTPA, ThinBA, and ThinRD), but rather than building a
+       Thin Class for each scenario, the removal fractions and the removal and residual conditions of every scenario are calculated
+       together with array maths over the cells of the stand's stand and stock table (stand.diameter_table).
+
+       The targets argument is a dictionary of the thinning metric ('tpa', 'ba_ac' or 'rd_ac') to a list of target densities,
+       species_to_cut is a list of species lists (or 'all'), and the diameters are lists of minimums and maximums.
+       Scenarios with a target above the stand's current density are skipped.
+
+       The results are a list of dictionaries, one per scenario, which can be ranked by any of their values:
+       ::
+            sweep = ThinSweep(stand, targets={'ba_ac': [80, 100, 120, 140]}, species_to_cut=['all', ['DF']], max_dbh_to_cut=[18, 999])
+            sweep.console_report()
+
+            best = sweep.rank('removal_bf_ac')[0]"""
+
+    def __init__(self, stand, targets: dict, species_to_cut: list = None, min_dbh_to_cut: list = None, max_dbh_to_cut: list = None):
+        self.stand = stand
+        self.targets = targets
+        self.species = species_to_cut if species_to_cut else ['all']
+        self.min_dbh = min_dbh_to_cut if min_dbh_to_cut else [0]
+        self.max_dbh = max_dbh_to_cut if max_dbh_to_cut else [999]
+
+        self.keys = ['tpa', 'ba_ac', 'rd_ac', 'bf_ac', 'cf_ac']
+        self.conditions = ['current_', 'residual_', 'removal_']
+
+        self.results = self._sweep()
+        self.summary_sweep = self._get_summary_table()
+
+    def __getitem__(self, attribute: str):
+        return self.__dict__[attribute]
+
+    def rank(self, by: str = 'removal_bf_ac', descending: bool = True):
+        """Returns the results list sorted by one of the result keys, such as 'removal_bf_ac' or 'residual_ba_ac'"""
+        return sorted(self.results, key=lambda x: x[by], reverse=descending)
+
+    def get_console_report_text(self):
+        """Returns a console-formatted string of the sweep results, ranked by the removal board feet per acre"""
+        return print_thin_sweep(self.summary_sweep)
+
+    def console_report(self):
+        """Prints a console-formatted string of the sweep results, ranked by the removal board feet per acre"""
+        print(print_thin_sweep(self.summary_sweep))
+
+    def _sweep(self):
+        """Calculates the removal and residual conditions of every scenario, returns the list of results, used internally"""
+        table = self.stand.diameter_table
+        current = np.stack([table[key] for key in self.keys], axis=1)
+        totals = current.sum(axis=0)
+
+        scenarios = []
+        for metric in self.targets:
+            for target, species, min_dbh, max_dbh in product(self.targets[metric], self.species, self.min_dbh, self.max_dbh):
+                if target <= totals[self.keys.index(metric)]:
+                    scenarios.append([metric, target, species, min_dbh, max_dbh])
+        if not scenarios:
+            return []
+
+        # Eligibility of each cell (columns) to be cut for each scenario (rows)
+        species_cut = np.array([np.full(len(table.species), True) if spp == 'all' else np.isin(table.species, spp)
+                                for _, _, spp, _, _ in scenarios])
+        min_dbh = np.array([sc[3] for sc in scenarios])
+        max_dbh = np.array([sc[4] for sc in scenarios])
+        mask = species_cut & (table.dbh >= min_dbh[:, None]) & (table.dbh <= max_dbh[:, None])
+
+        metric_idx = np.array([self.keys.index(sc[0]) for sc in scenarios])
+        targets = np.array([sc[1] for sc in scenarios], dtype=float)
+        available = (mask * current[:, metric_idx].T).sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            target_ratio = 1 - ((totals[metric_idx] - targets) / available)
+        full_thin = (target_ratio >= -RATIO_TOLERANCE) | (totals[metric_idx] == targets)
+        ratio = np.where(target_ratio >= 0, target_ratio, 0)
+        ratio = np.where(totals[metric_idx] == targets, 1, ratio)
+
+        removal = (mask * (1 - ratio)[:, None]) @ current
+        residual = totals - removal
+
+        results = []
+        for i, (metric, target, species, min_dbh, max_dbh) in enumerate(scenarios):
+            result = {'metric': metric, 'target': target, 'species': species, 'min_dbh': min_dbh, 'max_dbh': max_dbh,
+                      'full_thin': bool(full_thin[i]), 'removal_fraction': 1 - float(ratio[i])}
+            for condition, values in zip(self.conditions, [totals, residual[i], removal[i]]):
+                for j, key in enumerate(self.keys):
+                    result[f'{condition}{key}'] = float(values[j])
+                tpa = result[f'{condition}tpa']
+                result[f'{condition}qmd'] = math.sqrt((result[f'{condition}ba_ac'] / tpa) / 0.005454) if tpa > 0 else 0
+            results.append(result)
+        return results
+
+    def _get_summary_table(self):
+        """Returns a data-table of the sweep results ranked by the removal board feet per acre, used internally"""
+        heads = ['METRIC', 'TARGET', 'SPECIES', 'DBH RANGE', 'ACHIEVED', 'REMOVAL TPA', 'REMOVAL BA', 'REMOVAL BF', 'RESIDUAL TPA',
+                 'RESIDUAL BA']
+        table = [heads]
+        for result in self.rank('removal_bf_ac'):
+            species = 'ALL' if result['species'] == 'all' else ', '.join(result['species'])
+            min_dbh = '-' if result['min_dbh'] == 0 else result['min_dbh']
+            max_dbh = '-' if result['max_dbh'] == 999 else result['max_dbh']
+            table.append([result['metric'].replace('_', '/').upper(), format_comma(result['target']), species, f'{min_dbh} to {max_dbh}',
+                          'YES' if result['full_thin'] else 'NO'] +
+                         [format_comma(result[key]) for key in ['removal_tpa', 'removal_ba_ac', 'removal_bf_ac', 'residual_tpa',
+                                                                'residual_ba_ac']])
+        return table
+
+
+class ThinOptimizer(object):
+    """The ThinOptimizer Class searches the species to cut and the minimum and maximum diameters to cut for the thinning
+       prescription that removes the most of the objective metric (board feet per acre by default) while the residual stand
+       meets the constraints, a dictionary of the metric ('tpa', 'ba_ac', 'rd_ac', 'bf_ac' or 'cf_ac') to its minimum residual
+       value, such as {'rd_ac': 35, 'tpa': 80}.
+
+       Like the Thinning Classes, a prescription removes the same ratio of every cell (species and whole-number diameter) of the
+       stand and stock table that it is allowed to cut. For a set of cut cells the largest removal fraction that meets the constraints
+       is the smallest of the constraint slacks (current minus the minimum) divided by the cut cells' totals of that metric. The
+       removal fraction is the share of the cut cells that is removed, one minus the per-cell residual ratio of the Thinning
+       Classes (Thin.residual_ratio).
+
+       The species sets are searched with branch-and-bound, a set of species is only evaluated when the upper bound of its objective
+       (the removal of every undecided species at the best objective-to-constraint ratio of their cells) is better than the best
+       prescription found so far. For each species set, every diameter window is evaluated at once from prefix sums.
+
+       The optimized prescription can be turned into a Thinning Class for its reports:
+       ::
+            optimizer = ThinOptimizer(stand, constraints={'rd_ac': 35, 'tpa': 80})
+            optimizer.console_report()
+
+            thin = optimizer.to_thin()
+            thin.pdf_report('optimized_thin')"""
+
+    def __init__(self, stand, constraints: dict, objective: str = 'bf_ac', species_to_cut: list = 'all', min_dbh_to_cut: int = 0,
+                 max_dbh_to_cut: int = 999):
+        self.stand = stand
+        self.constraints = constraints
+        self.objective = objective
+        self.min_dbh_limit = min_dbh_to_cut
+        self.max_dbh_limit = max_dbh_to_cut
+
+        self.keys = ['tpa', 'ba_ac', 'rd_ac', 'bf_ac', 'cf_ac']
+        self.conditions = ['current_', 'residual_', 'removal_']
+
+        table = stand.diameter_table
+        if species_to_cut == 'all':
+            self.species_pool = list(table.species_list)
+        else:
+            self.species_pool = [spp for spp in table.species_list if spp in species_to_cut]
+
+        self.species = []
+        self.min_dbh = None
+        self.max_dbh = None
+        self.removal_fraction = 0
+        self.evaluated = 0
+
+        self.current = {key: float(table[key].sum()) for key in self.keys}
+        self.residual = dict(self.current)
+        self.removal = {key: 0 for key in self.keys}
+
+        self._check_constraints()
+        self._optimize()
+
+    def __getitem__(self, attribute: str):
+        return self.__dict__[attribute]
+
+    def to_thin(self):
+        """Returns a ThinTPA Class of the optimized prescription, the target density is the residual trees per acre"""
+        return ThinTPA(self.stand, self.residual['tpa'], species_to_cut=self.species, min_dbh_to_cut=self.min_dbh, max_dbh_to_cut=self.max_dbh)
+
+    def get_console_report_text(self):
+        """Returns a console-formatted string of the optimized prescription and its thinning report"""
+        return self._compile_console_report_text()
+
+    def console_report(self):
+        """Prints a console-formatted string of the optimized prescription and its thinning report"""
+        print(self._compile_console_report_text())
+
+    def _check_constraints(self):
+        """Will check that the stand's current density meets each constraint, if not it will throw a custom exception:
+           TargetDensityError"""
+        for met in self.constraints:
+            if self.current[met] < self.constraints[met]:
+                raise TargetDensityError(self.constraints[met], self.current[met], met.replace('_', '/').upper())
+
+    def _optimize(self):
+        """Runs the branch-and-bound search over the species sets, and sets the best prescription, used internally"""
+        table = self.stand.diameter_table
+        in_range = (table.dbh >= self.min_dbh_limit) & (table.dbh <= self.max_dbh_limit)
+        self._dbh = np.unique(table.dbh[in_range])
+        if len(self._dbh) == 0 or not self.species_pool:
+            return
+
+        obj_idx = self.keys.index(self.objective)
+        con_idx = [self.keys.index(met) for met in self.constraints]
+        self._slack = np.array([self.current[met] - self.constraints[met] for met in self.constraints])
+
+        # Per species values of each diameter (rows) and metric (columns), and the bounds of each species
+        self._values = {}
+        bound_obj = {}
+        bound_ratio = {}
+        for spp in self.species_pool:
+            cells = np.flatnonzero((table.species == spp) & in_range)
+            values = np.zeros((len(self._dbh), len(self.keys)))
+            for i, key in enumerate(self.keys):
+                np.add.at(values[:, i], np.searchsorted(self._dbh, table.dbh[cells]), table[key][cells])
+            self._values[spp] = values
+            bound_obj[spp] = values[:, obj_idx].sum()
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ratios = values[:, obj_idx][:, None] / values[:, con_idx]
+            bound_ratio[spp] = np.nan_to_num(ratios, nan=0, posinf=np.inf).max(axis=0) if len(con_idx) else np.array([])
+
+        order = sorted(self.species_pool, key=lambda x: bound_obj[x], reverse=True)
+        self._best = [0, None, None, None, 0]
+
+        def bound(species):
+            upper = sum(bound_obj[spp] for spp in species)
+            if con_idx:
+                ratio = np.max([bound_ratio[spp] for spp in species], axis=0)
+                upper = min(upper, float(np.min(self._slack * ratio)))
+            return upper
+
+        def branch(i, included, values):
+            undecided = order[i:]
+            if not included and not undecided:
+                return
+            if bound(included + undecided) <= self._best[0]:
+                return
+            if not undecided:
+                self._evaluate(included, values, obj_idx, con_idx)
+                return
+            spp = undecided[0]
+            branch(i + 1, included + [spp], values + self._values[spp])
+            branch(i + 1, included, values)
+
+        branch(0, [], np.zeros((len(self._dbh), len(self.keys))))
+
+        best, species, lo, hi, fraction = self._best
+        if species is None:
+            return
+        self.species = [spp for spp in table.species_list if spp in species]
+        cut = np.isin(table.species, self.species) & (table.dbh >= self._dbh[lo]) & (table.dbh <= self._dbh[hi])
+        # The diameter limits are tightened to the cut cells, windows can start or end on diameters the species set does not have
+        self.min_dbh = int(table.dbh[cut].min())
+        self.max_dbh = int(table.dbh[cut].max())
+        self.removal_fraction = fraction
+        self._set_removal(cut)
+        # The float sums can leave a binding constraint a few ulps under its minimum, the fraction is lowered until it is met
+        while any(self.residual[met] < self.constraints[met] for met in self.constraints):
+            self.removal_fraction = float(np.nextafter(self.removal_fraction, 0))
+            self._set_removal(cut)
+
+    def _set_removal(self, cut):
+        """Sets the removal and residual totals of removing the removal fraction of the cut cells, used internally"""
+        table = self.stand.diameter_table
+        for key in self.keys:
+            self.removal[key] = float(table[key][cut].sum()) * self.removal_fraction
+            self.residual[key] = self.current[key] - self.removal[key]
+
+    def _evaluate(self, species, values, obj_idx, con_idx):
+        """Evaluates every diameter window of a species set at once and keeps the best prescription, used internally"""
+        self.evaluated += 1
+        d = len(self._dbh)
+        prefix = np.vstack([np.zeros(len(self.keys)), np.cumsum(values, axis=0)])
+        # Window totals, windows[lo, hi] is the sum of the diameters from lo to hi
+        windows = prefix[None, 1:, :] - prefix[:-1, None, :]
+
+        # The fraction of each window that can be removed before a constraint is reached
+        fraction = np.ones((d, d))
+        if con_idx:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                limits = self._slack / windows[:, :, con_idx]
+            fraction = np.minimum(fraction, np.nan_to_num(limits, nan=np.inf).min(axis=2))
+        objective = fraction * windows[:, :, obj_idx]
+        objective[np.tril_indices(d, -1)] = -1
+
+        lo, hi = np.unravel_index(np.argmax(objective), objective.shape)
+        if objective[lo, hi] > self._best[0]:
+            self._best = [float(objective[lo, hi]), species, lo, hi, float(fraction[lo, hi])]
+
+    def _compile_console_report_text(self):
+        """Returns a console-formatted string of the optimized prescription and its thinning report, used internally"""
+        console_text = '\nOPTIMIZED THINNING PRESCRIPTION\n'
+        console_text += f'OBJECTIVE: MAXIMIZE REMOVAL {self.objective.replace("_", "/").upper()}\n'
+        for met in self.constraints:
+            console_text += f'CONSTRAINT: RESIDUAL {met.replace("_", "/").upper()} >= {self.constraints[met]}\n'
+        if not self.species:
+            console_text += 'NO PRESCRIPTION CAN REMOVE ANY VOLUME WITHIN THE CONSTRAINTS\n'
+            return console_text
+        console_text += f'REMOVAL FRACTION: {format_pct(self.removal_fraction)}\n'
+        console_text += self.to_thin().get_console_report_text()
+        return console_text
+
 
 if __name__ == '__main__':
     from treetopper.stand import Stand
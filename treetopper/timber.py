@@ -1,4 +1,5 @@
 from treetopper.log import Log
+from treetopper._log_batch import add_full_logs
 from treetopper._constants import (
     math,
     TAPER_EQ_COEF,
@@ -225,6 +226,11 @@ class TimberFull(object):
             self.logs[num] = Log(self, stem_height, length, grade=grade.upper(), defect_pct=defect)
         self._calc_volume_and_logs()
 
+    def add_logs(self, logs: list):
+        """Adds many logs at once from a list of [stem height, log length, log grade, log defect] lists, the logs are the same
+           as adding each one with add_log but their volumes are calculated together and the tree's volumes are recalculated once"""
+        add_full_logs([self], [logs])
+
     def get_any_dib(self, stem_height):
         """Returns the diameter inside bark (DIB) at any given stem height"""
         return math.floor(TAPER_EQ[self.species](self.dbh, self.height, stem_height, *TAPER_EQ_COEF[self.species]))